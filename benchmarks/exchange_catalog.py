@@ -0,0 +1,123 @@
+"""
+Build time and query latency of the local Exchange catalog on a synthetic org.
+
+Runs sync_exchange_catalog against an in-process stand-in for the Exchange
+assets listing (paged, with ETags), then an incremental sync after one asset
+changes and one is removed, then times search_exchange_catalog queries.
+
+    python benchmarks/exchange_catalog.py [--assets 20000] [--queries 200]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANYPOINT_MCP_DATA_DIR", tempfile.mkdtemp(prefix="anypoint-catalog-bench-"))
+os.environ.setdefault("ANYPOINT_MIGRATION_WATCH", "0")
+
+import httpx
+from mcp.server.fastmcp import FastMCP
+
+from tools import exchange_tools, upstream
+
+ORG_ID = "bench-org"
+DOMAINS = ["Finance", "Sales", "Logistics", "HR", "Marketing", "Support", "Identity", "Payments"]
+NOUNS = ["orders", "invoices", "customers", "shipments", "payments", "accounts", "employees", "tickets"]
+TYPES = ["rest-api", "raml-fragment", "http-api", "connector", "template"]
+QUERIES = ["orders", "invoice api", "ship", "customer payments", "employees 123", "nomatch"]
+
+
+def catalog(count: int) -> list:
+    assets = []
+    for index in range(count):
+        noun, domain = NOUNS[index % len(NOUNS)], DOMAINS[index % len(DOMAINS)]
+        assets.append({
+            "groupId": ORG_ID,
+            "assetId": f"{noun}-api-{index}",
+            "version": f"1.{index % 10}.0",
+            "name": f"{noun.title()} API {index}",
+            "type": TYPES[index % len(TYPES)],
+            "status": "published",
+            "description": f"Manage {noun} for the {domain} domain, version {index % 10}.",
+            "categories": [{"key": "Domain", "value": [domain]}],
+            "labels": [noun, domain.lower(), f"team-{index % 40}"],
+            "createdAt": "2025-01-01T00:00:00.000Z",
+        })
+    return assets
+
+
+class Listing:
+    """
+    Paged Exchange assets listing that answers If-None-Match with 304.
+    """
+
+    def __init__(self, assets: list):
+        self.assets = assets
+        self.requests = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/accounts/api/me":
+            return httpx.Response(200, json={"user": {"id": "bench-user"}})
+        self.requests += 1
+        offset = int(request.url.params.get("offset", 0))
+        limit = int(request.url.params.get("limit", exchange_tools.CATALOG_PAGE_SIZE))
+        body = json.dumps(self.assets[offset:offset + limit]).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, content=body, headers={"ETag": etag, "Content-Type": "application/json"})
+
+
+async def run(args):
+    listing = Listing(catalog(args.assets))
+    mock = httpx.MockTransport(listing)
+    upstream.shared_transport = lambda: mock
+    mcp = FastMCP("bench")
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # FastMCP logs every request at INFO
+    exchange_tools.register(mcp)
+    sync, search = (mcp._tool_manager.get_tool(name).fn for name in ("sync_exchange_catalog", "search_exchange_catalog"))
+
+    started = time.perf_counter()
+    result = await sync(token="bench", org_id=ORG_ID, full=True)
+    print(f"initial build      {time.perf_counter() - started:7.2f}s  {result['assets']} assets, {result['pages']} pages")
+
+    listing.assets[len(listing.assets) // 2]["description"] += " Changed."
+    listing.assets.pop()
+    started = time.perf_counter()
+    result = await sync(token="bench", org_id=ORG_ID)
+    print(
+        f"incremental sync   {time.perf_counter() - started:7.2f}s  {result['assets_written']} written, "
+        f"{result['assets_removed']} removed, {result['pages_not_modified']}/{result['pages']} pages 304"
+    )
+
+    print(f"\n{'query':<22} {'p50 ms':>8} {'p99 ms':>8} {'sqlite p50':>11} {'hits':>6}")
+    for query in QUERIES:
+        wall, inner = [], []
+        for _ in range(args.queries):
+            started = time.perf_counter()
+            result = await search(token="bench", org_id=ORG_ID, query=query)
+            wall.append((time.perf_counter() - started) * 1000)
+            inner.append(result["took_ms"])
+        wall.sort()
+        print(
+            f"{query:<22} {statistics.median(wall):8.2f} {wall[min(len(wall) - 1, int(len(wall) * 0.99))]:8.2f} "
+            f"{statistics.median(inner):11.2f} {result['count']:6}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--assets", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
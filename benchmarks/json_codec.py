@@ -0,0 +1,135 @@
+"""
+CPU cost of the /mcp/tools/call result path on a synthetic asset list.
+
+Codec: the stdlib path (json.loads, then FastAPI's jsonable_encoder and
+JSONResponse) against tools/jsonutil + FastJSONResponse, with and without
+orjson.
+
+Tool path: get_organization_assets called through the FastMCP tool manager
+against an in-process upstream, then rendered as the /mcp/tools/call response.
+Without projection the tool does not parse the body, but its text result is
+still encoded as a JSON string inside {"result": ...}, so the response
+escapes every quote of the listing.
+
+    python benchmarks/json_codec.py [--size-mb 5] [--repeat 5]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANYPOINT_MIGRATION_WATCH", "0")
+os.environ.setdefault("ANYPOINT_SPILL_THRESHOLD", "0")  # keep the whole listing in the result
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from http_server import FastJSONResponse, mcp
+from tools import jsonutil, upstream
+
+
+def asset_list(size_mb: float) -> bytes:
+    """
+    Exchange-style asset listing of roughly size_mb megabytes.
+    """
+    assets, size, index = [], 0, 0
+    while size < size_mb * 1024 * 1024:
+        asset = {
+            "groupId": "0f1e2d3c-4b5a-6978-8796-a5b4c3d2e1f0",
+            "assetId": f"orders-api-{index}",
+            "version": f"1.{index % 10}.{index % 7}",
+            "name": f"Orders API {index}",
+            "type": "rest-api",
+            "status": "published",
+            "description": "Order management API with fulfilment and returns. " * 4,
+            "labels": ["orders", "sales", f"team-{index % 12}"],
+            "categories": [{"key": "Domain", "value": ["Sales"]}, {"key": "Tier", "value": ["Gold"]}],
+            "createdAt": "2025-01-01T00:00:00.000Z",
+            "files": [
+                {"classifier": "fat-raml", "packaging": "zip", "md5": "0" * 32, "sha1": "1" * 40,
+                 "downloadURL": f"https://exchange.example/files/{index}/fat-raml.zip"},
+            ],
+        }
+        size += len(json.dumps(asset)) + 1
+        assets.append(asset)
+        index += 1
+    return json.dumps(assets).encode("utf-8")
+
+
+def cpu_seconds(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        fn()
+        best = min(best, time.process_time() - started)
+    return best
+
+
+def without_orjson(fn):
+    def run():
+        orjson, jsonutil.orjson = jsonutil.orjson, None
+        try:
+            fn()
+        finally:
+            jsonutil.orjson = orjson
+    return run
+
+
+def tool_path(arguments: dict):
+    """
+    One /mcp/tools/call round: the tool via the tool manager, then the response render.
+    """
+    def call():
+        async def scenario():
+            result = await mcp._tool_manager.call_tool(
+                "get_organization_assets", {"token": "bench", "org_id": "bench-org", **arguments}
+            )
+            return FastJSONResponse({"result": result})
+
+        asyncio.run(scenario())
+
+    return call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=5.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    raw = asset_list(args.size_mb)
+    print(f"payload: {len(raw) / 1024 / 1024:.1f} MB, {raw.count(b'assetId')} assets")
+
+    def stdlib():
+        JSONResponse(jsonable_encoder({"result": json.loads(raw)}))
+
+    def fast():
+        FastJSONResponse({"result": jsonutil.loads(raw)})
+
+    mock = httpx.MockTransport(lambda request: httpx.Response(200, content=raw))
+    upstream.shared_transport = lambda: mock
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # FastMCP logs every request at INFO
+
+    cases = [("codec: stdlib + jsonable_encoder", stdlib)]
+    if jsonutil.orjson is not None:
+        cases.append(("codec: jsonutil/orjson + FastJSON", fast))
+    cases.append(("codec: jsonutil/stdlib + FastJSON", without_orjson(fast)))
+    for label, arguments in (("raw text", {}), ("compact", {"compact": True})):
+        call = tool_path(arguments)
+        if jsonutil.orjson is not None:
+            cases.append((f"tool, {label}: orjson", call))
+        cases.append((f"tool, {label}: stdlib", without_orjson(call)))
+    if jsonutil.orjson is None:
+        print("orjson is not installed; skipping the orjson cases")
+
+    for name, fn in cases:
+        print(f"{name:<38} {cpu_seconds(fn, args.repeat):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
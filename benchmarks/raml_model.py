@@ -0,0 +1,181 @@
+"""
+Cold parse, warm (cached) load and revalidation cost of tools/raml_model on a
+generated multi-file spec: one root file, one included type file per
+resource and nested `uses:` libraries.
+
+    python benchmarks/raml_model.py [--resources 300] [--repeat 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import jsonutil, raml_model
+
+COMMON_LIBRARY = """#%RAML 1.0 Library
+uses:
+  base: base.raml
+types:
+  Person:
+    type: object
+    properties:
+      id: base.Identifier
+      name: string
+      email?: string
+"""
+
+BASE_LIBRARY = """#%RAML 1.0 Library
+types:
+  Identifier:
+    type: string
+    pattern: ^[a-z0-9-]+$
+"""
+
+TYPE_FILE = """#%RAML 1.0 DataType
+type: object
+description: Item {index} as stored by the inventory service.
+properties:
+  id: common.base.Identifier
+  name: string
+  quantity: integer
+  owner: common.Person
+  tags?: string[]
+"""
+
+RESOURCE = """/items{index}:
+  description: Items of collection {index}
+  get:
+    queryParameters:
+      limit?: integer
+      offset?: integer
+    responses:
+      200:
+        body:
+          application/json:
+            type: Item{index}[]
+  post:
+    body:
+      application/json:
+        type: Item{index}
+    responses:
+      201:
+        body:
+          application/json:
+            type: Item{index}
+  /{{id}}:
+    get:
+      responses:
+        200:
+          body:
+            application/json:
+              type: Item{index}
+    delete:
+"""
+
+
+def write_spec(root: str, resources: int) -> str:
+    os.makedirs(os.path.join(root, "types"))
+    os.makedirs(os.path.join(root, "libraries"))
+    with open(os.path.join(root, "libraries", "common.raml"), "w") as handle:
+        handle.write(COMMON_LIBRARY)
+    with open(os.path.join(root, "libraries", "base.raml"), "w") as handle:
+        handle.write(BASE_LIBRARY)
+
+    lines = [
+        "#%RAML 1.0",
+        "title: Inventory API",
+        "version: v1",
+        "baseUri: https://api.example.com/{version}",
+        "mediaType: application/json",
+        "uses:",
+        "  common: libraries/common.raml",
+        "types:",
+    ]
+    for index in range(resources):
+        with open(os.path.join(root, "types", f"item{index}.raml"), "w") as handle:
+            handle.write(TYPE_FILE.format(index=index))
+        lines.append(f"  Item{index}: !include types/item{index}.raml")
+    with open(os.path.join(root, "api.raml"), "w") as handle:
+        handle.write("\n".join(lines) + "\n" + "".join(RESOURCE.format(index=index) for index in range(resources)))
+    return "api.raml"
+
+
+def spec_size(root: str) -> tuple:
+    files, size = 0, 0
+    for folder, _, names in os.walk(root):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(folder, name))
+    return files, size
+
+
+def timed(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(name: str, samples: list):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:<34} {statistics.median(samples):9.2f} {p99:9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resources", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="raml-bench-") as root:
+        main_file = write_spec(root, args.resources)
+        files, size = spec_size(root)
+        print(f"spec: {files} files, {size / 1024 / 1024:.2f} MB, {args.resources} resources")
+
+        source = raml_model.FolderSource(root)
+        load = lambda: raml_model.load_model(source, main_file)
+
+        def cold():
+            raml_model._parsed.clear()
+            raml_model._models.clear()
+            load()
+
+        cold_samples = timed(cold, max(1, args.repeat // 20))
+        model = load()
+        if model["errors"]:
+            print(f"model errors: {model['errors'][:3]}")
+        print(f"model: {len(model['resources'])} resources, {len(model['types'])} types, {len(model['files'])} files read")
+
+        print(f"\n{'':<34} {'p50 ms':>9} {'p99 ms':>9}")
+        report("cold parse + build", cold_samples)
+        report("warm load (revalidate all files)", timed(load, args.repeat))
+
+        # Editing one included file rebuilds the model; every other file comes from the parse cache
+        edited = os.path.join(root, "types", "item0.raml")
+        edits = []
+        for round_number in range(max(1, args.repeat // 20)):
+            with open(edited, "a") as handle:
+                handle.write(f"# edit {round_number}\n")
+            misses = raml_model.stats["file_misses"]
+            edits += timed(load, 1)
+            assert raml_model.stats["file_misses"] == misses + 1
+        report("load after editing one file", edits)
+
+        answers = []
+
+        def resource_query():
+            answers.append(len(jsonutil.dumps(raml_model.query(load(), resource=f"/items{len(answers) % args.resources}"))))
+
+        report("resource query (warm)", timed(resource_query, args.repeat))
+        print(f"\nresource answer size p50: {statistics.median(answers) / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,38 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header
+from fastapi.responses import JSONResponse
 import uvicorn
 from mcp.server.fastmcp import FastMCP
-from tools import load_tools
+from tools import deadline, jsonutil, load_tools, metrics, migration_index, profiling, warmup
 import os
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="Anypoint MCP HTTP Server")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with tools.jsonutil (orjson when installed).
+    """
+
+    def render(self, content) -> bytes:
+        return jsonutil.dumps_bytes(content)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm up in the background; /health/ready reports 503 until it is done
+    task = asyncio.create_task(warmup.run(mcp))
+    if migration_index.WATCH_ENABLED:
+        migration_index.start()
+    try:
+        yield
+    finally:
+        task.cancel()
+        await migration_index.stop()
+
+
+app = FastAPI(title="Anypoint MCP HTTP Server", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +49,20 @@ mcp = FastMCP("anypoint")
 load_tools(mcp)
 
 
+@app.get("/health/live")
+async def live():
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def ready():
+    """
+    Ready once the startup warm-up has finished (or timed out).
+    """
+    status = 200 if warmup.state["ready"] else 503
+    return JSONResponse(status_code=status, content=warmup.state)
+
+
 @app.post("/mcp/tools/list")
 async def list_tools():
     """
@@ -36,20 +77,102 @@ async def list_tools():
 
 
 @app.post("/mcp/tools/call")
-async def call_tool(body: dict):
+async def call_tool(body: dict, x_request_timeout: float | None = Header(default=None)):
     """
     Uses ToolManager.call_tool() to execute a tool.
+    The caller's time budget (seconds) comes from the X-Request-Timeout header
+    or a "timeout" field in the body; otherwise the tool's default applies.
     """
     name = body.get("name")
     args = body.get("arguments", {})
+    timeout = body.get("timeout", x_request_timeout)
 
     try:
-        result = await mcp._tool_manager.call_tool(name, args)
-        return {"result": result}
+        with deadline.scope(float(timeout) if timeout is not None else None):
+            result = await mcp._tool_manager.call_tool(name, args)
+        # Returned as a response object so FastAPI skips jsonable_encoder on large results
+        return FastJSONResponse({"result": result})
     except Exception as e:
         return {"error": str(e)}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    In-process counters (hedging, payload sizes, ...) keyed by label.
+    """
+    return metrics.snapshot()
+
+
+# Admin profiling endpoints: 404 unless ANYPOINT_ADMIN_TOKEN is set, 401 without a matching X-Admin-Token
+def admin_denied(token: str | None) -> JSONResponse | None:
+    if not profiling.enabled():
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    if not profiling.authorized(token):
+        return JSONResponse(status_code=401, content={"error": "Invalid admin token"})
+    return None
+
+
+def admin_result(result: dict):
+    # Rejected options are the caller's mistake, not a server error
+    if result.get("status") == "error":
+        return JSONResponse(status_code=400, content=result)
+    return result
+
+
+@app.post("/admin/profile")
+async def start_profile(body: dict, x_admin_token: str | None = Header(default=None)):
+    """
+    Profile the next `calls` calls of a tool.
+    Body: {"tool": "...", "calls": 1, "mode": "cprofile" | "sample", "sort": "cumulative", "limit": 30, "interval": 0.005}
+    """
+    denied = admin_denied(x_admin_token)
+    if denied:
+        return denied
+    options = {key: body[key] for key in ("calls", "mode", "sort", "limit", "interval") if key in body}
+    return admin_result(profiling.profile(mcp, body.get("tool"), **options))
+
+
+@app.get("/admin/profile")
+async def get_profile(wait: float = 0, x_admin_token: str | None = Header(default=None)):
+    """
+    State of the armed or last profile, with the report once finished;
+    ?wait=N blocks up to N seconds for the profiled calls to complete.
+    """
+    return admin_denied(x_admin_token) or await profiling.profile_status(wait)
+
+
+@app.delete("/admin/profile")
+async def cancel_profile(x_admin_token: str | None = Header(default=None)):
+    return admin_denied(x_admin_token) or profiling.cancel()
+
+
+@app.post("/admin/memory/start")
+async def start_memory(body: dict | None = None, x_admin_token: str | None = Header(default=None)):
+    """
+    Start tracemalloc and take the baseline snapshot. Body: {"frames": 25}
+    """
+    return admin_denied(x_admin_token) or admin_result(profiling.memory_start((body or {}).get("frames", 25)))
+
+
+@app.post("/admin/memory/snapshot")
+async def memory_snapshot(body: dict | None = None, x_admin_token: str | None = Header(default=None)):
+    """
+    Diff a snapshot against the baseline to show where memory is retained.
+    Body: {"limit": 20, "group_by": "lineno" | "filename" | "traceback", "reset": false}
+    """
+    denied = admin_denied(x_admin_token)
+    if denied:
+        return denied
+    options = {key: body[key] for key in ("limit", "group_by", "reset") if key in (body or {})}
+    return admin_result(await asyncio.to_thread(profiling.memory_snapshot, **options))
+
+
+@app.delete("/admin/memory")
+async def stop_memory(x_admin_token: str | None = Header(default=None)):
+    return admin_denied(x_admin_token) or profiling.memory_stop()
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8081))
     uvicorn.run(app, host="0.0.0.0", port=port)
@@ -1,7 +1,22 @@
+from contextlib import asynccontextmanager
+
 from mcp.server.fastmcp import FastMCP
-from tools import load_tools
+from tools import load_tools, migration_index, warmup
+
+
+@asynccontextmanager
+async def lifespan(server):
+    # Requests are only served once the (optional, time-bounded) warm-up is done
+    await warmup.run(server)
+    if migration_index.WATCH_ENABLED:
+        migration_index.start()
+    try:
+        yield
+    finally:
+        await migration_index.stop()
+
 
-mcp = FastMCP("anypoint")
+mcp = FastMCP("anypoint", lifespan=lifespan)
 
 
 def main():
@@ -10,4 +25,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
@@ -0,0 +1,63 @@
+import os
+import tempfile
+
+# Local state goes to a throwaway directory; no background index watcher
+os.environ.setdefault("ANYPOINT_MCP_DATA_DIR", tempfile.mkdtemp(prefix="anypoint-mcp-tests-"))
+os.environ.setdefault("ANYPOINT_MIGRATION_WATCH", "0")
+
+import httpx
+import pytest
+
+from tools import identity, storage, upstream
+
+
+class FakeMCP:
+    """
+    Stand-in for FastMCP: keeps the functions registered with @mcp.tool() by name.
+    """
+
+    def __init__(self):
+        self.tools = {}
+
+    def tool(self):
+        def decorator(fn):
+            self.tools[fn.__name__] = fn
+            return fn
+        return decorator
+
+
+@pytest.fixture
+def tools():
+    """
+    tools(module) registers a tools module and returns its tool functions by name.
+    """
+    def register(module) -> dict:
+        mcp = FakeMCP()
+        module.register(mcp)
+        return mcp.tools
+    return register
+
+
+@pytest.fixture
+def anypoint(monkeypatch):
+    """
+    anypoint(handler) answers every upstream.client() request with handler
+    (an httpx.MockTransport handler, sync or async). Identity lookups
+    cached from earlier tests are dropped.
+    """
+    monkeypatch.setattr(identity, "_entries", identity.OrderedDict())
+
+    def route(handler):
+        mock = httpx.MockTransport(handler)
+        monkeypatch.setattr(upstream, "shared_transport", lambda: mock)
+        return mock
+    return route
+
+
+@pytest.fixture
+def data_dir(monkeypatch, tmp_path):
+    """
+    A fresh ANYPOINT_MCP_DATA_DIR for one test.
+    """
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    return tmp_path
@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+import httpx
+
+from tools import exchange_tools
+from tools.exchange_tools import asset_categories, category_changes
+
+
+def test_asset_categories_reads_both_shapes():
+    asset = {"categories": [
+        {"key": "Domain", "value": ["Sales", "Finance"]},
+        {"tagKey": "Tier", "value": "Gold"},
+        {"value": ["no key"]},
+    ]}
+    assert asset_categories(asset) == {"Domain": ["Sales", "Finance"], "Tier": ["Gold"]}
+    assert asset_categories({"categories": None}) == {}
+
+
+def test_category_changes_merges_or_replaces():
+    current = {"Domain": ["Sales"], "Tier": ["Gold"]}
+    # Merge: only missing values cause a write, existing ones are kept
+    assert category_changes(current, {"Domain": ["Sales"], "Tier": "Silver"}) == [("Tier", ["Gold"], ["Gold", "Silver"])]
+    assert category_changes(current, {"Region": ["EU"]}) == [("Region", [], ["EU"])]
+    # Replace: a write unless the sets already match
+    assert category_changes(current, {"Domain": ["Sales"]}, replace=True) == []
+    assert category_changes(current, {"Domain": ["Finance"]}, replace=True) == [("Domain", ["Sales"], ["Finance"])]
+
+
+def test_malformed_entries_are_reported_per_asset(tools, anypoint):
+    writes = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "PUT":
+            writes.append((request.url.path.rsplit("/", 1)[-1], json.loads(request.content)["tagValue"]))
+            return httpx.Response(204)
+        return httpx.Response(200, json={"categories": [{"key": "Domain", "value": ["Sales"]}]})
+
+    anypoint(handler)
+    result = asyncio.run(tools(exchange_tools)["bulk_categorize_assets"](
+        token="t", org_id="o", categories={"Domain": ["Finance"]}, assets=[
+            {"asset_id": "orders-api", "version": "1.0.0"},
+            "not an asset",
+            {"asset_id": "orders-api"},
+            {"asset_id": "billing-api", "version": "1.0.0", "categories": ["Finance"]},
+        ],
+    ))
+
+    assert (result["status"], result["changed"], result["failed"]) == ("partial_success", 1, 3)
+    assert writes == [("Domain", ["Sales", "Finance"])]
+    failures = {failure["index"]: failure["message"] for failure in result["failures"]}
+    assert failures == {1: "Missing asset_id, version", 2: "Missing version", 3: "categories must be an object"}
@@ -0,0 +1,55 @@
+import asyncio
+
+import httpx
+
+from tools import api_manager_tools
+
+
+def _api_manager(posted: list, failing: str | None = None):
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "GET" and path.endswith("/apis"):
+            return httpx.Response(200, json={"assets": [
+                {"groupId": "g", "assetId": "orders-api", "apis": [{"id": 1, "technology": "mule4"}, {"id": 2, "technology": "flexGateway"}]},
+                {"groupId": "g", "assetId": "billing-api", "apis": [{"id": 3, "technology": "mule4"}]},
+            ]})
+        instance_id = path.split("/apis/")[1].split("/")[0]
+        if instance_id == failing:
+            return httpx.Response(500, json={"message": "boom"})
+        posted.append((instance_id, path.rsplit("/", 1)[1]))
+        return httpx.Response(201, json={"id": int(instance_id) * 100})
+    return handler
+
+
+def test_selector_picks_instances_and_reports_each_result(tools, anypoint):
+    posted = []
+    anypoint(_api_manager(posted, failing="2"))
+    bulk = tools(api_manager_tools)["bulk_apply_client_id_policy"]
+
+    result = asyncio.run(bulk(token="t", org_id="o", env_id="e", selector={"assetId": "orders-*"}))
+    assert (result["status"], result["total"], result["succeeded"], result["failed"]) == ("partial_success", 2, 1, 1)
+    by_instance = {entry["instance_id"]: entry for entry in result["results"]}
+    assert by_instance["1"] == {"instance_id": "1", "status": "success", "id": 100}
+    assert by_instance["2"]["status"] == "error"
+    assert posted == [("1", "policies")]
+
+
+def test_explicit_ids_skip_the_listing_and_targets_are_required(tools, anypoint):
+    posted = []
+    anypoint(_api_manager(posted))
+    registered = tools(api_manager_tools)
+
+    tiers = asyncio.run(registered["bulk_create_sla_tier"](
+        token="t", org_id="o", env_id="e", name="Gold", description="", limits=[], instance_ids=["3", "1"]
+    ))
+    assert tiers["status"] == "success" and sorted(posted) == [("1", "tiers"), ("3", "tiers")]
+
+    missing = asyncio.run(registered["bulk_apply_sla_rate_limiting"](token="t", org_id="o", env_id="e"))
+    assert missing["status"] == "error" and "selector" in missing["message"]
+
+
+def test_matches_uses_glob_patterns():
+    instance = {"assetId": "orders-api", "technology": "mule4"}
+    assert api_manager_tools.matches(instance, {})
+    assert api_manager_tools.matches(instance, {"assetId": "orders-*", "technology": "mule4"})
+    assert not api_manager_tools.matches(instance, {"assetId": "billing-*"})
@@ -0,0 +1,73 @@
+import asyncio
+
+import httpx
+import pytest
+
+from tools import design_session_tools
+
+
+@pytest.fixture
+def sessions(monkeypatch, tmp_path, tools, anypoint, data_dir):
+    monkeypatch.setattr(design_session_tools, "_sessions", {})
+    monkeypatch.setattr(design_session_tools, "UPLOADS_DIR", tmp_path / "uploads")
+    saved = []
+
+    def anypoint_platform(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/accounts/api/me":
+            user = request.headers["Authorization"].removeprefix("Bearer user-")
+            return httpx.Response(200, json={"user": {"id": user, "organization": {"id": "org"}}})
+        if request.url.path.endswith("/save/v2"):
+            saved.append(sorted(part.split('filename="')[1].split('"')[0] for part in request.content.decode().split("\r\n") if 'filename="' in part))
+        return httpx.Response(200, json={})
+
+    anypoint(anypoint_platform)
+    registered = tools(design_session_tools)
+    registered["saved"] = saved
+    return registered
+
+
+def test_sessions_belong_to_the_caller_who_opened_them(sessions):
+    async def scenario():
+        opened = await sessions["open_design_session"](token="user-alice", org_id="org", user_id="alice", project_id="p1")
+        session_id = opened["session_id"]
+
+        assert [s["session_id"] for s in (await sessions["list_design_sessions"](token="user-alice"))["sessions"]] == [session_id]
+        assert (await sessions["list_design_sessions"](token="user-bob"))["sessions"] == []
+
+        for name, arguments in (
+            ("stage_design_files", {"files": {"evil.raml": "x"}}),
+            ("commit_design_session", {}),
+            ("close_design_session", {}),
+        ):
+            refused = await sessions[name](token="user-bob", session_id=session_id, **arguments)
+            assert refused["status"] == "error" and "No open design session" in refused["message"]
+
+        staged = await sessions["stage_design_files"](token="user-alice", session_id=session_id, files={"api.raml": "#%RAML 1.0"})
+        assert staged["staged_files"] == ["api.raml"]
+        committed = await sessions["commit_design_session"](token="user-alice", session_id=session_id)
+        assert committed["saved_files"] == ["api.raml"] and committed["released"]
+        assert (await sessions["list_design_sessions"](token="user-alice"))["sessions"] == []
+
+    asyncio.run(scenario())
+    assert sessions["saved"] == [["api.raml"]]
+
+
+def test_stage_folder_is_confined_to_the_uploads_root(sessions, tmp_path):
+    specs = tmp_path / "uploads" / "migration_output_1" / "raml-specs"
+    specs.mkdir(parents=True)
+    (specs / "api.raml").write_text("#%RAML 1.0")
+    (tmp_path / "secret.txt").write_text("do not stage")
+    (specs / "leak.txt").symlink_to(tmp_path / "secret.txt")
+
+    async def scenario():
+        opened = await sessions["open_design_session"](token="user-alice", org_id="org", user_id="alice", project_id="p1")
+        stage = lambda folder: sessions["stage_design_files"](token="user-alice", session_id=opened["session_id"], folder_path=folder)
+
+        for outside in (str(tmp_path), "../", "migration_output_1/../.."):
+            refused = await stage(outside)
+            assert refused["status"] == "error" and "uploads" in refused["message"]
+
+        staged = await stage("migration_output_1/raml-specs")
+        assert staged["staged_files"] == ["api.raml"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import os
+import re
+
+import httpx
+import pytest
+
+from tools import downloads, exchange_tools
+
+CHUNK = 64 * 1024
+CONTENT = os.urandom(16 * CHUNK + 1234)
+MD5 = hashlib.md5(CONTENT).hexdigest()
+SHA1 = hashlib.sha1(CONTENT).hexdigest()
+
+
+class _BrokenStream(httpx.AsyncByteStream):
+    """
+    Half of the body, then a dropped connection.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data[:len(self.data) // 2]
+        raise httpx.ReadError("connection dropped")
+
+
+class _RangeServer:
+    def __init__(self):
+        self.broken = set()  # chunk offsets whose responses break partway
+        self.ranges = []
+        self.authorization = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.authorization.append(request.headers.get("Authorization"))
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", request.headers.get("Range", ""))
+        if match is None:
+            return httpx.Response(200, content=CONTENT)
+        start, end = int(match.group(1)), min(int(match.group(2)), len(CONTENT) - 1)
+        self.ranges.append(start)
+        body = CONTENT[start:end + 1]
+        headers = {"Content-Range": f"bytes {start}-{end}/{len(CONTENT)}", "Content-Length": str(len(body))}
+        if start in self.broken:
+            return httpx.Response(206, headers=headers, stream=_BrokenStream(body))
+        return httpx.Response(206, headers=headers, content=body)
+
+
+def _fetch(server, path, **checksums):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+            return await downloads.fetch(
+                client, "https://files.example/asset.zip", path, chunk_size=CHUNK, parallel=4, **checksums
+            )
+    return asyncio.run(run())
+
+
+def test_interrupted_download_resumes_and_verifies(tmp_path, monkeypatch):
+    monkeypatch.setattr(downloads, "CHUNK_RETRIES", 0)
+    server = _RangeServer()
+    server.broken = {5 * CHUNK, 11 * CHUNK}
+    path = tmp_path / "asset.zip"
+
+    with pytest.raises(httpx.ReadError):
+        _fetch(server, path, md5=MD5, sha1=SHA1)
+    assert not path.exists()
+    assert (tmp_path / "asset.zip.part.json").exists()
+
+    server.broken, server.ranges = set(), []
+    report = _fetch(server, path, md5=MD5, sha1=SHA1)
+
+    assert report["status"] == "resumed"
+    assert report["resumed_bytes"] > 0
+    assert len(server.ranges) == 17 - report["resumed_bytes"] // CHUNK
+    assert report["verified"] and report["digests"] == {"md5": MD5, "sha1": SHA1}
+    assert path.read_bytes() == CONTENT
+    assert not (tmp_path / "asset.zip.part").exists()
+    assert not (tmp_path / "asset.zip.part.json").exists()
+
+
+def test_checksum_mismatch_discards_the_partial_file(tmp_path):
+    path = tmp_path / "asset.zip"
+
+    with pytest.raises(downloads.ChecksumMismatch):
+        _fetch(_RangeServer(), path, md5="0" * 32, sha1=SHA1)
+
+    assert not path.exists()
+    assert not (tmp_path / "asset.zip.part").exists()
+    assert not (tmp_path / "asset.zip.part.json").exists()
+
+
+def test_empty_file_is_downloaded_despite_416(tmp_path):
+    def server(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(416, headers={"Content-Range": "bytes */0"})
+
+    report = _fetch(server, tmp_path / "empty.zip", md5=hashlib.md5(b"").hexdigest())
+    assert (report["status"], report["bytes"], report["verified"]) == ("downloaded", 0, True)
+    assert (tmp_path / "empty.zip").read_bytes() == b""
+    assert not (tmp_path / "empty.zip.part").exists()
+
+    def refused(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(416, headers={"Content-Range": f"bytes */{len(CONTENT)}"})
+
+    with pytest.raises(httpx.HTTPStatusError):
+        _fetch(refused, tmp_path / "other.zip")
+
+
+def test_chunks_held_in_memory_stay_under_the_buffer_cap(tmp_path, monkeypatch):
+    monkeypatch.setattr(downloads, "BUFFER_BYTES", 2 * CHUNK)
+    server = _RangeServer()
+    in_flight, peak = [0], [0]
+
+    async def slow(request: httpx.Request) -> httpx.Response:
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.001)
+        in_flight[0] -= 1
+        return server(request)
+
+    report = _fetch(slow, tmp_path / "asset.zip", md5=MD5)
+    assert report["verified"] and (tmp_path / "asset.zip").read_bytes() == CONTENT
+    assert peak[0] == 2  # parallel=4 would otherwise keep 8 chunks ahead of the hash
+
+
+def test_file_names_stay_inside_the_download_folder():
+    used = set()
+    assert exchange_tools.file_name("orders-api", "1.0.0", {"classifier": "fat-raml", "packaging": "zip"}, used) == (
+        "orders-api-1.0.0-fat-raml.zip"
+    )
+    assert exchange_tools.file_name("orders-api", "1.0.0", {"classifier": "fat-raml", "packaging": "zip"}, used) == (
+        "orders-api-1.0.0-fat-raml-2.zip"
+    )
+    assert exchange_tools.file_name("..", None, {"packaging": "../../etc/passwd"}, used) == "file._.._etc_passwd"
+    assert exchange_tools.file_name("a", "1/../../x", {"classifier": "c\\d", "packaging": ".."}, used) == "a-1_.._.._x-c_d"
+
+
+def test_credentials_only_go_to_anypoint():
+    assert downloads.credentials_allowed("https://anypoint.mulesoft.com/exchange/api/v2/files/1")
+    assert not downloads.credentials_allowed("https://exchange-files.s3.amazonaws.com/a.zip")
+    assert not downloads.credentials_allowed("https://anypoint.mulesoft.com.evil.example/a.zip")
+    assert not downloads.credentials_allowed(
+        "https://anypoint.mulesoft.com/files/a.zip?X-Amz-Signature=abc&X-Amz-Expires=60"
+    )
+
+
+def test_download_exchange_asset_keeps_the_token_and_files_in_place(data_dir, tools, anypoint):
+    tmp_path = data_dir
+    server = _RangeServer()
+    links = {
+        "pom": "https://anypoint.mulesoft.com/exchange/files/pom",
+        "fat-raml": "https://bucket.s3.amazonaws.com/fat-raml.zip?X-Amz-Signature=abc",
+    }
+
+    def exchange(request: httpx.Request) -> httpx.Response:
+        if "/files/" in request.url.path or request.url.host != "anypoint.mulesoft.com":
+            return server(request)
+        files = [{"classifier": name, "packaging": "zip", "downloadURL": link} for name, link in links.items()]
+        return httpx.Response(200, json={"version": "1.0.0", "files": files})
+
+    anypoint(exchange)
+    download = tools(exchange_tools)["download_exchange_asset"]
+
+    for outside in ("../elsewhere", str(tmp_path / "elsewhere"), "/etc"):
+        result = asyncio.run(download(token="t", org_id="o", owner_id="u", asset_name="a", download_dir=outside))
+        assert result["status"] == "error" and "download_dir" in result["message"]
+
+    result = asyncio.run(download(token="t", org_id="o", owner_id="u", asset_name="a", download_dir="assets"))
+    assert result["status"] == "success"
+    assert {os.path.dirname(report["path"]) for report in result["downloads"]} == {str(tmp_path / "downloads" / "assets")}
+    assert server.authorization.count("Bearer t") == 1  # the Anypoint-hosted file only
+    assert len(server.authorization) == 2
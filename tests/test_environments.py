@@ -0,0 +1,30 @@
+import asyncio
+
+import httpx
+
+from tools import access_management_tools
+
+
+def test_environments_are_cached_as_copies_with_a_size_cap(monkeypatch, tools, anypoint):
+    monkeypatch.setattr(access_management_tools, "_env_cache", access_management_tools.OrderedDict())
+    monkeypatch.setattr(access_management_tools, "ENV_CACHE_SIZE", 2)
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return httpx.Response(200, json={"data": [{"id": "env-1", "name": "Sandbox"}]})
+
+    anypoint(handler)
+    list_environments = tools(access_management_tools)["list_environments"]
+
+    first = asyncio.run(list_environments(token="t", org_id="org-1"))
+    first["data"].clear()
+    again = asyncio.run(list_environments(token="t", org_id="org-1"))
+    assert again == {"data": [{"id": "env-1", "name": "Sandbox"}]}
+    assert len(requests) == 1
+
+    asyncio.run(list_environments(token="t", org_id="org-2"))
+    asyncio.run(list_environments(token="t", org_id="org-3"))
+    assert len(access_management_tools._env_cache) == 2
+    asyncio.run(list_environments(token="t", org_id="org-1"))
+    assert len(requests) == 4
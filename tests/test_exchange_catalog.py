@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+import pytest
+
+from tools import exchange_tools
+
+
+class Listing:
+    """
+    Paged Exchange assets listing; `failing_offset` answers 500.
+    """
+
+    def __init__(self, assets: list):
+        self.assets = assets
+        self.failing_offset = None
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/accounts/api/me":
+            return httpx.Response(200, json={"user": {"id": request.headers["Authorization"].removeprefix("Bearer ")}})
+        offset, limit = int(request.url.params["offset"]), int(request.url.params["limit"])
+        if offset == self.failing_offset:
+            return httpx.Response(500)
+        return httpx.Response(200, json=self.assets[offset:offset + limit])
+
+
+def _asset(asset_id: str | None, name: str) -> dict:
+    return {"groupId": "g", "assetId": asset_id, "name": name, "type": "rest-api"}
+
+
+@pytest.fixture
+def catalog(monkeypatch, tools, anypoint, data_dir):
+    monkeypatch.setattr(exchange_tools, "CATALOG_PAGE_SIZE", 2)
+    registered = tools(exchange_tools)
+    return registered["sync_exchange_catalog"], registered["search_exchange_catalog"]
+
+
+def test_listing_entries_without_an_asset_id_do_not_end_the_sync(catalog, anypoint):
+    sync, search = catalog
+    anypoint(Listing([_asset("orders", "Orders"), _asset(None, "Draft"), _asset("billing", "Billing")]))
+
+    result = asyncio.run(sync(token="alice", org_id="org"))
+    assert (result["status"], result["pages"], result["assets"]) == ("success", 2, 2)
+    assert asyncio.run(search(token="alice", org_id="org", query="billing"))["count"] == 1
+
+
+def test_failed_full_sync_keeps_the_current_catalog(catalog, anypoint):
+    sync, search = catalog
+    listing = Listing([_asset("orders", "Orders"), _asset("billing", "Billing"), _asset("payments", "Payments")])
+    anypoint(listing)
+    asyncio.run(sync(token="alice", org_id="org"))
+
+    listing.assets[0] = _asset("orders", "Orders v2")
+    listing.failing_offset = 2
+    assert asyncio.run(sync(token="alice", org_id="org", full=True))["status"] == "error"
+    kept = asyncio.run(search(token="alice", org_id="org"))
+    assert kept["catalog_size"] == 3
+    assert {row["name"] for row in kept["results"]} == {"Orders", "Billing", "Payments"}
+
+    listing.failing_offset = None
+    assert asyncio.run(sync(token="alice", org_id="org", full=True))["status"] == "success"
+    assert {row["name"] for row in asyncio.run(search(token="alice", org_id="org"))["results"]} == {"Orders v2", "Billing", "Payments"}
+
+
+def test_catalog_is_only_searchable_by_whoever_synced_it(catalog, anypoint):
+    sync, search = catalog
+    anypoint(Listing([_asset("orders", "Orders")]))
+    asyncio.run(sync(token="alice", org_id="org"))
+
+    assert asyncio.run(search(token="alice", org_id="org"))["count"] == 1
+    other = asyncio.run(search(token="bob", org_id="org"))
+    assert other["status"] == "error" and "run sync_exchange_catalog first" in other["message"]
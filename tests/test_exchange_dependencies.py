@@ -0,0 +1,36 @@
+import asyncio
+
+import httpx
+
+from tools import dependency_graph, exchange_tools
+
+
+def _exchange(request: httpx.Request) -> httpx.Response:
+    if request.headers["Authorization"] != "Bearer allowed":
+        return httpx.Response(403, json={"message": "Forbidden"})
+    asset_id = request.url.path.split("/")[-3]
+    dependencies = [{"groupId": "g", "assetId": "lib", "version": "1.0.0"}] if asset_id == "api" else []
+    return httpx.Response(200, json={"type": "rest-api", "dependencies": dependencies})
+
+
+def test_dependency_cache_is_scoped_to_the_token_and_bounded(monkeypatch, tools, anypoint):
+    anypoint(_exchange)
+    monkeypatch.setattr(exchange_tools, "_dependency_cache", exchange_tools.OrderedDict())
+    monkeypatch.setattr(exchange_tools, "DEPENDENCY_CACHE_SIZE", 3)
+    resolve = tools(exchange_tools)["resolve_exchange_dependencies"]
+
+    allowed = asyncio.run(resolve(token="allowed", org_id="o", group_id="g", asset_id="api", version="1.0.0"))
+    assert allowed["status"] == "success" and allowed["requests"] == 2
+
+    denied = asyncio.run(resolve(token="other", org_id="o", group_id="g", asset_id="api", version="1.0.0"))
+    assert denied["status"] == "error" and "403" in denied["message"]
+
+    for index in range(3):
+        asyncio.run(resolve(token="allowed", org_id="o", group_id="g", asset_id=f"leaf{index}", version="1.0.0"))
+    assert len(exchange_tools._dependency_cache) == 3
+
+
+def test_depth_counts_levels_below_the_roots():
+    root, a, b, c = ("g", "root", "1"), ("g", "a", "1"), ("g", "b", "1"), ("g", "c", "1")
+    graph = {root: [a, c], a: [b], b: [c], c: []}
+    assert dependency_graph.resolve(graph, [root])["depth"] == 2
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from tools import hedging, metrics
+from tools.hedging import HedgeBudget, LatencyTracker
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(hedging, "_trackers", {})
+    monkeypatch.setattr(hedging, "_budgets", {})
+    metrics.reset()
+
+
+def warmed(tool: str, seconds: float = 0.02) -> LatencyTracker:
+    tracker = hedging.tracker_for(tool)
+    for _ in range(hedging.MIN_SAMPLES):
+        tracker.record(seconds)
+    return tracker
+
+
+class Upstream:
+    """
+    send() stand-in: the first attempt takes `first` seconds, later ones `rest`.
+    """
+
+    def __init__(self, first: float, rest: float):
+        self.delays = [first, rest]
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self, request):
+        delay = self.delays[min(self.calls, 1)]
+        self.calls += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"answer after {delay}"
+
+
+def test_no_hedge_until_enough_samples():
+    upstream = Upstream(first=0.05, rest=0.0)
+    result = asyncio.run(hedging.send_hedged("tool", "GET /x", upstream))
+    assert result == "answer after 0.05"
+    assert upstream.calls == 1
+    assert metrics.get("hedges_sent", tool="tool") == 0
+
+
+def test_slow_primary_is_hedged_and_loser_cancelled():
+    tracker = warmed("tool")
+    hedging.budget_for("tool").tokens = 1
+
+    async def scenario():
+        upstream = Upstream(first=1.0, rest=0.0)
+        result = await hedging.send_hedged("tool", "GET /x", upstream)
+        await asyncio.sleep(0)  # let the cancelled primary unwind
+        return upstream, result
+
+    upstream, result = asyncio.run(scenario())
+    assert result == "answer after 0.0"
+    assert upstream.calls == 2
+    assert upstream.cancelled == 1
+    assert metrics.get("hedges_sent", tool="tool") == 1
+    assert metrics.get("hedges_won", tool="tool") == 1
+    # The cancelled primary is kept as a censored sample, not dropped
+    censored = [seconds for seconds, is_censored in tracker.samples if is_censored]
+    assert len(censored) == 1 and censored[0] >= 0.02
+
+
+def test_exhausted_budget_skips_the_hedge():
+    warmed("tool")
+    hedging.budget_for("tool").tokens = 0
+    upstream = Upstream(first=0.05, rest=0.0)
+
+    result = asyncio.run(hedging.send_hedged("tool", "GET /x", upstream))
+    assert result == "answer after 0.05"
+    assert upstream.calls == 1
+    assert metrics.get("hedges_skipped_budget", tool="tool") == 1
+
+
+def test_budgets_are_per_tool():
+    hedging.budget_for("busy").tokens = 0
+    hedging.budget_for("quiet").tokens = 1
+    assert not hedging.budget_for("busy").spend()
+    assert hedging.budget_for("quiet").spend()
+
+
+def test_budget_earns_ratio_and_caps_at_burst():
+    budget = HedgeBudget(ratio=0.5, burst=1.0)
+    assert not budget.spend()
+    budget.earn()
+    assert not budget.spend()
+    budget.earn()
+    budget.earn()
+    assert budget.tokens == 1.0
+    assert budget.spend()
+    assert not budget.spend()
+
+
+def test_censored_samples_raise_the_delay():
+    tracker = LatencyTracker()
+    for _ in range(19):
+        tracker.record(0.01)
+    tracker.record(0.05)
+    assert tracker.delay(0.9) == pytest.approx(0.01)
+
+    # Losers cancelled after 0.2s: the p90 is at least that slow, not 0.01
+    for _ in range(10):
+        tracker.record(0.2, censored=True)
+    tracker.record(0.3)
+    assert tracker.delay(0.9) == pytest.approx(0.3)
@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+import pytest
+
+from tools import exchange_tools
+
+USERS = {"Bearer alice-token": "alice", "Bearer alice-refreshed": "alice", "Bearer bob-token": "bob"}
+
+
+class _Anypoint:
+    def __init__(self):
+        self.posts = 0
+        self.fail = None  # exception class raised for the next POST
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/accounts/api/me"):
+            return httpx.Response(200, json={"user": {"id": USERS[request.headers["Authorization"]]}})
+        self.posts += 1
+        fail, self.fail = self.fail, None
+        if fail is asyncio.sleep:
+            await asyncio.sleep(10)
+        elif fail is not None:
+            raise fail("simulated", request=request)
+        return httpx.Response(201, json={"id": self.posts, "clientId": "cid", "clientSecret": "s3cret"})
+
+
+@pytest.fixture
+def create_application(data_dir, tools, anypoint):
+    server = _Anypoint()
+    anypoint(server)
+    tool = tools(exchange_tools)["create_application"]
+
+    async def create(token="alice-token", key="k1", **arguments):
+        return await tool(
+            token=token, org_id="o", api_instance_id="1", app_name="app", description="d",
+            idempotency_key=key, **arguments
+        )
+
+    return server, create
+
+
+def test_replay_is_scoped_to_the_caller_and_stores_no_secrets(create_application, tmp_path):
+    server, create = create_application
+
+    first = asyncio.run(create())
+    assert first["clientSecret"] == "s3cret"
+
+    replay = asyncio.run(create(token="alice-refreshed"))
+    assert replay["idempotent_replay"] == "stored"
+    assert replay["id"] == first["id"] and "clientSecret" not in replay
+
+    other = asyncio.run(create(token="bob-token"))
+    assert "idempotent_replay" not in other and other["id"] != first["id"]
+    assert server.posts == 2
+
+    assert b"s3cret" not in (tmp_path / "idempotency" / "results.db").read_bytes()
+
+
+def test_timed_out_write_reserves_the_key(create_application):
+    server, create = create_application
+
+    server.fail = httpx.ReadTimeout
+    assert asyncio.run(create())["status"] == "error"
+
+    retry = asyncio.run(create())
+    assert retry["outcome"] == "unknown" and retry["writes"][0]["method"] == "POST"
+    assert server.posts == 1
+
+
+def test_cancelled_write_reserves_the_key(create_application):
+    server, create = create_application
+
+    server.fail = asyncio.sleep
+    with pytest.raises(TimeoutError):
+        asyncio.run(asyncio.wait_for(create(), 0.2))
+
+    assert asyncio.run(create())["outcome"] == "unknown"
+    assert server.posts == 1
+
+
+def test_write_that_never_left_can_be_retried(create_application):
+    server, create = create_application
+
+    server.fail = httpx.ConnectError
+    assert asyncio.run(create())["status"] == "error"
+
+    retry = asyncio.run(create())
+    assert retry["id"] == 2 and "idempotent_replay" not in retry
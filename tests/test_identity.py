@@ -0,0 +1,38 @@
+import asyncio
+
+from tools import identity
+
+
+def test_expired_and_least_recently_used_entries_are_dropped(monkeypatch):
+    monkeypatch.setattr(identity, "_entries", identity.OrderedDict())
+    monkeypatch.setattr(identity, "IDENTITY_CACHE_SIZE", 3)
+
+    async def scenario():
+        async def load():
+            return {"org_id": "o"}
+
+        monkeypatch.setattr(identity, "IDENTITY_TTL", -1.0)
+        await identity._cached(("expired-token", "session"), load)
+        monkeypatch.setattr(identity, "IDENTITY_TTL", 300.0)
+        for index in range(4):
+            await identity._cached((f"token{index}", "session"), load)
+        await identity._cached(("token1", "session"), load)  # hit: now most recently used
+        await identity._cached(("token4", "session"), load)
+
+    asyncio.run(scenario())
+    assert list(identity._entries) == [("token3", "session"), ("token1", "session"), ("token4", "session")]
+
+
+def test_empty_org_id_with_a_bad_token_reaches_the_tool(monkeypatch):
+    monkeypatch.setattr(identity, "_entries", identity.OrderedDict())
+
+    async def session(token, refresh=False):
+        raise RuntimeError("401 Unauthorized")
+
+    monkeypatch.setattr(identity, "session", session)
+
+    async def tool(token: str, org_id: str) -> dict:
+        return {"status": "error", "message": f"tool saw org_id={org_id!r}"}
+
+    result = asyncio.run(identity._resolving("tool", tool)(token="bad", org_id=""))
+    assert result == {"status": "error", "message": "tool saw org_id=''"}
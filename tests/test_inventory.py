@@ -0,0 +1,90 @@
+import asyncio
+
+import httpx
+
+from tools import inventory_tools
+
+
+class Anypoint:
+    """
+    Two environments with one API instance each; sub-resources answer with ETags.
+    """
+
+    def __init__(self):
+        self.contracts = [{"id": 1, "application": {"id": 7, "name": "Billing"}}]
+        self.failing_env = None
+        self.conditional = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/accounts/api/me":
+            return httpx.Response(200, json={"user": {"id": request.headers["Authorization"].removeprefix("Bearer ")}})
+        if path.endswith("/environments"):
+            return httpx.Response(200, json={"data": [{"id": "dev", "name": "Dev"}, {"id": "prod", "name": "Prod"}]})
+        if path.endswith("/apis"):
+            env_id = path.split("/")[-2]
+            if env_id == self.failing_env:
+                return httpx.Response(500)
+            return httpx.Response(200, json={"assets": [{"groupId": "g", "assetId": "a", "apis": [{"id": f"{env_id}-1"}]}]})
+        body = {"contracts": self.contracts} if path.endswith("/contracts") else {}
+        etag = f'"{hash(repr(body))}"'
+        if request.headers.get("If-None-Match"):
+            self.conditional.append(path)
+            if request.headers["If-None-Match"] == etag:
+                return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, json=body, headers={"ETag": etag})
+
+
+def test_partial_crawl_keeps_other_environments(tools, anypoint, data_dir):
+    anypoint(Anypoint())
+    snapshot = tools(inventory_tools)["snapshot_api_inventory"]
+
+    full = asyncio.run(snapshot(token="alice", org_id="partial-org"))
+    assert full["instances"] == 2
+
+    for full_refresh in (False, True):
+        partial = asyncio.run(snapshot(token="alice", org_id="partial-org", env_ids=["dev"], full_refresh=full_refresh))
+        assert partial["instances"] == 2
+
+        stored = inventory_tools.load_snapshot("user:alice", "partial-org")
+        assert set(stored["environments"]) == {"dev", "prod"}
+        assert set(stored["instances"]) == {"dev-1", "prod-1"}
+
+
+def test_sub_resources_are_revalidated_on_every_snapshot(tools, anypoint, data_dir):
+    upstream = Anypoint()
+    anypoint(upstream)
+    registered = tools(inventory_tools)
+    snapshot, query = registered["snapshot_api_inventory"], registered["query_api_inventory"]
+
+    asyncio.run(snapshot(token="alice", org_id="org"))
+    unchanged = asyncio.run(snapshot(token="alice", org_id="org"))
+    assert (unchanged["reused"], unchanged["not_modified"]) == (2, 6)
+
+    # A new contract does not change the instance listing
+    upstream.contracts.append({"id": 2, "application": {"id": 8, "name": "Shipping"}})
+    changed = asyncio.run(snapshot(token="alice", org_id="org"))
+    assert (changed["reused"], changed["refreshed"], changed["not_modified"]) == (0, 2, 4)
+    assert asyncio.run(query(token="alice", org_id="org", application="Shipping"))["count"] == 2
+
+
+def test_full_refresh_keeps_rows_of_an_environment_whose_listing_failed(tools, anypoint, data_dir):
+    upstream = Anypoint()
+    anypoint(upstream)
+    snapshot = tools(inventory_tools)["snapshot_api_inventory"]
+
+    asyncio.run(snapshot(token="alice", org_id="org"))
+    upstream.failing_env = "prod"
+    result = asyncio.run(snapshot(token="alice", org_id="org", full_refresh=True))
+    assert result["status"] == "partial_success"
+    assert set(inventory_tools.load_snapshot("user:alice", "org")["instances"]) == {"dev-1", "prod-1"}
+
+
+def test_inventory_is_only_readable_by_its_owner(tools, anypoint, data_dir):
+    anypoint(Anypoint())
+    registered = tools(inventory_tools)
+
+    asyncio.run(registered["snapshot_api_inventory"](token="alice", org_id="org"))
+    assert asyncio.run(registered["query_api_inventory"](token="alice", org_id="org"))["count"] == 2
+    other = asyncio.run(registered["query_api_inventory"](token="bob", org_id="org"))
+    assert other["status"] == "error" and "No inventory snapshot" in other["message"]
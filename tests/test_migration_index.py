@@ -0,0 +1,54 @@
+import asyncio
+
+from tools import migration_index
+
+
+def test_stop_cancels_the_watcher(tmp_path, monkeypatch):
+    monkeypatch.setattr(migration_index, "UPLOADS_DIR", tmp_path / "missing")
+
+    async def scenario():
+        await migration_index.start()
+        task, _ = migration_index._watchers[asyncio.get_running_loop()]
+        assert not task.done()
+
+        await migration_index.stop()
+        assert task.cancelled()
+        assert asyncio.get_running_loop() not in migration_index._watchers
+
+        await migration_index.stop()  # no watcher: nothing to do
+
+    asyncio.run(scenario())
+
+
+def _migration(uploads, migration_id: str, files: dict):
+    root = uploads / f"{migration_index.FOLDER_PREFIX}{migration_id}" / migration_index.SPECS_DIR
+    for path, text in files.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(text)
+
+
+def test_search_matches_percent_and_underscore_literally(tmp_path, monkeypatch, data_dir):
+    monkeypatch.setattr(migration_index, "UPLOADS_DIR", tmp_path / "uploads")
+    _migration(tmp_path / "uploads", "1", {
+        "order_api.raml": "#%RAML 1.0\ntitle: Orders 100%\n/orders:\n",
+        "orderXapi.raml": "#%RAML 1.0\ntitle: Orders 1000\n/order_lines:\n",
+    })
+    migration_index.scan()
+
+    assert [spec["path"] for spec in migration_index.search(query="order_a")] == ["order_api.raml"]
+    assert [spec["title"] for spec in migration_index.search(query="100%")] == ["Orders 100%"]
+    assert [spec["path"] for spec in migration_index.search(resource="/order_")] == ["orderXapi.raml"]
+
+
+def test_ready_without_the_watcher_rescans_only_every_poll_interval(tmp_path, monkeypatch, data_dir):
+    monkeypatch.setattr(migration_index, "UPLOADS_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(migration_index, "WATCH_ENABLED", False)
+    monkeypatch.setattr(migration_index, "state", dict(migration_index.state, last_scan=None, scans=0))
+
+    asyncio.run(migration_index.ready())
+    asyncio.run(migration_index.ready())
+    assert migration_index.state["scans"] == 1
+
+    monkeypatch.setattr(migration_index, "POLL_INTERVAL", 0)
+    asyncio.run(migration_index.ready())
+    assert migration_index.state["scans"] == 2
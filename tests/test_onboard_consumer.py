@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+import httpx
+
+from tools import exchange_tools
+
+
+def _anypoint(request: httpx.Request) -> httpx.Response:
+    if request.method == "POST" and request.url.path.endswith("/contracts"):
+        api_id = json.loads(request.content)["apiId"]
+        if api_id == "2":
+            return httpx.Response(409, json={"message": "Contract already present"})
+        if api_id == "3":
+            # A "409" in the text of another error must not read as "exists"
+            return httpx.Response(500, json={"message": "409 tiers went missing"})
+        return httpx.Response(201, json={"id": 77, "status": "APPROVED"})
+    return httpx.Response(404)
+
+
+def test_malformed_contracts_are_reported_per_entry(tools, anypoint):
+    anypoint(_anypoint)
+    onboard = tools(exchange_tools)["onboard_consumer"]
+
+    contract = {"asset_id": "orders-api", "asset_version": "1.0.0"}
+    result = asyncio.run(onboard(token="t", org_id="o", app_name="app", app_id="app-1", contracts=[
+        dict(contract, instance_id="1"),
+        {"asset_id": "orders-api"},
+        "not a contract",
+        dict(contract, instance_id="2"),
+        dict(contract, instance_id="3"),
+    ]))
+
+    statuses = [entry["status"] for entry in result["contracts"]]
+    assert statuses == ["success", "error", "error", "exists", "error"]
+    assert result["contracts"][1]["message"] == "Missing instance_id, asset_version"
+    assert result["contracts"][2]["index"] == 2
+    assert (result["succeeded"], result["existing"], result["failed"]) == (1, 1, 3)
+    assert result["status"] == "partial_success"
+
+
+def test_only_malformed_contracts_fail_without_touching_anypoint(tools, anypoint):
+    anypoint(lambda request: 1 / 0)
+
+    result = asyncio.run(tools(exchange_tools)["onboard_consumer"](token="t", org_id="o", app_name="app", contracts=[{}]))
+    assert result["status"] == "error"
+    assert result["contracts"] == [{"index": 0, "status": "error", "message": "Missing instance_id, asset_id, asset_version"}]
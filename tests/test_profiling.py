@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from mcp.server.fastmcp import FastMCP
+
+import http_server
+from tools import profiling
+
+
+@pytest.fixture(autouse=True)
+def fresh_session(monkeypatch, data_dir):
+    monkeypatch.setattr(profiling, "_session", None)
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", "admin")
+
+
+def _mcp() -> FastMCP:
+    mcp = FastMCP("test")
+
+    @mcp.tool()
+    async def busy(n: int) -> int:
+        return sum(i * i for i in range(n))
+
+    return mcp
+
+
+def test_profiles_the_requested_calls_then_restores_the_tool():
+    mcp = _mcp()
+    tool = mcp._tool_manager.get_tool("busy")
+    original = tool.fn
+
+    armed = profiling.profile(mcp, "busy", calls=2, limit=5)
+    assert (armed["status"], armed["calls"]) == ("armed", 2)
+    assert tool.fn is not original
+
+    async def scenario():
+        for _ in range(3):
+            assert await mcp._tool_manager.call_tool("busy", {"n": 1000}) == sum(i * i for i in range(1000))
+        return await profiling.profile_status()
+
+    status = asyncio.run(scenario())
+    assert (status["status"], status["profiled_calls"]) == ("done", 2)
+    assert tool.fn is original
+    assert 0 < len(status["report"]["functions"]) <= 5
+    assert status["report"]["profile_path"].endswith(".prof")
+
+
+def test_cancel_reports_what_was_profiled():
+    mcp = _mcp()
+    profiling.profile(mcp, "busy", calls=3, mode="sample", interval=0.001)
+    cancelled = profiling.cancel()
+    assert (cancelled["status"], cancelled["profiled_calls"]) == ("cancelled", 0)
+    assert cancelled["report"]["samples"] == 0
+    assert mcp._tool_manager.get_tool("busy").fn.__name__ == "busy"
+
+
+@pytest.mark.parametrize("options, message", [
+    ({"calls": "many"}, "calls and limit must be integers"),
+    ({"limit": 2.5}, "calls and limit must be integers"),
+    ({"calls": None}, "calls and limit must be integers"),
+    ({"interval": "fast"}, "calls and limit must be integers"),
+    ({"mode": "trace"}, "mode must be one of"),
+    ({"sort": "size"}, "Unknown sort key"),
+])
+def test_invalid_options_are_rejected_without_arming(options, message):
+    result = profiling.profile(_mcp(), "busy", **options)
+    assert result["status"] == "error" and result["message"].startswith(message)
+    assert profiling._session is None
+
+
+def test_admin_endpoint_answers_400_for_invalid_options():
+    client = TestClient(http_server.app)
+    tool = http_server.mcp._tool_manager.list_tools()[0].name
+
+    assert client.post("/admin/profile", json={"tool": tool}).status_code == 401
+    rejected = client.post("/admin/profile", json={"tool": tool, "calls": "x"}, headers={"X-Admin-Token": "admin"})
+    assert rejected.status_code == 400
+    assert rejected.json()["status"] == "error"
+    unknown = client.post("/admin/profile", json={"tool": "nope"}, headers={"X-Admin-Token": "admin"})
+    assert unknown.status_code == 400
+    assert client.post("/admin/memory/start", json={"frames": "deep"}, headers={"X-Admin-Token": "admin"}).status_code == 400
+
+    armed = client.post("/admin/profile", json={"tool": tool, "limit": 10}, headers={"X-Admin-Token": "admin"})
+    assert armed.status_code == 200 and armed.json()["status"] == "armed"
+    assert client.delete("/admin/profile", headers={"X-Admin-Token": "admin"}).json()["status"] == "cancelled"
@@ -0,0 +1,58 @@
+import json
+import random
+
+import pytest
+
+from tools import projection
+from tools.exchange_tools import ASSET_DETAIL_SUMMARY_FIELDS
+
+
+def test_object_valued_leaf_is_kept_whole():
+    raw = json.dumps({
+        "assetId": "orders",
+        "labels": ["dropped"],
+        "dependencies": [
+            {"groupId": "g", "assetId": "d", "version": "1", "minorVersion": "1.0", "organization": {"id": "o", "name": "Acme"}},
+        ],
+        "files": [{"classifier": "fat-raml", "packaging": "zip", "md5": "dropped", "downloadURL": "https://x"}],
+    })
+
+    projected = projection.loads(raw, ASSET_DETAIL_SUMMARY_FIELDS)
+
+    assert projected["dependencies"] == [
+        {"groupId": "g", "assetId": "d", "version": "1", "minorVersion": "1.0", "organization": {"id": "o", "name": "Acme"}},
+    ]
+    assert projected["files"] == [{"classifier": "fat-raml", "packaging": "zip", "downloadURL": "https://x"}]
+    assert "labels" not in projected
+
+
+def test_lists_are_projected_per_item():
+    raw = b'[{"a": {"b": 1, "c": 2}, "d": [1, 2]}, {"a": 5}, {"x": {"a": {"b": 3}}}]'
+
+    assert projection.loads(raw, ["a.b"]) == [{"a": {"b": 1}}, {"a": 5}, {}]
+
+
+def test_matches_projection_of_fully_parsed_data():
+    rng = random.Random(7)
+
+    def value(depth):
+        kind = rng.choice(["int", "str", "list", "dict"] if depth < 4 else ["int", "str"])
+        if kind == "int":
+            return rng.randint(-5, 5)
+        if kind == "str":
+            return rng.choice(["a", 'b"q', "ü", ""])
+        if kind == "list":
+            return [value(depth + 1) for _ in range(rng.randint(0, 3))]
+        return {rng.choice("abcde"): value(depth + 1) for _ in range(rng.randint(0, 4))}
+
+    fields = ["a", "b.c", "b.d.e", "c.a", "e"]
+    for _ in range(300):
+        data = value(0)
+        raw = json.dumps(data, indent=rng.choice([None, 2]))
+        assert projection.loads(raw, fields) == projection.select(data, fields)
+
+
+def test_malformed_json_raises():
+    for raw in ('{"a": 1,}', '[{"a": 1} {"a": 2}]', '{"a": 1} x', '{a: 1}'):
+        with pytest.raises(json.JSONDecodeError):
+            projection.loads(raw, ["a"])
@@ -0,0 +1,54 @@
+import asyncio
+import io
+import json
+import zipfile
+
+import httpx
+
+from tools import raml_tools, spill
+
+
+def _zip(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, text in files.items():
+            archive.writestr(name, text)
+    return buffer.getvalue()
+
+
+def _exchange(files: list, downloads: dict):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/asset"):
+            return httpx.Response(200, json={"type": "rest-api", "name": "ignored", "files": files})
+        return httpx.Response(200, content=downloads[request.url.path])
+    return handler
+
+
+def test_fat_raml_main_file_is_read_from_the_zip(tools, anypoint):
+    files = [
+        {"classifier": "oas", "packaging": "json", "downloadURL": "https://files.test/oas.json"},
+        {"classifier": "fat-raml", "packaging": "zip", "mainFile": "orders.raml", "downloadURL": "https://files.test/fat.zip"},
+    ]
+    anypoint(_exchange(files, {"/fat.zip": _zip({"orders.raml": "#%RAML 1.0\ntitle: Orders\n", "types/order.raml": "type: object"})}))
+    get_raml = tools(raml_tools)["get_raml_from_asset"]
+
+    spec = asyncio.run(get_raml(token="t", org_id="o", group_id="g", asset_id="orders", version="1.0.0"))
+    assert spec == "#%RAML 1.0\ntitle: Orders\n"
+
+    fragment = asyncio.run(get_raml(token="t", org_id="o", group_id="g", asset_id="orders", version="1.0.0", main_file="types/order.raml"))
+    assert fragment == "type: object"
+
+
+def test_single_file_packaging_and_missing_classifier(tools, anypoint, monkeypatch, data_dir):
+    files = [{"classifier": "oas", "packaging": "json", "downloadURL": "https://files.test/oas.json"}]
+    anypoint(_exchange(files, {"/oas.json": b'{"openapi": "3.0.0"}'}))
+    get_raml = tools(raml_tools)["get_raml_from_asset"]
+    arguments = dict(token="t", org_id="o", group_id="g", asset_id="orders", version="1.0.0")
+
+    assert asyncio.run(get_raml(**arguments, classifier="oas")) == '{"openapi": "3.0.0"}'
+
+    missing = asyncio.run(get_raml(**arguments))
+    assert missing.startswith("No 'fat-raml' file") and "['oas']" in missing
+
+    monkeypatch.setattr(spill, "SPILL_THRESHOLD", 10)
+    assert json.loads(asyncio.run(get_raml(**arguments, classifier="oas")))["spilled"]
@@ -0,0 +1,67 @@
+import threading
+
+from tools import raml_model
+from tools.raml_model import Include, parse_yaml
+
+
+def test_block_scalars_keep_lines_and_end_at_the_parent_indent():
+    tree = parse_yaml("description: |\n  Line one\n  Line two\n\n  After blank\ntitle: T\nsummary: >-\n  a\n  b\nx: 1\n")
+    assert tree == {"description": "Line one\nLine two\n\nAfter blank", "title": "T", "summary": "a\nb", "x": "1"}
+
+
+def test_flow_sequences_are_split_and_flow_maps_kept_as_text():
+    tree = parse_yaml("is: [paged, secured]\nprotocols: [ HTTP , HTTPS ]\nempty: []\nexample: {a: 1, b: 2}\n")
+    assert tree == {"is": ["paged", "secured"], "protocols": ["HTTP", "HTTPS"], "empty": [], "example": "{a: 1, b: 2}"}
+
+
+def test_includes_become_markers_in_mappings_and_sequences():
+    tree = parse_yaml("types:\n  Order: !include types/order.raml\n  list:\n    - !include a.raml\n    - b\n")
+    order, (first, second) = tree["types"]["Order"], tree["types"]["list"]
+    assert isinstance(order, Include) and order.path == "types/order.raml"
+    assert isinstance(first, Include) and first.path == "a.raml"
+    assert second == "b"
+
+
+def test_comments_are_dropped_outside_quotes_and_urls():
+    tree = parse_yaml("#%RAML 1.0\n# top\ntitle: Orders # trailing\nurl: http://x/#frag\nq: 'a # not comment'\n")
+    assert tree == {"title": "Orders", "url": "http://x/#frag", "q": "a # not comment"}
+
+
+def test_sequences_of_mappings_and_quoted_keys():
+    tree = parse_yaml("traits:\n  - paged:\n      queryParameters:\n        limit: integer\n  - b: 1\n    c: 2\n'/orders': x\n")
+    assert tree == {"traits": [{"paged": {"queryParameters": {"limit": "integer"}}}, {"b": "1", "c": "2"}], "/orders": "x"}
+
+
+def test_malformed_input_is_read_best_effort_without_raising():
+    assert parse_yaml("") == {}
+    assert parse_yaml("just text") == {}
+    tree = parse_yaml("title Orders\nversion: v1\n    stray continuation\nkey: [unterminated\n\"open: x\n")
+    assert tree == {"version": "v1", "key": "[unterminated"}
+
+
+def test_concurrent_loads_keep_the_caches_and_stats_consistent(tmp_path, monkeypatch):
+    monkeypatch.setattr(raml_model, "_parsed", raml_model.OrderedDict())
+    monkeypatch.setattr(raml_model, "_models", raml_model.OrderedDict())
+    monkeypatch.setattr(raml_model, "stats", dict.fromkeys(raml_model.stats, 0))
+    monkeypatch.setattr(raml_model, "MODELS_CACHE", 4)
+    for index in range(16):
+        (tmp_path / f"api{index}.raml").write_text(f"#%RAML 1.0\ntitle: API {index}\n/items{index}:\n  get:\n")
+    source = raml_model.FolderSource(tmp_path)
+    errors = []
+
+    def worker(offset):
+        try:
+            for round_number in range(50):
+                raml_model.load_model(source, f"api{(offset + round_number) % 16}.raml")
+        except Exception as exc:  # e.g. "OrderedDict mutated during iteration"
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert raml_model.stats["model_hits"] + raml_model.stats["model_misses"] == 8 * 50
+    assert len(raml_model._models) <= 4
@@ -0,0 +1,107 @@
+import asyncio
+
+import httpx
+import pytest
+
+from tools import api_manager_tools, reconcile
+from tools.reconcile import DEFAULT_POLICY_GROUP_ID
+
+CLIENT_ID = {"id": 11, "groupId": DEFAULT_POLICY_GROUP_ID, "assetId": "client-id-enforcement", "assetVersion": "1.3.3",
+             "configurationData": {"clientIdExpression": "#[id]"}, "pointcutData": None, "order": 1, "disabled": False}
+HEADER_A = dict(CLIENT_ID, id=21, assetId="header-injection", configurationData={"header": "a"})
+HEADER_B = dict(CLIENT_ID, id=22, assetId="header-injection", configurationData={"header": "b"})
+GOLD = {"id": 5, "name": "Gold", "description": "", "status": "ACTIVE", "autoApprove": False,
+        "limits": [{"maximumRequests": 100, "timePeriodInMilliseconds": 60000, "visible": True}]}
+
+
+def _actions(actions: list) -> list:
+    return [(action["action"], action["key"], action.get("id"), action.get("changes")) for action in actions]
+
+
+@pytest.mark.parametrize("desired, current, prune, expected", [
+    # create
+    ([{"assetId": "client-id-enforcement"}], [], False, [("create", "client-id-enforcement", None, None)]),
+    # no-op: only mentioned fields are compared
+    ([{"assetId": "client-id-enforcement", "assetVersion": "1.3.3"}], [CLIENT_ID], False, []),
+    # update
+    ([{"assetId": "client-id-enforcement", "assetVersion": "1.4.0"}], [CLIENT_ID], False,
+     [("update", "client-id-enforcement", 11, ["assetVersion"])]),
+    # extra applied policies are kept without prune, deleted with it
+    ([], [CLIENT_ID], False, []),
+    ([], [CLIENT_ID], True, [("delete", "client-id-enforcement", 11, None)]),
+    # two applied copies of one policy: each desired entry takes the copy it already matches
+    ([{"assetId": "header-injection", "configurationData": {"header": "b"}},
+      {"assetId": "header-injection", "configurationData": {"header": "a"}}], [HEADER_A, HEADER_B], True, []),
+    # one desired copy of two applied: the matching one stays, the other is pruned
+    ([{"assetId": "header-injection", "configurationData": {"header": "b"}}], [HEADER_A, HEADER_B], True,
+     [("delete", "header-injection", 21, None)]),
+    ([{"assetId": "header-injection", "configurationData": {"header": "c"}}], [HEADER_A, HEADER_B], False,
+     [("update", "header-injection", 21, ["configurationData"])]),
+])
+def test_plan_policies(desired, current, prune, expected):
+    assert _actions(reconcile.plan_policies("42", desired, current, prune)) == expected
+
+
+def test_created_policies_default_to_the_mulesoft_group():
+    (action,) = reconcile.plan_policies("42", [{"assetId": "client-id-enforcement"}], [])
+    assert action["payload"] == {"assetId": "client-id-enforcement", "groupId": DEFAULT_POLICY_GROUP_ID}
+
+
+@pytest.mark.parametrize("desired, current, prune, expected", [
+    ([{"name": "Gold"}], [], False, [("create", "Gold", None, None)]),
+    ([{"name": "Gold", "status": "ACTIVE"}], [GOLD], False, []),
+    # limits compare in any order
+    ([{"name": "Gold", "limits": list(reversed(GOLD["limits"] + [{"maximumRequests": 10, "timePeriodInMilliseconds": 1000, "visible": True}]))}],
+     [dict(GOLD, limits=GOLD["limits"] + [{"maximumRequests": 10, "timePeriodInMilliseconds": 1000, "visible": True}])], False, []),
+    ([{"name": "Gold", "limits": [{"maximumRequests": 200, "timePeriodInMilliseconds": 60000, "visible": True}]}], [GOLD], False,
+     [("update", "Gold", 5, ["limits"])]),
+    ([{"name": "Silver"}], [GOLD], True, [("create", "Silver", None, None), ("delete", "Gold", 5, None)]),
+])
+def test_plan_tiers(desired, current, prune, expected):
+    assert _actions(reconcile.plan_tiers("42", desired, current, prune)) == expected
+
+
+def test_tier_updates_send_the_whole_tier():
+    (action,) = reconcile.plan_tiers("42", [{"name": "Gold", "autoApprove": True}], [GOLD])
+    assert action["payload"] == dict(GOLD, autoApprove=True, apiVersionId="42")
+
+
+@pytest.mark.parametrize("desired, current, expected", [
+    ({"a": 1}, {"a": 1, "b": 2}, True),
+    ({"a": 1}, {"b": 2}, False),
+    ({"a": {"x": 1}}, {"a": {"x": 1, "y": 2}}, True),
+    ([1, 2], [1, 2], True),
+    ([1, 2], [1, 2, 3], False),
+    (100, 100.0, True),
+    (True, 1, False),
+    (None, None, True),
+    ("1", 1, False),
+])
+def test_satisfies(desired, current, expected):
+    assert reconcile.satisfies(desired, current) is expected
+
+
+@pytest.mark.parametrize("state, problems", [
+    ({"policies": [{"assetId": "client-id-enforcement"}], "tiers": [{"name": "Gold"}]}, []),
+    ({"policies": [{"assetVersion": "1.3.3"}]}, ["policies[0] has no assetId"]),
+    ({"policies": ["client-id-enforcement"]}, ["policies[0] has no assetId"]),
+    ({"policies": [{"assetId": "x", "pointcutData": "all"}]}, ["policies[0].pointcutData must be a list of objects"]),
+    ({"tiers": {"name": "Gold"}}, ["tiers must be a list"]),
+    ({"tiers": [{"name": "Gold"}, {"name": "Gold"}]}, ["tier 'Gold' is listed more than once"]),
+    ([], ['the desired state must be an object with "policies" and/or "tiers"']),
+])
+def test_validate(state, problems):
+    assert reconcile.validate(state) == problems
+
+
+def test_invalid_desired_state_is_rejected_before_any_call(tools, anypoint):
+    requests = []
+    anypoint(lambda request: requests.append(request) or httpx.Response(200, json=[]))
+    reconcile_api_governance = tools(api_manager_tools)["reconcile_api_governance"]
+
+    result = asyncio.run(reconcile_api_governance(
+        token="t", org_id="o", env_id="e",
+        desired={"42": {"policies": [{"assetId": "client-id-enforcement"}]}, "43": {"policies": [{"order": 1}]}},
+    ))
+    assert result == {"status": "error", "message": "Invalid desired state: 43: policies[0] has no assetId"}
+    assert not requests
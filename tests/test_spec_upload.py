@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+
+from tools import designcentre_tools, raml_model
+
+
+def _write(root, path, text):
+    target = root / path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(text)
+
+
+def _specs(root):
+    _write(root, "orders.raml", "#%RAML 1.0\ntitle: Orders\nuses:\n  common: libraries/common.raml\ntypes:\n  Order: !include types/order.raml\n/orders:\n  get:\n    responses:\n      200:\n        body:\n          application/json:\n            example: !include examples/orders.json\n")
+    _write(root, "customers.raml", "#%RAML 1.0\ntitle: Customers\n/customers:\n  get:\n")
+    _write(root, "libraries/common.raml", "#%RAML 1.0 Library\ntypes:\n  Id: string\n")
+    _write(root, "types/order.raml", "#%RAML 1.0 DataType\ntype: object\n")
+    _write(root, "examples/orders.json", "[]")
+
+
+def test_spec_files_are_the_spec_and_what_it_references(tmp_path):
+    _specs(tmp_path)
+    source = raml_model.FolderSource(tmp_path)
+
+    assert raml_model.spec_files(source, "orders.raml") == [
+        "examples/orders.json", "libraries/common.raml", "orders.raml", "types/order.raml",
+    ]
+    assert raml_model.spec_files(source, "customers.raml") == ["customers.raml"]
+
+
+def test_upload_design_files_sends_only_the_listed_files(tmp_path, tools, anypoint):
+    _specs(tmp_path)
+    uploaded = []
+
+    def design_center(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            uploaded.extend(part.split('name="')[1].split('"')[0] for part in request.content.decode().split("\r\n") if 'name="' in part)
+            return httpx.Response(200, json={})
+        return httpx.Response(404)
+
+    anypoint(design_center)
+    upload = tools(designcentre_tools)["upload_design_files"]
+
+    result = asyncio.run(upload(
+        token="t", org_id="o", user_id="u", project_id="p1", folder_path=str(tmp_path), files=["customers.raml"]
+    ))
+    assert result.startswith("Upload successful: 1 files uploaded")
+    assert uploaded == ["customers.raml"]
+
+    missing = asyncio.run(upload(
+        token="t", org_id="o", user_id="u", project_id="p1", folder_path=str(tmp_path), files=["nope.raml"]
+    ))
+    assert missing.startswith("Error: Files not found")
+
+
+def test_upload_of_a_subset_keeps_the_rest_of_the_manifest(tmp_path, tools, anypoint, data_dir):
+    folder = tmp_path / "specs"
+    _specs(folder)
+    posts, deletes = [], []
+
+    def design_center(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            posts.append(request)
+            return httpx.Response(200, json={})
+        if request.method == "DELETE":
+            deletes.append(request.url.path)
+            return httpx.Response(204)
+        return httpx.Response(404)
+
+    anypoint(design_center)
+    upload = tools(designcentre_tools)["upload_design_files"]
+    arguments = dict(token="t", org_id="o", user_id="u", project_id="p1", folder_path=str(folder))
+
+    assert asyncio.run(upload(**arguments)).startswith("Upload successful: 5 files uploaded")
+    (folder / "customers.raml").write_text("#%RAML 1.0\ntitle: Customers v2\n")
+
+    subset = asyncio.run(upload(**arguments, files=["customers.raml"], delete_removed=True))
+    assert subset.startswith("Upload successful: 1 files uploaded")
+    assert ", 0 deleted" in subset and not deletes
+
+    # The other four files are still known, so a full sync has nothing to send
+    assert asyncio.run(upload(**arguments)).startswith("No changes to upload: 0 files uploaded")
+    assert len(posts) == 2
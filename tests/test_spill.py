@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from tools import spill
+
+
+@pytest.fixture(autouse=True)
+def small_spills(monkeypatch, data_dir):
+    monkeypatch.setattr(spill, "SPILL_THRESHOLD", 100)
+    monkeypatch.setattr(spill, "PAGE_SIZE", 64)
+
+
+def test_small_results_are_returned_unchanged():
+    assert spill.maybe_spill("tool", "x" * 100) == "x" * 100
+
+
+def test_large_results_are_read_back_in_pages_and_ranges():
+    text = "é" * 40 + "a" * 100  # 180 bytes, multi-byte characters first
+    summary = json.loads(spill.maybe_spill("tool", text))
+    spill_id = summary["uri"].removeprefix("spill://")
+    assert summary["spilled"] and summary["bytes"] == 180 and summary["pages"] == 3
+    assert summary["preview"] == text[: spill.PREVIEW_CHARS]
+
+    assert "".join(spill.read_page(spill_id, page) for page in range(3)) == text
+    # Ranges never split a character: both ends move forward to a character boundary
+    assert spill.read_range(spill_id, 1, 4) == "éé"
+    assert spill.info(spill_id)["tool"] == "tool"
+
+
+def test_expired_results_are_purged(monkeypatch):
+    monkeypatch.setattr(spill, "SPILL_TTL", -1)
+    spill_id = json.loads(spill.maybe_spill("tool", "x" * 200))["uri"].removeprefix("spill://")
+    with pytest.raises(ValueError, match="expired"):
+        spill.read_page(spill_id, 0)
+
+    spill.purge_expired()
+    assert not list(spill._dir().iterdir())
+
+
+def test_spill_ids_cannot_escape_the_store():
+    with pytest.raises(ValueError, match="Invalid spill id"):
+        spill.read_page("../secrets", 0)
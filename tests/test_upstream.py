@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import httpx
+
+from tools import upstream
+from tools.upstream import BULK, INTERACTIVE, FairScheduler
+
+SERVICE_TIME = 0.01  # seconds the mock upstream takes per request
+
+
+def p99(samples: list) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+async def _mock_upstream(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(SERVICE_TIME)
+    return httpx.Response(200, json={"ok": True})
+
+
+def test_small_org_p99_stays_bounded_while_another_org_floods(monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(upstream, "scheduler", FairScheduler(max_concurrency=10))
+        mock = httpx.MockTransport(_mock_upstream)
+        monkeypatch.setattr(upstream, "shared_transport", lambda: mock)
+
+        async def flood():
+            async with upstream.client("big-org") as client:
+                with upstream.lane(BULK):
+                    await asyncio.gather(*(client.post("https://upstream.test/write") for _ in range(1000)))
+
+        latencies = []
+
+        async def small_tenant():
+            await asyncio.sleep(0.05)  # let the flood fill the queue first
+            async with upstream.client("small-org") as client:
+                with upstream.lane(BULK):
+                    for _ in range(30):
+                        started = time.monotonic()
+                        resp = await client.post("https://upstream.test/write")
+                        latencies.append(time.monotonic() - started)
+                        assert resp.status_code == 200
+
+        flood_task = asyncio.ensure_future(flood())
+        await small_tenant()
+        flood_done = flood_task.done()
+        await flood_task
+        return latencies, flood_done
+
+    latencies, flood_done = asyncio.run(scenario())
+
+    # 1000 requests at 10 in flight take ~1s; the small org waits about one
+    # service time per request instead of behind the whole backlog
+    assert not flood_done
+    assert p99(latencies) < 10 * SERVICE_TIME
+
+
+def test_bulk_keeps_a_minimum_share_under_constant_interactive_load():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=2, bulk_min_share=0.2)
+        finished = {INTERACTIVE: 0, BULK: 0}
+        stop = asyncio.Event()
+
+        async def request(lane):
+            async with scheduler.slot("org", lane):
+                await asyncio.sleep(0.001)
+            finished[lane] += 1
+
+        async def reader():
+            # Keeps the interactive lane permanently non-empty
+            while not stop.is_set():
+                await request(INTERACTIVE)
+
+        readers = [asyncio.ensure_future(reader()) for _ in range(20)]
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(asyncio.gather(*(request(BULK) for _ in range(20))), timeout=5)
+        stop.set()
+        await asyncio.gather(*readers)
+        return finished
+
+    finished = asyncio.run(scenario())
+    assert finished[BULK] == 20
+    assert finished[INTERACTIVE] > finished[BULK]
+
+
+def test_strict_priority_when_bulk_share_is_zero():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1, bulk_min_share=0)
+        order = []
+        await scheduler.acquire("org", INTERACTIVE)  # occupy the only slot
+
+        async def request(name, lane):
+            async with scheduler.slot("org", lane):
+                order.append(name)
+
+        tasks = [asyncio.ensure_future(request("bulk", BULK))]
+        tasks += [asyncio.ensure_future(request(f"read{i}", INTERACTIVE)) for i in range(3)]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["read0", "read1", "read2", "bulk"]
@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+from tools import accounts_tools, warmup
+
+
+class _ToolManager:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, name, arguments):
+        self.calls.append(name)
+        if name == "get_token":
+            return json.dumps({"access_token": f"token-for-{arguments['client_id']}"})
+        return {"data": []}
+
+
+class _MCP:
+    def __init__(self):
+        self._tool_manager = _ToolManager()
+
+
+def test_ready_steps_do_not_name_clients_or_orgs(monkeypatch):
+    async def connected():
+        return None
+
+    monkeypatch.setattr(warmup, "_connect", connected)
+    monkeypatch.setattr(warmup, "WARMUP_CLIENTS", "secret-client-id:s3cret,other-client:pw")
+    monkeypatch.setattr(warmup, "WARMUP_ORGS", "org-1234")
+    monkeypatch.setattr(warmup, "state", {"ready": False, "steps": {}})
+
+    asyncio.run(warmup._warm(_MCP()))
+
+    steps = warmup.state["steps"]
+    assert set(steps) == {"connect", "token:1", "token:2", "environments:1"}
+    assert "secret-client-id" not in json.dumps(warmup.state)
+    assert "org-1234" not in json.dumps(warmup.state)
+
+
+def test_token_cache_is_bounded_and_drops_expired(monkeypatch):
+    monkeypatch.setattr(accounts_tools, "TOKEN_CACHE_SIZE", 3)
+    monkeypatch.setattr(accounts_tools, "_token_cache", accounts_tools.OrderedDict())
+
+    accounts_tools._remember_token("expired", 0.0, "old")
+    for index in range(5):
+        accounts_tools._remember_token(f"key{index}", float("inf"), "tok")
+
+    assert list(accounts_tools._token_cache) == ["key2", "key3", "key4"]
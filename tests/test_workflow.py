@@ -0,0 +1,143 @@
+import asyncio
+
+from tools import workflow, workflow_tools
+from tools.workflow import StepFailed
+
+
+def _step(log: list, name: str, seconds: float = 0.0, fail: bool = False):
+    async def fn(results):
+        log.append((name, sorted(results)))
+        await asyncio.sleep(seconds)
+        if fail:
+            raise StepFailed(f"{name} failed")
+        return name.upper()
+    return fn
+
+
+def test_execute_runs_steps_after_their_dependencies():
+    log = []
+    steps = {
+        "publish": (("upload",), _step(log, "publish")),
+        "project": ((), _step(log, "project", 0.02)),
+        "environment": ((), _step(log, "environment")),
+        "upload": (("project",), _step(log, "upload")),
+        "instance": (("publish", "environment"), _step(log, "instance")),
+    }
+    run = asyncio.run(workflow.execute(steps))
+
+    assert run["status"] == "success"
+    assert run["results"] == {name: name.upper() for name in steps}
+    order = [name for name, _ in log]
+    assert order.index("project") < order.index("upload") < order.index("publish") < order.index("instance")
+    # Each step sees the results of everything it needs
+    assert dict(log)["instance"] == ["environment", "project", "publish", "upload"]
+    assert set(run["steps"]) == set(steps)
+
+
+def test_failure_skips_dependents_but_not_independent_steps():
+    log = []
+    run = asyncio.run(workflow.execute({
+        "project": ((), _step(log, "project", fail=True)),
+        "upload": (("project",), _step(log, "upload")),
+        "publish": (("upload",), _step(log, "publish")),
+        "environment": ((), _step(log, "environment")),
+    }))
+
+    assert run["status"] == "partial_success"
+    assert run["steps"]["project"] == {**run["steps"]["project"], "status": "error", "message": "project failed"}
+    assert run["steps"]["upload"]["status"] == "skipped" and "project" in run["steps"]["upload"]["message"]
+    assert run["steps"]["publish"]["status"] == "skipped"
+    assert run["steps"]["environment"]["status"] == "success"
+    assert [name for name, _ in log] == ["project", "environment"]
+
+
+def test_invalid_graphs_are_rejected_before_running():
+    log = []
+    unknown = asyncio.run(workflow.execute({"a": (("missing",), _step(log, "a"))}))
+    assert unknown == {"status": "error", "message": "Step 'a' needs unknown steps ['missing']"}
+    cycle = asyncio.run(workflow.execute({"a": (("b",), _step(log, "a")), "b": (("a",), _step(log, "b"))}))
+    assert cycle["status"] == "error" and "cycle" in cycle["message"]
+    assert not log
+
+
+def test_critical_path_follows_the_dependency_that_finished_last():
+    steps = {name: (needs, None) for name, needs in {
+        "project": (), "environment": (), "upload": ("project",), "publish": ("upload",),
+        "instance": ("publish", "environment"), "policy": ("instance",), "tier": ("instance",),
+    }.items()}
+    timings = {
+        "project": {"start": 0.0, "end": 1.0}, "environment": {"start": 0.0, "end": 0.5},
+        "upload": {"start": 1.0, "end": 2.0}, "publish": {"start": 2.0, "end": 3.0},
+        "instance": {"start": 3.0, "end": 4.0}, "policy": {"start": 4.0, "end": 4.5}, "tier": {"start": 4.0, "end": 5.0},
+    }
+    assert workflow.critical_path(steps, timings) == ["project", "upload", "publish", "instance", "tier"]
+
+    # Steps that never finished (skipped) are not on the path
+    timings["environment"] = {"start": 0.0, "end": 3.5}
+    del timings["tier"]
+    assert workflow.critical_path(steps, timings) == ["environment", "instance", "policy"]
+
+    # A dependent that ends within the same millisecond as its dependency still ends the path
+    timings["policy"] = {"start": 4.0, "end": 4.0}
+    assert workflow.critical_path(steps, timings) == ["environment", "instance", "policy"]
+    assert workflow.critical_path(steps, {}) == []
+
+
+def test_execute_reports_the_critical_path():
+    log = []
+    run = asyncio.run(workflow.execute({
+        "slow": ((), _step(log, "slow", 0.05)),
+        "fast": ((), _step(log, "fast")),
+        "last": (("slow", "fast"), _step(log, "last")),
+    }))
+    assert run["critical_path"] == ["slow", "last"]
+    assert run["step_seconds"] >= run["steps"]["slow"]["seconds"]
+
+
+def test_pipeline_moves_items_through_every_stage_and_drops_failures():
+    seen = []
+
+    async def create(item, results):
+        seen.append(("create", item))
+        if item == "bad":
+            raise StepFailed("no lock")
+        return f"project-{item}"
+
+    async def publish(item, results):
+        seen.append(("publish", item))
+        return results["create"] + "-published"
+
+    run = asyncio.run(workflow.pipeline(["a", "bad", "c"], [("create", create, 2), ("publish", publish, 1)], queue_size=1))
+
+    assert (run["status"], run["total"], run["succeeded"], run["failed"]) == ("partial_success", 3, 2, 1)
+    by_item = {report["item"]: report for report in run["reports"]}
+    assert by_item["a"]["results"] == {"create": "project-a", "publish": "project-a-published"}
+    assert by_item["bad"]["status"] == "error" and by_item["bad"]["failed_stage"] == "create"
+    assert by_item["bad"]["message"] == "no lock" and "publish" not in by_item["bad"]["stages"]
+    assert ("publish", "bad") not in seen
+    assert set(by_item["c"]["stages"]) == {"create", "publish"}
+
+
+def test_pipeline_bounds_each_stage_to_its_workers():
+    running, peak = [0], [0]
+
+    async def slow(item, results):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+
+    run = asyncio.run(workflow.pipeline(list(range(10)), [("slow", slow, 3)]))
+    assert run["succeeded"] == 10 and peak[0] == 3
+
+
+def test_run_api_workflow_rejects_duplicate_tier_names(tools):
+    run_api_workflow = tools(workflow_tools)["run_api_workflow"]
+    arguments = dict(
+        token="t", org_id="o", user_id="u", project_name="p", folder_path="/tmp", asset_id="a", version="1.0.0", env_id="e"
+    )
+
+    duplicate = asyncio.run(run_api_workflow(**arguments, tiers=[{"name": "Gold", "limits": []}, {"name": "Gold", "limits": []}]))
+    assert duplicate == {"status": "error", "message": "Tier names must be unique: ['Gold']"}
+    unnamed = asyncio.run(run_api_workflow(**arguments, tiers=[{"limits": []}]))
+    assert unnamed == {"status": "error", "message": "Every entry of tiers needs a name"}
@@ -1,4 +1,6 @@
+from . import deadline, identity, spill
 from . import accounts_tools, exchange_tools, login_tools, raml_tools, designcentre_tools, api_manager_tools, access_management_tools
+from . import design_session_tools, inventory_tools, workflow_tools
 
 
 def load_tools(mcp):
@@ -7,11 +9,23 @@ def load_tools(mcp):
     """
     login_tools.register(mcp)
     designcentre_tools.register(mcp)
+    design_session_tools.register(mcp)
     accounts_tools.register(mcp)
     exchange_tools.register(mcp)
     raml_tools.register(mcp)
     api_manager_tools.register(mcp)
     access_management_tools.register(mcp)
+    inventory_tools.register(mcp)
+    workflow_tools.register(mcp)
+
+    # spill:// resources for results too large to inline
+    spill.register(mcp)
+
+    # Names accepted wherever tools take org/environment/instance/project/asset IDs
+    identity.install(mcp)
+
+    # Every tool call runs inside a deadline scope
+    deadline.install(mcp)
 
     
     
@@ -1,7 +1,31 @@
-import httpx
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+from . import jsonutil, upstream
 
 ENV_URL = "https://anypoint.mulesoft.com/accounts/api/organizations/{org_id}/environments"
 
+# Environments rarely change, so listings are cached briefly per (token, org);
+# warmup.py preloads them for configured orgs at startup.
+ENV_CACHE_TTL = float(os.environ.get("ANYPOINT_ENV_CACHE_TTL", "300"))
+ENV_CACHE_SIZE = 256
+# key -> (expires_at, response body), least recently used first. The body is
+# decoded on every hit so callers never share (and mutate) one cached dict.
+_env_cache = OrderedDict()
+
+
+def _remember_environments(key: tuple, body: bytes):
+    now = time.monotonic()
+    for stale in [k for k, (expires, _) in _env_cache.items() if expires <= now]:
+        del _env_cache[stale]
+    _env_cache[key] = (now + ENV_CACHE_TTL, body)
+    _env_cache.move_to_end(key)
+    while len(_env_cache) > ENV_CACHE_SIZE:
+        _env_cache.popitem(last=False)
+
+
 # List Environments Tool
 
 def register(mcp):
@@ -11,6 +35,12 @@ def register(mcp):
         List all environments in an Anypoint organization and return their IDs.
         """
 
+        key = (hashlib.sha256(token.encode("utf-8")).hexdigest(), org_id)
+        cached = _env_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            _env_cache.move_to_end(key)
+            return jsonutil.loads(cached[1])
+
         url = ENV_URL.format(org_id=org_id)
 
         headers = {
@@ -18,10 +48,12 @@ def register(mcp):
             "Content-Type": "application/json"
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 resp = await client.get(url, headers=headers, timeout=40.0)
                 resp.raise_for_status()
-                return resp.json()   # contains id, name, type (dev/sandbox/prod)
+                environments = jsonutil.loads(resp.content)   # contains id, name, type (dev/sandbox/prod)
+                _remember_environments(key, resp.content)
+                return environments
             except Exception as e:
                 return {"error": str(e)}
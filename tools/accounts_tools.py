@@ -1,24 +1,59 @@
-import httpx
+import hashlib
+import time
+from collections import OrderedDict
+
+from . import jsonutil, upstream
 
 ANYPOINT_TOKEN_URL = "https://anypoint.mulesoft.com/accounts/api/v2/oauth2/token"
 
+# Client-credentials tokens are reused until shortly before they expire,
+# so a token prefetched at startup (see warmup.py) serves the first call.
+TOKEN_REFRESH_MARGIN = 60
+TOKEN_CACHE_SIZE = 256
+_token_cache = OrderedDict()  # key -> (expires_at, response text), least recently used first
+
+
+def _cache_key(client_id: str, client_secret: str) -> str:
+    return hashlib.sha256(f"{client_id}:{client_secret}".encode("utf-8")).hexdigest()
+
+
+def _remember_token(key: str, expires_at: float, text: str):
+    now = time.monotonic()
+    for stale in [k for k, (expires, _) in _token_cache.items() if expires <= now]:
+        del _token_cache[stale]
+    _token_cache[key] = (expires_at, text)
+    _token_cache.move_to_end(key)
+    while len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+
+
 # Get Token Tool
 def register(mcp):
     @mcp.tool()
     async def get_token(client_id: str, client_secret: str) -> str:
         """Get User token from Client Credentials Anypoint Platform."""
 
+        key = _cache_key(client_id, client_secret)
+        cached = _token_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            _token_cache.move_to_end(key)
+            return cached[1]
+
         payload = {
             "grant_type": "client_credentials",
             "client_id": client_id,
             "client_secret": client_secret,
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client() as client:
             try:
                 resp = await client.post(ANYPOINT_TOKEN_URL, data=payload)
                 resp.raise_for_status()
+
+                expires_in = jsonutil.loads(resp.content).get("expires_in")
+                if expires_in:
+                    expires_at = time.monotonic() + float(expires_in) - TOKEN_REFRESH_MARGIN
+                    _remember_token(key, expires_at, resp.text)
                 return resp.text
             except Exception as exc:
                 return f"Error fetching token: {exc}"
-
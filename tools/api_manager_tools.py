@@ -1,4 +1,9 @@
-import httpx
+import asyncio
+import fnmatch
+import os
+import time
+
+from . import idempotency, jsonutil, reconcile, upstream
 
 
 API_INSTANCE_URL = "https://anypoint.mulesoft.com/apimanager/api/v1/organizations/{org_id}/environments/{env_id}/apis"
@@ -6,13 +11,83 @@ LIST_APIS_URL = "https://anypoint.mulesoft.com/apimanager/api/v1/organizations/{
 API_CONTRACTS_URL = "https://anypoint.mulesoft.com/apimanager/api/v1/organizations/{org_id}/environments/{env_id}/apis/{instance_id}/contracts"
 API_CONTRACT_DETAIL_URL = "https://anypoint.mulesoft.com/apimanager/api/v1/organizations/{org_id}/environments/{env_id}/apis/{instance_id}/contracts/{contract_id}"
 POLICY_URL = "https://anypoint.mulesoft.com/apimanager/api/v1/organizations/{org_id}/environments/{env_id}/apis/{instance_id}/policies"
+POLICY_DETAIL_URL = "https://anypoint.mulesoft.com/apimanager/api/v1/organizations/{org_id}/environments/{env_id}/apis/{instance_id}/policies/{policy_id}"
 SLA_TIER_URL = "https://anypoint.mulesoft.com/apimanager/api/v1/organizations/{org_id}/environments/{env_id}/apis/{instance_id}/tiers"
 LIST_SLA_URL = "https://anypoint.mulesoft.com/apimanager/api/v1/organizations/{org_id}/environments/{env_id}/apis/{instance_id}/tiers"
 CREATE_SLA_TIER_URL = "https://anypoint.mulesoft.com/apimanager/api/v1/organizations/{org_id}/environments/{env_id}/apis/{instance_id}/tiers"
+SLA_TIER_DETAIL_URL = "https://anypoint.mulesoft.com/apimanager/api/v1/organizations/{org_id}/environments/{env_id}/apis/{instance_id}/tiers/{tier_id}"
+
+# Default number of instances a bulk tool works on at once
+BULK_PARALLELISM = int(os.environ.get("ANYPOINT_BULK_PARALLELISM", "10"))
+
+
+def flatten_instances(listing) -> list:
+    """
+    Flatten the list_api_instances response (instances grouped under assets) into one dict per instance.
+    """
+    instances = []
+    for asset in (listing or {}).get("assets", []):
+        for api in asset.get("apis", []):
+            instances.append({
+                "instance_id": str(api.get("id")),
+                "groupId": asset.get("groupId"),
+                "assetId": asset.get("assetId", api.get("assetId")),
+                "assetVersion": api.get("assetVersion"),
+                "productVersion": api.get("productVersion"),
+                "instanceLabel": api.get("instanceLabel"),
+                "status": api.get("status"),
+                "technology": api.get("technology"),
+            })
+    return instances
+
+
+def matches(instance: dict, selector: dict) -> bool:
+    """
+    True if every selector field matches; values are glob patterns, e.g. {"assetId": "orders-*"}.
+    """
+    return all(
+        fnmatch.fnmatchcase(str(instance.get(field)), str(pattern))
+        for field, pattern in selector.items()
+    )
+
+
+async def fan_out(instance_ids: list, call, max_parallel: int | None = None) -> dict:
+    """
+    Run `call(instance_id)` for every instance concurrently (bounded) and
+    collect one result entry per instance.
+    """
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(max(1, max_parallel or BULK_PARALLELISM))
+
+    async def one(instance_id):
+        async with semaphore:
+            try:
+                result = await call(instance_id)
+            except Exception as e:
+                result = {"status": "error", "message": str(e)}
+        entry = {"instance_id": instance_id, "status": result.get("status", "error")}
+        response = result.get("response")
+        if isinstance(response, dict) and "id" in response:
+            entry["id"] = response["id"]
+        if result.get("message"):
+            entry["message"] = result["message"]
+        return entry
+
+    results = await asyncio.gather(*(one(instance_id) for instance_id in instance_ids))
+    failed = sum(1 for entry in results if entry["status"] != "success")
+    return {
+        "status": "success" if not failed else ("error" if failed == len(results) else "partial_success"),
+        "total": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "seconds": round(time.monotonic() - started, 2),
+        "results": results,
+    }
 
 #Create API INSTANCE
 def register(mcp):
     @mcp.tool()
+    @idempotency.idempotent
     async def create_api_instance(
         token: str,
         org_id: str,
@@ -20,11 +95,15 @@ def register(mcp):
         group_id: str,
         asset_id: str,
         version: str,
-        instance_label: str = None
+        instance_label: str = None,
+        idempotency_key: str | None = None
     ) -> dict:
         """
         Create API Manager Instance using the proven stable v1 API.
         This is the same structure used in your Node.js automation.
+
+        idempotency_key: retries with the same key return the first result
+        instead of creating another instance.
         """
 
         if instance_label is None:
@@ -55,13 +134,13 @@ def register(mcp):
 
         url = API_INSTANCE_URL.format(org_id=org_id, env_id=env_id)
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 resp = await client.post(url, headers=headers, json=payload, timeout=30.0)
                 resp.raise_for_status()
                 return {
                     "status": "success",
-                    "instance": resp.json()
+                    "instance": jsonutil.loads(resp.content)
                 }
             except Exception as e:
                 return {"status": "error", "message": str(e)}
@@ -86,11 +165,11 @@ def register(mcp):
             "Content-Type": "application/json"
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 resp = await client.get(url, headers=headers, timeout=40.0)
                 resp.raise_for_status()
-                return resp.json()   # contains assets[], apis[], ids, etc.
+                return jsonutil.loads(resp.content)   # contains assets[], apis[], ids, etc.
             except Exception as e:
                 return {"error": str(e)}
 
@@ -117,13 +196,13 @@ def register(mcp):
             "Content-Type": "application/json"
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 # The list endpoint usually contains all necessary details (App name, Tier, Status)
                 resp = await client.get(url, headers=headers, timeout=30.0)
                 resp.raise_for_status()
                 
-                data = resp.json()
+                data = jsonutil.loads(resp.content)
                 
                 # Helper to standardize output if 'contracts' key is missing or nested
                 contracts = data.get("contracts", data) if isinstance(data, dict) else data
@@ -219,17 +298,18 @@ def register(mcp):
             "pointcutData": pointcut
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 resp = await client.post(url, headers=headers, json=payload)
                 resp.raise_for_status()
-                return {"status": "success", "response": resp.json()}
+                return {"status": "success", "response": jsonutil.loads(resp.content)}
             except Exception as e:
                 return {"status": "error", "message": str(e)}
             
 
 #Create SLA TIER
     @mcp.tool()
+    @idempotency.idempotent
     async def create_sla_tier(
         token: str,
         org_id: str,
@@ -240,7 +320,8 @@ def register(mcp):
         api_version_id: str,
         limits: list,
         auto_approve: bool = False,
-        status: str = "ACTIVE"
+        status: str = "ACTIVE",
+        idempotency_key: str | None = None
     ) -> dict:
         """
         Create an SLA Tier for an API Instance.
@@ -256,6 +337,8 @@ def register(mcp):
         - limits: List of rate-limits (each has visible, maximumRequests, timePeriodInMilliseconds)
         - auto_approve: Boolean (default True)
         - status: ACTIVE or INACTIVE
+        - idempotency_key: Retries with the same key return the first result
+          instead of creating another tier
 
         Example limits:
         [
@@ -292,11 +375,11 @@ def register(mcp):
             "description": description
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 resp = await client.post(url, headers=headers, json=payload, timeout=40)
                 resp.raise_for_status()
-                return {"status": "success", "response": resp.json()}
+                return {"status": "success", "response": jsonutil.loads(resp.content)}
             except Exception as e:
                 return {"status": "error", "message": str(e)}
 
@@ -324,11 +407,11 @@ def register(mcp):
             "Content-Type": "application/json"
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 resp = await client.get(url, headers=headers, timeout=30)
                 resp.raise_for_status()
-                return {"status": "success", "tiers": resp.json()}
+                return {"status": "success", "tiers": jsonutil.loads(resp.content)}
             except Exception as e:
                 return {"status": "error", "message": str(e)}
             
@@ -374,11 +457,255 @@ def register(mcp):
             "order": 1
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 resp = await client.post(url, headers=headers, json=payload, timeout=40)
                 resp.raise_for_status()
-                return {"status": "success", "response": resp.json()}
+                return {"status": "success", "response": jsonutil.loads(resp.content)}
 
             except Exception as e:
                 return {"status": "error", "message": str(e)}
+
+
+#BULK POLICY / SLA TOOLS
+    async def _targets(token, org_id, env_id, instance_ids, selector):
+        # Explicit IDs win; otherwise the selector runs against list_api_instances
+        if instance_ids:
+            return [str(instance_id) for instance_id in instance_ids], None
+        if selector is None:
+            return None, "Provide instance_ids or a selector (use {} for every instance in the environment)"
+        listing = await list_api_instances(token, org_id, env_id)
+        if "error" in listing:
+            return None, listing["error"]
+        return [instance["instance_id"] for instance in flatten_instances(listing) if matches(instance, selector)], None
+
+    @mcp.tool()
+    async def bulk_apply_client_id_policy(
+        token: str,
+        org_id: str,
+        env_id: str,
+        instance_ids: list[str] | None = None,
+        selector: dict | None = None,
+        client_id_header: str = "client_id",
+        client_secret_header: str = "client_secret",
+        max_parallel: int | None = None
+    ) -> dict:
+        """
+        Apply Client ID Enforcement (all methods/resources) to many API instances at once.
+
+        Targets: instance_ids, or a selector matched against list_api_instances,
+        e.g. {"assetId": "orders-*", "technology": "mule4"} ({} = all instances).
+        Runs up to max_parallel (default ANYPOINT_BULK_PARALLELISM) at a time;
+        throttled calls are retried after Retry-After.
+        Returns per-instance status plus succeeded/failed counts.
+        """
+        targets, error = await _targets(token, org_id, env_id, instance_ids, selector)
+        if error:
+            return {"status": "error", "message": error}
+
+        return await fan_out(targets, lambda instance_id: apply_client_id_policy(
+            token, org_id, env_id, instance_id,
+            client_id_header=client_id_header, client_secret_header=client_secret_header
+        ), max_parallel)
+
+    @mcp.tool()
+    async def bulk_apply_sla_rate_limiting(
+        token: str,
+        org_id: str,
+        env_id: str,
+        instance_ids: list[str] | None = None,
+        selector: dict | None = None,
+        max_parallel: int | None = None
+    ) -> dict:
+        """
+        Apply the SLA-based rate limiting policy to many API instances at once.
+        Targets and concurrency work as in bulk_apply_client_id_policy.
+        """
+        targets, error = await _targets(token, org_id, env_id, instance_ids, selector)
+        if error:
+            return {"status": "error", "message": error}
+
+        return await fan_out(targets, lambda instance_id: apply_sla_rate_limiting_(
+            token, org_id, env_id, instance_id
+        ), max_parallel)
+
+    @mcp.tool()
+    async def bulk_create_sla_tier(
+        token: str,
+        org_id: str,
+        env_id: str,
+        name: str,
+        description: str,
+        limits: list,
+        instance_ids: list[str] | None = None,
+        selector: dict | None = None,
+        auto_approve: bool = False,
+        status: str = "ACTIVE",
+        max_parallel: int | None = None
+    ) -> dict:
+        """
+        Create the same SLA tier on many API instances at once (apiVersionId is
+        each instance's ID). Targets and concurrency work as in
+        bulk_apply_client_id_policy; see create_sla_tier for the limits format.
+        """
+        targets, error = await _targets(token, org_id, env_id, instance_ids, selector)
+        if error:
+            return {"status": "error", "message": error}
+
+        return await fan_out(targets, lambda instance_id: create_sla_tier(
+            token, org_id, env_id, instance_id, name, description, instance_id, limits,
+            auto_approve=auto_approve, status=status
+        ), max_parallel)
+
+
+#RECONCILE POLICIES / SLA TIERS
+    @mcp.tool()
+    async def reconcile_api_governance(
+        token: str,
+        org_id: str,
+        env_id: str,
+        desired: dict,
+        selector: dict | None = None,
+        prune: bool = False,
+        dry_run: bool = False,
+        max_parallel: int | None = None
+    ) -> dict:
+        """
+        Converge API instances to a desired set of policies and SLA tiers,
+        issuing only the calls needed.
+
+        desired, keyed by instance ID:
+        {
+            "18745623": {
+                "policies": [{"assetId": "client-id-enforcement", "assetVersion": "1.3.3",
+                              "configurationData": {...}, "pointcutData": null}],
+                "tiers": [{"name": "Gold", "limits": [{"visible": true, "maximumRequests": 100,
+                           "timePeriodInMilliseconds": 60000}]}]
+            }
+        }
+        With a selector (see bulk_apply_client_id_policy), desired is a single
+        {"policies": [...], "tiers": [...]} applied to every matching instance.
+
+        Every policy needs an assetId and every tier a unique name; the whole
+        desired state is checked before anything is read or written.
+        Policies are matched by assetId and tiers by name; only the fields given
+        are compared (groupId defaults to the MuleSoft policy group, pointcut
+        entries without apiVersionId get the instance ID). Missing items are
+        created, differing ones updated. With prune=True, policies/tiers not in
+        the desired state are deleted (only for the kinds listed per instance).
+
+        Current state is read concurrently; a converged environment costs only
+        those reads. dry_run=True returns the planned calls without making them.
+        """
+        started = time.monotonic()
+        if selector is not None:
+            problems = reconcile.validate(desired)
+        elif isinstance(desired, dict):
+            problems = [
+                f"{instance_id}: {problem}"
+                for instance_id, state in desired.items() for problem in reconcile.validate(state)
+            ]
+        else:
+            problems = ["desired must be an object keyed by instance ID"]
+        if problems:
+            return {"status": "error", "message": "Invalid desired state: " + "; ".join(problems)}
+
+        if selector is not None:
+            targets, error = await _targets(token, org_id, env_id, None, selector)
+            if error:
+                return {"status": "error", "message": error}
+            desired = {instance_id: desired for instance_id in targets}
+
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+        semaphore = asyncio.Semaphore(max(1, max_parallel or BULK_PARALLELISM))
+
+        async def call(client, method, url, payload=None):
+            async with semaphore:
+                resp = await client.request(method, url, headers=headers, json=payload, timeout=40)
+                resp.raise_for_status()
+                return jsonutil.loads(resp.content) if resp.content else None
+
+        async def plan_instance(client, instance_id, state):
+            ids = {"org_id": org_id, "env_id": env_id, "instance_id": instance_id}
+            reads = {}
+            if "policies" in state:
+                reads["policies"] = call(client, "GET", POLICY_URL.format(**ids))
+            if "tiers" in state:
+                reads["tiers"] = call(client, "GET", LIST_SLA_URL.format(**ids))
+            current = dict(zip(reads, await asyncio.gather(*reads.values())))
+
+            actions = []
+            if "policies" in state:
+                policies = [
+                    dict(policy, pointcutData=[
+                        {"apiVersionId": instance_id, **pointcut} for pointcut in policy["pointcutData"]
+                    ]) if policy.get("pointcutData") else policy
+                    for policy in state["policies"]
+                ]
+                actions += reconcile.plan_policies(
+                    instance_id, policies, reconcile.current_policies(current["policies"]), prune
+                )
+            if "tiers" in state:
+                actions += reconcile.plan_tiers(
+                    instance_id, state["tiers"], reconcile.current_tiers(current["tiers"]), prune
+                )
+
+            for action in actions:
+                url = POLICY_URL if action["kind"] == "policy" else SLA_TIER_URL
+                if action["action"] != "create":
+                    url = POLICY_DETAIL_URL if action["kind"] == "policy" else SLA_TIER_DETAIL_URL
+                action["method"] = {
+                    "create": "POST",
+                    "update": "PATCH" if action["kind"] == "policy" else "PUT",
+                    "delete": "DELETE",
+                }[action["action"]]
+                action["url"] = url.format(**ids, policy_id=action.get("id"), tier_id=action.get("id"))
+            return actions
+
+        async def apply(client, action):
+            try:
+                response = await call(client, action["method"], action["url"], action.get("payload"))
+                action["status"] = "success"
+                if isinstance(response, dict) and "id" in response:
+                    action["id"] = response["id"]
+            except Exception as e:
+                action["status"] = "error"
+                action["message"] = str(e)
+            action.pop("payload", None)
+            return action
+
+        async with upstream.client(org_id) as client:
+            planned = await asyncio.gather(
+                *(plan_instance(client, str(instance_id), state) for instance_id, state in desired.items()),
+                return_exceptions=True
+            )
+
+            actions, read_errors = [], []
+            for instance_id, result in zip(desired, planned):
+                if isinstance(result, BaseException):
+                    read_errors.append({"instance_id": str(instance_id), "message": str(result)})
+                else:
+                    actions += result
+
+            if not dry_run:
+                actions = await asyncio.gather(*(apply(client, action) for action in actions))
+
+        failed = len(read_errors) + sum(1 for action in actions if action.get("status") == "error")
+        summary = {}
+        for action in actions:
+            summary[action["action"]] = summary.get(action["action"], 0) + 1
+
+        return {
+            "status": "success" if not failed else ("error" if failed == len(actions) + len(read_errors) else "partial_success"),
+            "dry_run": dry_run,
+            "instances": len(desired),
+            "planned": summary,
+            "converged": not actions and not read_errors,
+            "failed": failed,
+            "seconds": round(time.monotonic() - started, 2),
+            "actions": actions,
+            "read_errors": read_errors,
+        }
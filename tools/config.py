@@ -0,0 +1,20 @@
+import os
+
+# Helpers for reading server settings from environment variables
+
+
+def parse_number_map(spec: str) -> dict:
+    """
+    Parse "org-a=4,org-b=1" into {"org-a": 4.0, "org-b": 1.0}.
+    """
+    numbers = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        key, _, value = item.partition("=")
+        numbers[key.strip()] = float(value or 1)
+    return numbers
+
+
+def env_number_map(name: str) -> dict:
+    return parse_number_map(os.environ.get(name, ""))
@@ -0,0 +1,157 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+
+import httpx
+
+from .config import env_number_map
+
+# Per-invocation deadlines.
+#
+# Every tool call runs with a deadline: the caller's (e.g. the X-Request-Timeout
+# header on http_server.py) or else the tool's default below. Upstream requests,
+# retry loops and sleeps inside the tool only use what is left of that budget,
+# and the tool is cancelled when it runs out.
+
+DEFAULT_TOOL_TIMEOUT = float(os.environ.get("ANYPOINT_TOOL_TIMEOUT", "60"))
+
+# Tools that legitimately need longer than the default
+TOOL_TIMEOUTS = {
+    "import_design_project_from_zip": 180.0,
+    "create_and_lock_design_project": 90.0,
+    "bulk_apply_client_id_policy": 300.0,
+    "bulk_apply_sla_rate_limiting": 300.0,
+    "bulk_create_sla_tier": 300.0,
+    "reconcile_api_governance": 300.0,
+    "bulk_categorize_assets": 300.0,
+    "download_exchange_asset": 600.0,
+    "run_api_workflow": 300.0,
+    "onboard_migration_specs": 900.0,
+}
+TOOL_TIMEOUTS.update(env_number_map("ANYPOINT_TOOL_TIMEOUTS"))  # e.g. "get_token=10"
+
+_deadline = contextvars.ContextVar("deadline", default=None)
+_tool = contextvars.ContextVar("tool", default=None)
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """
+    Raised when an upstream request would start after the call's deadline.
+    """
+
+
+def remaining() -> float | None:
+    """
+    Seconds left in the current call's budget, or None when unbounded.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def current_tool() -> str | None:
+    """
+    Name of the tool whose invocation is running (innermost for nested calls).
+    """
+    return _tool.get()
+
+
+def allows(seconds: float) -> bool:
+    """
+    True if the current budget still has at least `seconds` left.
+    """
+    left = remaining()
+    return left is None or left >= seconds
+
+
+@contextmanager
+def scope(seconds: float | None):
+    """
+    Run the block with at most `seconds` of budget (never extends an outer deadline).
+    """
+    current = _deadline.get()
+    deadline = current
+    if seconds is not None:
+        proposed = time.monotonic() + seconds
+        deadline = proposed if current is None else min(current, proposed)
+
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+async def sleep(seconds: float):
+    """
+    asyncio.sleep that refuses to sleep past the deadline.
+    """
+    if not allows(seconds):
+        raise DeadlineExceeded(f"Deadline exceeded: cannot wait {seconds}s with {remaining():.1f}s left")
+    await asyncio.sleep(seconds)
+
+
+def clamp_request(request: httpx.Request):
+    """
+    Shrink the request's httpx timeouts to the remaining budget.
+    """
+    left = remaining()
+    if left is None:
+        return
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded before request was sent", request=request)
+
+    timeouts = dict(request.extensions.get("timeout") or {})
+    for key in ("connect", "read", "write", "pool"):
+        value = timeouts.get(key)
+        timeouts[key] = left if value is None else min(value, left)
+    request.extensions["timeout"] = timeouts
+
+
+def timeout_for(tool_name: str) -> float:
+    return TOOL_TIMEOUTS.get(tool_name, DEFAULT_TOOL_TIMEOUT)
+
+
+@contextmanager
+def _running(tool_name: str):
+    token = _tool.set(tool_name)
+    try:
+        yield
+    finally:
+        _tool.reset(token)
+
+
+def _bounded(tool_name: str, fn):
+    returns_text = inspect.signature(fn).return_annotation is str
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        # Nested tool calls inherit the caller's budget; top-level calls get the default
+        seconds = timeout_for(tool_name) if _deadline.get() is None else None
+
+        with scope(seconds), _running(tool_name):
+            try:
+                async with asyncio.timeout(remaining()) as budget:
+                    return await fn(*args, **kwargs)
+            except TimeoutError:
+                if not budget.expired():
+                    raise
+                message = f"Deadline exceeded: '{tool_name}' was cancelled after its time budget ran out"
+                if returns_text:
+                    return f"Error: {message}"
+                return {"status": "error", "message": message}
+
+    return wrapper
+
+
+def install(mcp):
+    """
+    Wrap every registered tool so it runs inside a deadline scope.
+    """
+    for tool in mcp._tool_manager.list_tools():
+        tool.fn = _bounded(tool.name, tool.fn)
@@ -0,0 +1,89 @@
+import re
+
+# Exchange dependency graph helpers: version ordering, cycle detection,
+# conflict resolution and flattening into an import-ready dependency list.
+#
+# Nodes are (group_id, asset_id, version) tuples; the graph maps each node to
+# the nodes it declares as dependencies.
+
+
+def node_key(node: tuple) -> str:
+    return "/".join(node)
+
+
+def version_key(version: str) -> tuple:
+    """
+    Sort key for semver-like versions: 1.10.0 > 1.9.2 > 1.9.2-rc.1.
+    """
+    release, _, prerelease = str(version).partition("-")
+    parts = tuple(int(part) if part.isdigit() else 0 for part in re.split(r"[.+]", release))
+    # A release sorts after any of its pre-releases
+    return parts, (1,) if not prerelease else (0, prerelease)
+
+
+def find_cycles(graph: dict) -> list:
+    """
+    Every dependency cycle, as a list of nodes starting and ending with the same node.
+    """
+    cycles, state, stack = [], {}, []
+
+    def visit(node):
+        state[node] = "active"
+        stack.append(node)
+        for child in graph.get(node, ()):
+            if state.get(child) == "active":
+                cycles.append(stack[stack.index(child):] + [child])
+            elif child not in state:
+                visit(child)
+        stack.pop()
+        state[node] = "done"
+
+    for node in graph:
+        if node not in state:
+            visit(node)
+    return cycles
+
+
+def resolve(graph: dict, roots: list) -> dict:
+    """
+    Pick one version per (group, asset) - the highest requested - and flatten
+    everything reachable from roots through the selected versions.
+
+    Returns {"selected": [...nodes], "conflicts": [...], "depth": ...}, where
+    depth is the largest number of hops from a root to a selected node along
+    its shortest path (the number of levels below the roots).
+    """
+    requested = {}
+    for parent, children in graph.items():
+        for child in children:
+            requested.setdefault(child[:2], {}).setdefault(child[2], []).append(node_key(parent))
+
+    chosen = {ga: max(versions, key=version_key) for ga, versions in requested.items()}
+    conflicts = [
+        {
+            "groupId": ga[0],
+            "assetId": ga[1],
+            "versions": {version: sorted(parents) for version, parents in versions.items()},
+            "selected": chosen[ga],
+        }
+        for ga, versions in sorted(requested.items()) if len(versions) > 1
+    ]
+
+    selected, depth = [], {}
+    frontier = [(root, 0) for root in roots]
+    while frontier:
+        next_frontier = []
+        for node, level in frontier:
+            node = node[:2] + (chosen.get(node[:2], node[2]),)
+            if node in depth:
+                continue
+            depth[node] = level
+            selected.append(node)
+            next_frontier += [(child, level + 1) for child in graph.get(node, ())]
+        frontier = next_frontier
+
+    return {
+        "selected": [node for node in selected if node not in roots],
+        "conflicts": conflicts,
+        "depth": max(depth.values(), default=0),
+    }
@@ -0,0 +1,301 @@
+import asyncio
+import contextvars
+import hashlib
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+
+from . import design_sync, identity, jsonutil, upstream
+from .designcentre_tools import DESIGN_UPLOAD_URL
+from .migration_index import UPLOADS_DIR
+
+logger = logging.getLogger(__name__)
+
+SESSION_LOCK_URL = "https://anypoint.mulesoft.com/designcenter/api-designer/projects/{project_id}/branches/{branch}/acquireLock"
+SESSION_RELEASE_URL = "https://anypoint.mulesoft.com/designcenter/api-designer/projects/{project_id}/branches/{branch}/releaseLock"
+
+# Lock is re-acquired this often while a session is open
+LOCK_RENEW_INTERVAL = float(os.environ.get("ANYPOINT_DESIGN_LOCK_RENEW", "60"))
+# Sessions with no activity for this long release their lock and are dropped
+SESSION_IDLE_TIMEOUT = float(os.environ.get("ANYPOINT_DESIGN_SESSION_IDLE", "600"))
+
+
+class EditSession:
+    """
+    An open Design Center edit session: holds the branch lock and stages
+    file changes locally until they are committed in one save call.
+    """
+
+    def __init__(self, token, owner, org_id, user_id, project_id, branch, idle_timeout):
+        self.id = uuid.uuid4().hex
+        self.token = token
+        self.owner = owner
+        self.org_id = org_id
+        self.user_id = user_id
+        self.project_id = project_id
+        self.branch = branch
+        self.idle_timeout = idle_timeout
+        self.staged = {}
+        self.commits = 0
+        self.last_activity = time.monotonic()
+        self.renewer = None
+
+    @property
+    def headers(self):
+        return {
+            "Authorization": f"Bearer {self.token}",
+            "x-organization-id": self.org_id,
+            "x-owner-id": self.user_id,
+        }
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+    def idle_for(self) -> float:
+        return time.monotonic() - self.last_activity
+
+    def describe(self) -> dict:
+        return {
+            "session_id": self.id,
+            "project_id": self.project_id,
+            "branch": self.branch,
+            "staged_files": sorted(self.staged),
+            "commits": self.commits,
+            "idle_seconds": round(self.idle_for(), 1),
+            "idle_timeout": self.idle_timeout,
+        }
+
+
+_sessions = {}
+
+
+async def _acquire_lock(session: EditSession):
+    url = SESSION_LOCK_URL.format(project_id=session.project_id, branch=session.branch)
+    headers = dict(session.headers, **{"Content-Type": "application/json"})
+    async with upstream.client(session.org_id) as client:
+        resp = await client.post(url, headers=headers, json={"locked": True, "name": "locked"}, timeout=30.0)
+        resp.raise_for_status()
+        return jsonutil.loads(resp.content) if resp.content else {}
+
+
+async def _release_lock(session: EditSession):
+    url = SESSION_RELEASE_URL.format(project_id=session.project_id, branch=session.branch)
+    async with upstream.client(session.org_id) as client:
+        resp = await client.post(url, headers=session.headers, timeout=30.0)
+        resp.raise_for_status()
+
+
+async def _close(session: EditSession) -> str | None:
+    """
+    Stop renewing, release the lock and forget the session. Returns a release error, if any.
+    """
+    _sessions.pop(session.id, None)
+    if session.renewer is not None and session.renewer is not asyncio.current_task():
+        session.renewer.cancel()
+    try:
+        await _release_lock(session)
+        return None
+    except Exception as exc:
+        return str(exc)
+
+
+async def _keep_alive(session: EditSession):
+    # Renews the lock and enforces the idle timeout in the background
+    while session.id in _sessions:
+        await asyncio.sleep(min(LOCK_RENEW_INTERVAL, session.idle_timeout))
+        if session.id not in _sessions:
+            return
+        if session.idle_for() >= session.idle_timeout:
+            logger.info("Design session %s idle for %.0fs; releasing lock", session.id, session.idle_for())
+            await _close(session)
+            return
+        try:
+            await _acquire_lock(session)
+        except Exception as exc:
+            logger.warning("Lock renewal failed for session %s: %s", session.id, exc)
+
+
+async def _get(token: str, session_id: str) -> EditSession:
+    """
+    The caller's open session. Sessions of other callers are reported as not found.
+    """
+    session = _sessions.get(session_id)
+    if session is None or session.owner != await identity.owner(token):
+        raise KeyError(f"No open design session '{session_id}' (it may have been idle too long)")
+    session.touch()
+    return session
+
+
+def _uploads_folder(folder_path: str) -> str:
+    """
+    folder_path as a folder under the uploads root; raises ValueError if it points elsewhere.
+    """
+    base = os.path.realpath(UPLOADS_DIR)
+    target = os.path.realpath(os.path.join(base, folder_path))
+    if os.path.commonpath([target, base]) != base:
+        raise ValueError(f"folder_path must be a folder under {base}")
+    if not os.path.isdir(target):
+        raise ValueError(f"Path '{folder_path}' is not a directory")
+    return target
+
+
+def register(mcp):
+
+    @mcp.tool()
+    async def open_design_session(
+        token: str,
+        org_id: str,
+        user_id: str,
+        project_id: str,
+        branch: str = "master",
+        idle_timeout: float | None = None
+    ) -> dict:
+        """
+        Open an edit session on a Design Center project branch.
+        Acquires the branch lock and keeps renewing it until the session is
+        committed/closed or stays idle longer than idle_timeout seconds.
+        Stage changes with stage_design_files, then save them all at once
+        with commit_design_session.
+        """
+
+        try:
+            owner = await identity.owner(token)
+        except Exception as e:
+            return {"status": "error", "step": "identity", "message": f"Cannot verify the caller: {e}"}
+
+        session = EditSession(
+            token, owner, org_id, user_id, project_id, branch,
+            idle_timeout or SESSION_IDLE_TIMEOUT
+        )
+
+        try:
+            lock_info = await _acquire_lock(session)
+        except Exception as e:
+            return {"status": "error", "step": "lock", "message": str(e)}
+
+        _sessions[session.id] = session
+        # Fresh context: the renewer must not inherit this call's deadline
+        session.renewer = asyncio.create_task(_keep_alive(session), context=contextvars.Context())
+
+        return {"status": "success", "lock_info": lock_info, **session.describe()}
+
+    @mcp.tool()
+    async def stage_design_files(
+        token: str,
+        session_id: str,
+        files: dict[str, str] | None = None,
+        folder_path: str | None = None,
+        remove: list[str] | None = None
+    ) -> dict:
+        """
+        Stage file changes in an open edit session (nothing is sent yet).
+
+        files       : {"relative/path.raml": "file content", ...}
+        folder_path : Stage every file under a folder of the migration uploads root
+                      (ANYPOINT_MIGRATION_UPLOADS; exchange_modules skipped)
+        remove      : Paths to unstage
+        """
+        try:
+            session = await _get(token, session_id)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+        for path, content in (files or {}).items():
+            session.staged[path.lstrip("/")] = content.encode("utf-8")
+
+        if folder_path:
+            try:
+                folder = _uploads_folder(folder_path)
+            except ValueError as e:
+                return {"status": "error", "message": str(e)}
+            for path, file_path in design_sync.list_local_files(folder).items():
+                # Symlinks inside the folder must not lead back out of it
+                if not Path(file_path).resolve().is_relative_to(folder):
+                    continue
+                with open(file_path, "rb") as handle:
+                    session.staged[path] = handle.read()
+
+        for path in remove or []:
+            session.staged.pop(path.lstrip("/"), None)
+
+        return {"status": "success", **session.describe()}
+
+    @mcp.tool()
+    async def commit_design_session(token: str, session_id: str, release: bool = True) -> dict:
+        """
+        Save every staged file in one save/v2 call.
+        With release=True (default) the lock is released and the session closed;
+        otherwise the session stays open for further edits.
+        """
+        try:
+            session = await _get(token, session_id)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+        staged = dict(session.staged)
+        result = {"status": "success", "session_id": session.id, "saved_files": sorted(staged)}
+
+        if staged:
+            url = DESIGN_UPLOAD_URL.format(project_id=session.project_id, branch=session.branch)
+            files_payload = [(path, (path, content)) for path, content in staged.items()]
+
+            async with upstream.client(session.org_id) as client:
+                try:
+                    resp = await client.post(url, headers=session.headers, files=files_payload, timeout=60.0)
+                    resp.raise_for_status()
+                    result["response"] = resp.text
+                except Exception as e:
+                    # Staged changes are kept so the commit can be retried
+                    return {"status": "error", "step": "save", "message": str(e), **session.describe()}
+
+            session.commits += 1
+            for path in staged:
+                session.staged.pop(path, None)
+
+            # Keep upload_design_files' manifest in step with what was saved
+            manifest = design_sync.load_manifest(session.org_id, session.project_id, session.branch)
+            for path, content in staged.items():
+                manifest[path] = {"sha256": hashlib.sha256(content).hexdigest(), "size": len(content)}
+            design_sync.save_manifest(session.org_id, session.project_id, session.branch, manifest)
+
+        if release:
+            error = await _close(session)
+            result["released"] = error is None
+            if error:
+                result["release_error"] = error
+        else:
+            result.update(session.describe())
+
+        return result
+
+    @mcp.tool()
+    async def close_design_session(token: str, session_id: str) -> dict:
+        """
+        Release the lock and discard any uncommitted staged changes.
+        """
+        try:
+            session = await _get(token, session_id)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+        discarded = sorted(session.staged)
+        error = await _close(session)
+        return {
+            "status": "success" if error is None else "partial_success",
+            "session_id": session_id,
+            "discarded_files": discarded,
+            **({"release_error": error} if error else {}),
+        }
+
+    @mcp.tool()
+    async def list_design_sessions(token: str) -> dict:
+        """
+        List the caller's open Design Center edit sessions.
+        """
+        try:
+            owner = await identity.owner(token)
+        except Exception as e:
+            return {"status": "error", "message": f"Cannot verify the caller: {e}"}
+        return {"sessions": [session.describe() for session in _sessions.values() if session.owner == owner]}
@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+
+from . import storage
+
+# Content-hash manifests for Design Center uploads.
+#
+# One manifest per (org, project, branch) records the sha256 and size of every
+# file last uploaded, so upload_design_files only sends added/changed files.
+
+HASH_WORKERS = 8
+CHUNK_SIZE = 1024 * 1024
+SKIPPED_DIRS = ("exchange_modules",)
+
+
+def _manifest_path(org_id: str, project_id: str, branch: str):
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{org_id}__{project_id}__{branch}")
+    return storage.data_dir("design-manifests") / f"{name}.json"
+
+
+def load_manifest(org_id: str, project_id: str, branch: str) -> dict:
+    path = _manifest_path(org_id, project_id, branch)
+    if not path.exists():
+        return {}
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except Exception:
+        # A corrupt manifest only costs one full upload
+        return {}
+
+
+def save_manifest(org_id: str, project_id: str, branch: str, manifest: dict):
+    path = _manifest_path(org_id, project_id, branch)
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def list_local_files(folder_path: str) -> dict:
+    """
+    Map normalized relative paths ("a/b.raml") to absolute paths, skipping exchange_modules.
+    """
+    files = {}
+    for root, dirs, names in os.walk(folder_path):
+        dirs[:] = [d for d in dirs if d not in SKIPPED_DIRS]
+        for name in names:
+            file_path = os.path.join(root, name)
+            relative_path = os.path.relpath(file_path, folder_path).replace(os.sep, "/")
+            files[relative_path] = file_path
+    return files
+
+
+def _hash_file(file_path: str) -> dict:
+    digest = hashlib.sha256()
+    size = 0
+    with open(file_path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return {"sha256": digest.hexdigest(), "size": size}
+
+
+async def hash_files(files: dict) -> dict:
+    """
+    Hash files in parallel worker threads, off the event loop.
+    """
+    semaphore = asyncio.Semaphore(HASH_WORKERS)
+
+    async def one(file_path):
+        async with semaphore:
+            return await asyncio.to_thread(_hash_file, file_path)
+
+    results = await asyncio.gather(*(one(file_path) for file_path in files.values()))
+    return dict(zip(files.keys(), results))
+
+
+def plan(local: dict, manifest: dict, remote_paths: set | None) -> dict:
+    """
+    Decide what to upload and what could be deleted.
+
+    - upload: new or changed since the manifest, or missing remotely
+    - unchanged: same hash as the manifest (and present remotely, when known)
+    - deleted: known from the manifest or the remote listing but no longer local
+    """
+    upload, unchanged = [], []
+    for path, entry in local.items():
+        previous = manifest.get(path)
+        missing_remotely = remote_paths is not None and path not in remote_paths
+        if previous and previous.get("sha256") == entry["sha256"] and not missing_remotely:
+            unchanged.append(path)
+        else:
+            upload.append(path)
+
+    known = set(manifest)
+    if remote_paths is not None:
+        known |= {
+            path for path in remote_paths
+            if not path.startswith(".") and path.split("/")[0] not in SKIPPED_DIRS
+        }
+    deleted = sorted(known - set(local))
+
+    return {"upload": sorted(upload), "unchanged": sorted(unchanged), "deleted": deleted}
@@ -5,29 +5,42 @@ import mcp.types as types
 import zipfile
 import io
 from typing import Optional
+from urllib.parse import quote
+
+from . import deadline, design_sync, idempotency, jsonutil, projection, spill, upstream
 
 CREATE_PROJECT_URL = "https://anypoint.mulesoft.com/designcenter/api-designer/projects"
 LIST_PROJECTS_URL = "https://anypoint.mulesoft.com/designcenter/api-designer/projects"
-DESIGN_UPLOAD_URL = "https://anypoint.mulesoft.com/designcenter/api-designer/projects/{project_id}/branches/master/save/v2"
+DESIGN_UPLOAD_URL = "https://anypoint.mulesoft.com/designcenter/api-designer/projects/{project_id}/branches/{branch}/save/v2"
+DESIGN_FILES_URL = "https://anypoint.mulesoft.com/designcenter/api-designer/projects/{project_id}/branches/{branch}/files"
+DESIGN_FILE_URL = "https://anypoint.mulesoft.com/designcenter/api-designer/projects/{project_id}/branches/{branch}/files/{path}"
 IMPORT_ZIP_URL = "https://anypoint.mulesoft.com/designcenter/api-designer/projects/import"
 LOCK_PROJECT_URL = "https://anypoint.mulesoft.com/designcenter/api-designer/projects/{project_id}/branches/master/acquireLock"
 EXPORT_URL = "https://anypoint.mulesoft.com/designcenter/api/designer/projects/{project_id}/branches/{branch}/archive"
 PUBLISH_URL = "https://anypoint.mulesoft.com/designcenter/api-designer/projects/{project_id}/branches/master/publish/exchange"
 
+# Fields kept by list_design_projects(compact=True)
+PROJECT_SUMMARY_FIELDS = ["id", "name", "type", "classifier", "subType", "updatedDate"]
+
 
 
 # Create a Design Center project AND automatically acquire the lock
 def register(mcp):
 
     @mcp.tool()
+    @idempotency.idempotent
     async def create_and_lock_design_project(
         token: str,
         org_id: str,
         user_id: str,
         project_name: str,
+        idempotency_key: str | None = None
     ) -> dict:
         """
         Create a Design Center project AND automatically acquire the lock with RETRY logic.
+
+        idempotency_key: retries with the same key return the first result
+        instead of creating another project.
         """
 
         headers = {
@@ -49,7 +62,7 @@ def register(mcp):
         project_id = None
         project_info = {}
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 create_resp = await client.post(
                     CREATE_PROJECT_URL,
@@ -58,7 +71,7 @@ def register(mcp):
                     timeout=30.0
                 )
                 create_resp.raise_for_status()
-                project_info = create_resp.json()
+                project_info = jsonutil.loads(create_resp.content)
                 project_id = project_info.get("id")
 
                 if not project_id:
@@ -74,11 +87,15 @@ def register(mcp):
             
             max_retries = 5
             for attempt in range(1, max_retries + 1):
+                # Stop retrying once the caller's budget can't cover another wait
+                if not deadline.allows(3):
+                    break
+
                 print(f"Attempt {attempt}/{max_retries}: Acquiring lock for {project_id}...")
                 
                 try:
                     # Wait before trying (essential for the first attempt too)
-                    await asyncio.sleep(3) 
+                    await deadline.sleep(3) 
 
                     lock_resp = await client.post(
                         lock_url,
@@ -89,7 +106,7 @@ def register(mcp):
                     
                     if lock_resp.status_code == 200:
                         # Double check the response implies success
-                        lock_data = lock_resp.json()
+                        lock_data = jsonutil.loads(lock_resp.content)
                         return {
                             "status": "success",
                             "message": "Lock acquired successfully.",
@@ -152,14 +169,14 @@ def register(mcp):
             "subType": subtype
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 # 1. Create Project
                 print(f"Creating project '{project_name}'...")
                 resp = await client.post(base_url, headers=headers, json=payload, timeout=30)
                 resp.raise_for_status()
 
-                project = resp.json()
+                project = jsonutil.loads(resp.content)
                 project_id = project.get("id")
 
                 if not project_id:
@@ -168,7 +185,7 @@ def register(mcp):
                 # --- CRITICAL FIX: WAIT FOR GIT REPO INITIALIZATION ---
                 # The master branch takes a moment to appear after project creation.
                 print("Waiting for repository initialization...")
-                await asyncio.sleep(2) 
+                await deadline.sleep(2) 
                 # ------------------------------------------------------
 
                 # 2. Acquire Master Branch Lock
@@ -197,7 +214,7 @@ def register(mcp):
                 return {
                     "status": "success",
                     "projectId": project_id,
-                    "lock": lock_resp.json(),
+                    "lock": jsonutil.loads(lock_resp.content),
                     "raw": project
                 }
 
@@ -213,7 +230,13 @@ def register(mcp):
 
 # List all Design Center projects for an organization and user
     @mcp.tool()
-    async def list_design_projects(token: str, org_id: str, user_id: str) -> str:
+    async def list_design_projects(
+        token: str,
+        org_id: str,
+        user_id: str,
+        fields: list[str] | None = None,
+        compact: bool = False
+    ) -> str:
         """
         List all Design Center projects for the given organization and user.
 
@@ -221,6 +244,8 @@ def register(mcp):
             token: User token (NOT client credentials token)
             org_id: Organization ID
             user_id: User ID (x-owner-id)
+            fields: Optional dotted paths to keep per project, e.g. ["id", "name"]
+            compact: Return only id, name, type, classifier, subType and updatedDate
 
         Returns:
             JSON text containing all project details
@@ -232,7 +257,7 @@ def register(mcp):
             "x-owner-id": user_id
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 resp = await client.get(
                     LIST_PROJECTS_URL,
@@ -240,11 +265,162 @@ def register(mcp):
                     timeout=20.0
                 )
                 resp.raise_for_status()
-                return resp.text
+                text = projection.project_text(
+                    "list_design_projects",
+                    resp.content,
+                    projection.resolve_fields(fields, compact, PROJECT_SUMMARY_FIELDS)
+                )
+                return spill.maybe_spill("list_design_projects", text)
             except Exception as e:
                 return f"Error listing Design Center projects: {e}"
 
 
+# Upload RAML files to a Design Center project (only what changed since the last sync)
+    @mcp.tool()
+    async def upload_design_files(
+        token: str,
+        org_id: str,
+        user_id: str,
+        project_id: str,
+        folder_path: str,
+        branch: str = "master",
+        delete_removed: bool = False,
+        full_sync: bool = False,
+        files: list[str] | None = None
+    ) -> str:
+        """
+        Upload RAML files and supporting files from a folder to a Design Center project.
+
+        - Walks the folder recursively, skipping exchange_modules, preserving relative paths.
+        - files (paths relative to folder_path) limits the upload to just those files;
+          the rest of the project is left as it is (nothing is reported or deleted).
+        - Keeps a local manifest of content hashes per project/branch and uploads only
+          files that were added or changed since the last sync (full_sync=True sends all).
+        - Reconciles against the Design Center file list when available, so files
+          missing remotely are re-sent.
+        - Files that no longer exist locally are only deleted remotely when
+          delete_removed=True; otherwise they are reported.
+        """
+
+        if not os.path.exists(folder_path):
+            return f"Error: Folder path '{folder_path}' does not exist"
+
+        if not os.path.isdir(folder_path):
+            return f"Error: Path '{folder_path}' is not a directory"
+
+        try:
+            local_files = design_sync.list_local_files(folder_path)
+            if files is not None:
+                wanted = {path.replace(os.sep, "/").lstrip("/") for path in files}
+                missing = sorted(wanted - set(local_files))
+                if missing:
+                    return f"Error: Files not found in '{folder_path}': {', '.join(missing)}"
+                local_files = {path: local_files[path] for path in sorted(wanted)}
+            local = await design_sync.hash_files(local_files)
+        except Exception as walk_error:
+            return f"Error reading files in '{folder_path}': {walk_error}"
+
+        if not local:
+            return "Error: No files found to upload (excluding exchange_modules)"
+
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "x-organization-id": org_id,
+            "x-owner-id": user_id,
+        }
+
+        stored = design_sync.load_manifest(org_id, project_id, branch)
+        manifest = {} if full_sync else stored
+
+        async with upstream.client(org_id) as client:
+            # Remote listing is best effort: without it we trust the manifest
+            remote_paths = None
+            try:
+                files_resp = await client.get(
+                    DESIGN_FILES_URL.format(project_id=project_id, branch=branch),
+                    headers=headers,
+                    timeout=20.0
+                )
+                if files_resp.status_code == 200:
+                    remote_paths = {
+                        entry["path"] for entry in jsonutil.loads(files_resp.content)
+                        if entry.get("type", "FILE") == "FILE"
+                    }
+            except Exception:
+                pass
+
+            sync = design_sync.plan(local, manifest, remote_paths)
+            if files is not None:
+                # A subset says nothing about the other files: only a full-folder sync deletes
+                sync["deleted"] = []
+            bytes_uploaded = sum(local[path]["size"] for path in sync["upload"])
+            bytes_saved = sum(local[path]["size"] for path in sync["unchanged"])
+
+            response_text = ""
+            if sync["upload"]:
+                files_payload = []
+                for path in sync["upload"]:
+                    try:
+                        with open(local_files[path], "rb") as f:
+                            content = f.read()
+                    except Exception as file_error:
+                        return f"Error reading file '{local_files[path]}': {file_error}"
+                    files_payload.append((path, (path, content)))
+
+                try:
+                    response = await client.post(
+                        DESIGN_UPLOAD_URL.format(project_id=project_id, branch=branch),
+                        headers=headers,
+                        files=files_payload,
+                        timeout=60.0
+                    )
+                    response.raise_for_status()
+                    response_text = response.text
+                except httpx.HTTPStatusError as e:
+                    return f"HTTP Error uploading files: {e.response.status_code} - {e.response.text}"
+                except httpx.TimeoutException:
+                    return "Error: Request timeout while uploading files"
+                except Exception as e:
+                    return f"Error uploading project files: {str(e)}"
+
+            deleted, delete_errors = [], []
+            if delete_removed and sync["deleted"]:
+                async def delete(path):
+                    url = DESIGN_FILE_URL.format(project_id=project_id, branch=branch, path=quote(path, safe=""))
+                    try:
+                        resp = await client.delete(url, headers=headers, timeout=20.0)
+                        if resp.status_code in (200, 204, 404):
+                            deleted.append(path)
+                        else:
+                            delete_errors.append(f"{path}: {resp.status_code}")
+                    except Exception as e:
+                        delete_errors.append(f"{path}: {e}")
+
+                await asyncio.gather(*(delete(path) for path in sync["deleted"]))
+
+        # Only record what Design Center now holds; a subset updates its own entries
+        new_manifest = dict(stored, **local) if files is not None else dict(local)
+        for path in sync["deleted"]:
+            if path not in deleted and path in manifest:
+                new_manifest[path] = manifest[path]
+        design_sync.save_manifest(org_id, project_id, branch, new_manifest)
+
+        summary = (
+            f"{len(sync['upload'])} files uploaded ({bytes_uploaded} bytes), "
+            f"{len(sync['unchanged'])} unchanged skipped ({bytes_saved} bytes saved)"
+        )
+        if delete_removed:
+            summary += f", {len(deleted)} deleted"
+            if delete_errors:
+                summary += f" ({len(delete_errors)} delete errors: {'; '.join(delete_errors)})"
+        elif sync["deleted"]:
+            summary += f", {len(sync['deleted'])} removed locally but kept remotely: {', '.join(sync['deleted'])}"
+
+        if not sync["upload"]:
+            return f"No changes to upload: {summary}."
+        return f"Upload successful: {summary}. Response: {response_text}"
+
+
 # Import a Design Center Project from a local ZIP file
     @mcp.tool()
     async def import_design_project_from_zip(
@@ -326,13 +502,13 @@ def register(mcp):
                 "zipFile": (os.path.basename(zip_file_path), file_content, "application/zip")
             }
 
-            async with httpx.AsyncClient() as client:
+            async with upstream.client(org_id) as client:
                 resp = await client.post(import_url, headers=headers, data=data, files=files, timeout=120.0)
 
                 if resp.status_code not in (200, 201):
                     return {"status": "error", "code": resp.status_code, "message": resp.text}
 
-                project_data = resp.json()
+                project_data = jsonutil.loads(resp.content)
                 project_id = project_data.get("id")
 
                 # If Project created, explicitly set main RAML file
@@ -391,7 +567,7 @@ def register(mcp):
             "classifier": classifier
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 resp = await client.post(url, headers=headers, json=payload, timeout=40.0)
                 resp.raise_for_status()
@@ -0,0 +1,338 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+
+from . import deadline, metrics, storage
+
+# Parallel, resumable, checksum-verified file downloads.
+#
+# fetch() streams a URL to disk through a ".part" file. When the server honours
+# Range requests the file is fetched in chunk_size pieces, `parallel` at a
+# time, each written in place at its offset; a ".part.json" sidecar lists the
+# finished chunks, so an interrupted download resumes where it stopped. md5 /
+# sha1 are computed while the data arrives: chunks are fed to the hashes in
+# file order, chunks that finish early wait in memory (never more than
+# 2 * parallel chunks, nor ANYPOINT_DOWNLOAD_BUFFER_BYTES, ahead of the hash
+# position), and chunks already on disk from an
+# earlier attempt are hashed from there as the hash position passes them.
+#
+# The caller's Authorization header only goes to Anypoint itself: file links
+# often point at another host (e.g. a pre-signed object-store URL), which must
+# never see the token.
+
+CHUNK_SIZE = int(os.environ.get("ANYPOINT_DOWNLOAD_CHUNK_SIZE", str(4 * 1024 * 1024)))
+CHUNK_PARALLELISM = int(os.environ.get("ANYPOINT_DOWNLOAD_PARALLELISM", "4"))
+# Upper bound on chunk bytes held in memory (fetched or in flight) per download
+BUFFER_BYTES = int(os.environ.get("ANYPOINT_DOWNLOAD_BUFFER_BYTES", str(32 * 1024 * 1024)))
+CHUNK_RETRIES = 3
+READ_TIMEOUT = 40.0
+
+ANYPOINT_ORIGIN = "https://anypoint.mulesoft.com"
+
+# Query parameters of pre-signed links (S3, Azure, GCS): the URL carries its own credentials
+SIGNATURE_PARAMS = {"x-amz-signature", "x-amz-credential", "signature", "sig", "x-goog-signature"}
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+_EMPTY_RANGE = re.compile(r"bytes \*/0$")
+
+
+class ChecksumMismatch(Exception):
+    """
+    The downloaded bytes do not match the published checksum.
+    """
+
+
+class _ShortRead(httpx.TransportError):
+    pass
+
+
+def _state_path(part: Path) -> Path:
+    return part.with_name(part.name + ".json")
+
+
+def _load_state(part: Path) -> dict | None:
+    try:
+        return json.loads(_state_path(part).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _save_state(part: Path, state: dict):
+    _state_path(part).write_text(json.dumps(state))
+
+
+def _discard(part: Path):
+    for path in (part, _state_path(part)):
+        path.unlink(missing_ok=True)
+
+
+def _hash_file(path: Path, names) -> dict:
+    hashes = {name: hashlib.new(name) for name in names}
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            for digest in hashes.values():
+                digest.update(block)
+    return {name: digest.hexdigest() for name, digest in hashes.items()}
+
+
+def _update(hashes: dict, data: bytes):
+    for digest in hashes.values():
+        digest.update(data)
+
+
+def _same_origin(a: str, b: str) -> bool:
+    a, b = urlsplit(a), urlsplit(b)
+    return (a.scheme, a.netloc) == (b.scheme, b.netloc)
+
+
+def credentials_allowed(url: str) -> bool:
+    """
+    Whether the caller's Anypoint credentials may be sent to url: same origin
+    as Anypoint, and not a pre-signed link.
+    """
+    query = {name.lower() for name, _ in parse_qsl(urlsplit(url).query, keep_blank_values=True)}
+    return _same_origin(url, ANYPOINT_ORIGIN) and not query & SIGNATURE_PARAMS
+
+
+def _without_credentials(headers: dict) -> dict:
+    return {name: value for name, value in headers.items() if name.lower() != "authorization"}
+
+
+def resolve_dir(download_dir: str) -> Path:
+    """
+    download_dir as a folder under the data dir's "downloads"; raises ValueError if it points elsewhere.
+    """
+    base = os.path.realpath(storage.data_dir("downloads"))
+    target = os.path.realpath(os.path.join(base, download_dir))
+    if os.path.commonpath([target, base]) != base:
+        raise ValueError(f"download_dir must be a folder under {base}")
+    return Path(target)
+
+
+async def _read_body(response: httpx.Response, expected: int | None = None) -> bytes:
+    data = bytearray()
+    async for piece in response.aiter_bytes():
+        data += piece
+    if expected is not None and len(data) != expected:
+        raise _ShortRead(f"Expected {expected} bytes, got {len(data)}")
+    return bytes(data)
+
+
+async def fetch(
+    client: httpx.AsyncClient,
+    url: str,
+    path,
+    headers: dict | None = None,
+    md5: str | None = None,
+    sha1: str | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    parallel: int = CHUNK_PARALLELISM,
+) -> dict:
+    """
+    Download url to path, verifying md5/sha1 when given.
+
+    Returns path, bytes, status ("downloaded", "resumed" or "present"),
+    chunks, resumed_bytes, verified, digests and seconds. Raises
+    ChecksumMismatch (the partial file is discarded) or the HTTP error.
+    """
+    started = time.monotonic()
+    path = Path(path)
+    part = path.with_name(path.name + ".part")
+    expected = {name: value.lower() for name, value in (("md5", md5), ("sha1", sha1)) if value}
+    headers = headers or {}
+    if not credentials_allowed(url):
+        headers = _without_credentials(headers)
+
+    if path.exists() and not part.exists():
+        digests = await asyncio.to_thread(_hash_file, path, expected) if expected else {}
+        if digests == expected:
+            return {
+                "path": str(path), "bytes": path.stat().st_size, "status": "present", "chunks": 0,
+                "resumed_bytes": 0, "verified": bool(expected), "digests": digests,
+                "seconds": round(time.monotonic() - started, 3),
+            }
+
+    state = _load_state(part)
+    if state and (state.get("expected") != expected or state.get("chunk_size") != chunk_size or not part.exists()):
+        state = None
+    if state is None:
+        _discard(part)
+    done = set(state["done"]) if state else set()
+    count = state["count"] if state else None
+    missing = [index for index in range(count) if index not in done] if state else [0]
+
+    hashes = {name: hashlib.new(name) for name in expected}
+    result = {"path": str(path), "verified": bool(expected)}
+
+    if missing:
+        start = missing[0] * chunk_size
+        request = client.build_request(
+            "GET", url, headers={**headers, "Range": f"bytes={start}-{start + chunk_size - 1}"},
+            timeout=httpx.Timeout(READ_TIMEOUT)
+        )
+        probe = await client.send(request, stream=True, follow_redirects=True)
+    else:
+        probe = None
+
+    if probe is not None and probe.status_code == 200:
+        # No range support: one sequential stream, hashed as it is written
+        try:
+            size = 0
+            with open(part, "wb") as file:
+                async for piece in probe.aiter_bytes():
+                    file.write(piece)
+                    _update(hashes, piece)
+                    size += len(piece)
+        finally:
+            await probe.aclose()
+        metrics.incr("download_bytes", size)
+        result.update(bytes=size, status="downloaded", chunks=1, resumed_bytes=0)
+
+    elif probe is not None and probe.status_code == 416 and _EMPTY_RANGE.match(probe.headers.get("Content-Range", "")):
+        # No byte range exists in an empty file
+        await probe.aclose()
+        _discard(part)
+        part.write_bytes(b"")
+        result.update(bytes=0, status="downloaded", chunks=0, resumed_bytes=0)
+
+    else:
+        if probe is not None:
+            if probe.status_code != 206:
+                await probe.aclose()
+                probe.raise_for_status()
+                raise httpx.HTTPStatusError(f"Unexpected status {probe.status_code}", request=probe.request, response=probe)
+            content_range = _CONTENT_RANGE.match(probe.headers.get("Content-Range", ""))
+            if content_range is None:
+                await probe.aclose()
+                raise httpx.HTTPStatusError("Partial response without a usable Content-Range", request=probe.request, response=probe)
+            total = int(content_range.group(3))
+            if state and state["size"] != total:
+                # The file changed since the interrupted attempt
+                await probe.aclose()
+                _discard(part)
+                return await fetch(client, url, path, headers, md5, sha1, chunk_size, parallel)
+            chunk_url = str(probe.url)
+        else:
+            total, chunk_url = state["size"], url
+        chunk_headers = headers if _same_origin(url, chunk_url) else {}
+
+        if state is None:
+            count = max(1, -(-total // chunk_size))
+            with open(part, "wb") as file:
+                file.truncate(total)
+            state = {"size": total, "count": count, "chunk_size": chunk_size, "expected": expected, "done": []}
+            _save_state(part, state)
+        resumed = set(done)
+
+        fd = os.open(part, os.O_RDWR)
+        buffers = {}  # chunk index -> bytes not hashed yet
+        cursor = 0
+        moved = asyncio.Condition()
+        hashing = asyncio.Lock()
+        window = max(1, min(2 * max(1, parallel), BUFFER_BYTES // chunk_size))
+
+        def bounds(index):
+            start = index * chunk_size
+            return start, min(total, start + chunk_size)
+
+        async def advance():
+            # Feed every contiguous finished chunk to the hashes
+            nonlocal cursor
+            async with hashing:
+                while cursor < count and (cursor in buffers or cursor in resumed):
+                    data = buffers.pop(cursor, None)
+                    if data is None:
+                        start, end = bounds(cursor)
+                        data = await asyncio.to_thread(os.pread, fd, end - start, start)
+                    if hashes:
+                        await asyncio.to_thread(_update, hashes, data)
+                    cursor += 1
+                    async with moved:
+                        moved.notify_all()
+
+        async def store(index, data):
+            await asyncio.to_thread(os.pwrite, fd, data, bounds(index)[0])
+            metrics.incr("download_bytes", len(data))
+            buffers[index] = data
+            done.add(index)
+            state["done"] = sorted(done)
+            _save_state(part, state)
+            await advance()
+
+        async def get_chunk(index):
+            start, end = bounds(index)
+            for attempt in range(CHUNK_RETRIES + 1):
+                try:
+                    async with client.stream(
+                        "GET", chunk_url, headers={**chunk_headers, "Range": f"bytes={start}-{end - 1}"},
+                        follow_redirects=True, timeout=READ_TIMEOUT
+                    ) as resp:
+                        if resp.status_code != 206:
+                            resp.raise_for_status()
+                            raise httpx.HTTPStatusError(
+                                f"Range request answered {resp.status_code}", request=resp.request, response=resp
+                            )
+                        return await _read_body(resp, end - start)
+                except httpx.TransportError:
+                    if attempt == CHUNK_RETRIES:
+                        raise
+                    metrics.incr("download_chunk_retries")
+                    await deadline.sleep(0.5 * 2 ** attempt)
+
+        first = missing[0] if probe is not None else None
+        queue = [index for index in range(count) if index not in done and index != first]
+
+        async def first_chunk():
+            # The probe's body is the first missing chunk
+            start, end = bounds(first)
+            try:
+                data = await _read_body(probe, end - start)
+            except httpx.TransportError:
+                data = await get_chunk(first)
+            finally:
+                await probe.aclose()
+            await store(first, data)
+
+        async def worker():
+            while queue:
+                index = queue.pop(0)
+                async with moved:
+                    await moved.wait_for(lambda: index < cursor + window)
+                await store(index, await get_chunk(index))
+
+        try:
+            tasks = [asyncio.ensure_future(worker()) for _ in range(max(1, parallel))]
+            if first is not None:
+                tasks.append(asyncio.ensure_future(first_chunk()))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                # One failed chunk stops the rest; finished chunks stay recorded for the next attempt
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            await advance()
+        finally:
+            os.close(fd)
+
+        resumed_bytes = sum(bounds(index)[1] - bounds(index)[0] for index in resumed)
+        result.update(
+            bytes=total, status="resumed" if resumed else "downloaded", chunks=count, resumed_bytes=resumed_bytes
+        )
+
+    digests = {name: digest.hexdigest() for name, digest in hashes.items()}
+    if digests != expected:
+        _discard(part)
+        metrics.incr("download_checksum_mismatches")
+        raise ChecksumMismatch(f"Checksum mismatch for {path.name}: expected {expected}, got {digests}")
+    os.replace(part, path)
+    _state_path(part).unlink(missing_ok=True)
+    result.update(digests=digests, seconds=round(time.monotonic() - started, 3))
+    return result
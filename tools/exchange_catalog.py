@@ -0,0 +1,305 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+
+from . import storage
+
+# Local Exchange catalog.
+#
+# Assets from the Exchange listing are upserted into SQLite with an FTS5 index
+# over names, IDs, descriptions, categories and tags, so searches never touch
+# the network. Each listing page's ETag is kept: an incremental sync sends
+# If-None-Match and reuses the stored page on 304.
+#
+# Rows belong to the caller who synced them (identity.owner) and an org, and
+# to a generation: searches read the generation recorded in `syncs`. A full
+# sync writes a new generation and only switches `syncs` over to it once the
+# whole listing has been read, so a failed full sync leaves the old catalog in
+# place.
+
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    owner TEXT NOT NULL,
+    org_id TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    group_id TEXT NOT NULL,
+    asset_id TEXT NOT NULL,
+    version TEXT,
+    name TEXT,
+    type TEXT,
+    status TEXT,
+    description TEXT,
+    categories TEXT,
+    tags TEXT,
+    updated_at TEXT,
+    digest TEXT,
+    raw TEXT,
+    PRIMARY KEY (owner, org_id, generation, group_id, asset_id)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    owner TEXT NOT NULL,
+    org_id TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    page_offset INTEGER NOT NULL,
+    etag TEXT,
+    keys TEXT,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (owner, org_id, generation, page_offset)
+);
+CREATE TABLE IF NOT EXISTS syncs (
+    owner TEXT NOT NULL,
+    org_id TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    synced_at REAL,
+    PRIMARY KEY (owner, org_id)
+);
+"""
+
+# Version 1 tables had no owner or generation; the catalog is a cache, so it is rebuilt
+OLD_TABLES = ("assets_fts", "assets", "pages", "syncs")
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS assets_fts USING fts5(
+    name, asset_id, description, categories, tags,
+    content='assets', content_rowid='rowid', tokenize='unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS assets_ai AFTER INSERT ON assets BEGIN
+    INSERT INTO assets_fts(rowid, name, asset_id, description, categories, tags)
+    VALUES (new.rowid, new.name, new.asset_id, new.description, new.categories, new.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS assets_ad AFTER DELETE ON assets BEGIN
+    INSERT INTO assets_fts(assets_fts, rowid, name, asset_id, description, categories, tags)
+    VALUES ('delete', old.rowid, old.name, old.asset_id, old.description, old.categories, old.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS assets_au AFTER UPDATE ON assets BEGIN
+    INSERT INTO assets_fts(assets_fts, rowid, name, asset_id, description, categories, tags)
+    VALUES ('delete', old.rowid, old.name, old.asset_id, old.description, old.categories, old.tags);
+    INSERT INTO assets_fts(rowid, name, asset_id, description, categories, tags)
+    VALUES (new.rowid, new.name, new.asset_id, new.description, new.categories, new.tags);
+END;
+"""
+
+RESULT_COLUMNS = ("group_id", "asset_id", "version", "name", "type", "status", "description", "categories", "tags", "updated_at")
+
+_fts_available = None
+
+
+def connect(path=None) -> sqlite3.Connection:
+    """
+    Open the catalog database, creating the schema (and FTS index, when SQLite has FTS5).
+    """
+    global _fts_available
+    conn = sqlite3.connect(path or storage.data_dir("exchange-catalog") / "catalog.db")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        for table in OLD_TABLES:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.executescript(SCHEMA)
+    if _fts_available is None or _fts_available:
+        try:
+            conn.executescript(FTS_SCHEMA)
+            _fts_available = True
+        except sqlite3.OperationalError:
+            # Built without FTS5: search falls back to LIKE
+            _fts_available = False
+    return conn
+
+
+def _text(values) -> str:
+    return " ".join(str(value) for value in values if value)
+
+
+def _categories(asset: dict) -> str:
+    parts = []
+    for category in asset.get("categories") or []:
+        if isinstance(category, dict):
+            values = category.get("value") or []
+            if isinstance(values, str):
+                values = [values]
+            parts.append(f"{category.get('displayName') or category.get('key')}: {_text(values)}")
+    return "; ".join(parts)
+
+
+def _tags(asset: dict) -> str:
+    tags = asset.get("labels") or asset.get("tags") or []
+    return _text(tag.get("value") if isinstance(tag, dict) else tag for tag in tags)
+
+
+def row_for(owner: str, org_id: str, generation: int, asset: dict) -> tuple:
+    raw = json.dumps(asset, sort_keys=True, default=str)
+    return (
+        owner,
+        org_id,
+        generation,
+        asset.get("groupId") or org_id,
+        asset.get("assetId"),
+        asset.get("version"),
+        asset.get("name"),
+        asset.get("type"),
+        asset.get("status"),
+        asset.get("description") or "",
+        _categories(asset),
+        _tags(asset),
+        asset.get("updatedAt") or asset.get("createdAt"),
+        hashlib.sha256(raw.encode("utf-8")).hexdigest(),
+        raw,
+    )
+
+
+def current_generation(conn: sqlite3.Connection, owner: str, org_id: str) -> int | None:
+    """
+    The generation searches read, or None before the first completed sync.
+    """
+    row = conn.execute("SELECT generation FROM syncs WHERE owner = ? AND org_id = ?", (owner, org_id)).fetchone()
+    return row[0] if row else None
+
+
+def upsert(conn: sqlite3.Connection, owner: str, org_id: str, generation: int, assets: list) -> int:
+    """
+    Insert or update assets; rows whose content is unchanged are left alone. Returns rows written.
+    """
+    rows = [row_for(owner, org_id, generation, asset) for asset in assets if asset.get("assetId")]
+    if not rows:
+        return 0
+    keys = [(row[3], row[4]) for row in rows]
+    digests = {}
+    for start in range(0, len(keys), 400):
+        chunk = keys[start:start + 400]
+        placeholders = ",".join("(?, ?)" for _ in chunk)
+        params = [value for key in chunk for value in key]
+        for group_id, asset_id, digest in conn.execute(
+            "SELECT group_id, asset_id, digest FROM assets WHERE owner = ? AND org_id = ? AND generation = ? "
+            f"AND (group_id, asset_id) IN (VALUES {placeholders})",
+            [owner, org_id, generation, *params],
+        ):
+            digests[(group_id, asset_id)] = digest
+
+    changed = [row for row in rows if digests.get((row[3], row[4])) != row[13]]
+    conn.executemany(
+        """
+        INSERT INTO assets (owner, org_id, generation, group_id, asset_id, version, name, type, status, description, categories, tags, updated_at, digest, raw)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (owner, org_id, generation, group_id, asset_id) DO UPDATE SET
+            version = excluded.version, name = excluded.name, type = excluded.type,
+            status = excluded.status, description = excluded.description,
+            categories = excluded.categories, tags = excluded.tags,
+            updated_at = excluded.updated_at, digest = excluded.digest, raw = excluded.raw
+        """,
+        changed,
+    )
+    return len(changed)
+
+
+def page_state(conn: sqlite3.Connection, owner: str, org_id: str, generation: int, offset: int) -> tuple:
+    """
+    (etag, asset keys, number of listing entries) stored for a page, or (None, [], 0).
+    """
+    row = conn.execute(
+        "SELECT etag, keys, size FROM pages WHERE owner = ? AND org_id = ? AND generation = ? AND page_offset = ?",
+        (owner, org_id, generation, offset),
+    ).fetchone()
+    if not row:
+        return None, [], 0
+    return row[0], json.loads(row[1] or "[]"), row[2]
+
+
+def save_page(conn: sqlite3.Connection, owner: str, org_id: str, generation: int, offset: int, etag: str | None, keys: list, size: int):
+    conn.execute(
+        "INSERT OR REPLACE INTO pages (owner, org_id, generation, page_offset, etag, keys, size) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (owner, org_id, generation, offset, etag, json.dumps(keys), size),
+    )
+
+
+def finish_sync(conn: sqlite3.Connection, owner: str, org_id: str, generation: int, seen: set, last_offset: int) -> int:
+    """
+    Drop assets and stored pages no longer in the listing, make `generation`
+    the one searches read and drop every other. Returns assets removed.
+    """
+    scope = (owner, org_id, generation)
+    conn.execute("DELETE FROM pages WHERE owner = ? AND org_id = ? AND generation = ? AND page_offset > ?", (*scope, last_offset))
+    stale = [
+        key for key in conn.execute(
+            "SELECT group_id, asset_id FROM assets WHERE owner = ? AND org_id = ? AND generation = ?", scope
+        )
+        if tuple(key) not in seen
+    ]
+    conn.executemany(
+        "DELETE FROM assets WHERE owner = ? AND org_id = ? AND generation = ? AND group_id = ? AND asset_id = ?",
+        [(*scope, *key) for key in stale],
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO syncs (owner, org_id, generation, synced_at) VALUES (?, ?, ?, ?)",
+        (*scope, time.time()),
+    )
+    conn.execute("DELETE FROM assets WHERE owner = ? AND org_id = ? AND generation != ?", scope)
+    conn.execute("DELETE FROM pages WHERE owner = ? AND org_id = ? AND generation != ?", scope)
+    return len(stale)
+
+
+def discard(conn: sqlite3.Connection, owner: str, org_id: str, generation: int):
+    """
+    Drop a staged generation that never became current.
+    """
+    scope = (owner, org_id, generation)
+    conn.execute("DELETE FROM assets WHERE owner = ? AND org_id = ? AND generation = ?", scope)
+    conn.execute("DELETE FROM pages WHERE owner = ? AND org_id = ? AND generation = ?", scope)
+
+
+def _match_expression(query: str) -> str:
+    # Each word becomes a quoted prefix term, so user input can't break FTS syntax
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search(
+    conn: sqlite3.Connection,
+    owner: str,
+    org_id: str,
+    query: str | None = None,
+    asset_type: str | None = None,
+    category: str | None = None,
+    limit: int = 25,
+) -> dict:
+    started = time.perf_counter()
+    generation = current_generation(conn, owner, org_id)
+    where = ["a.owner = ?", "a.org_id = ?", "a.generation = ?"]
+    params = [owner, org_id, generation]
+    if asset_type:
+        where.append("a.type = ?")
+        params.append(asset_type)
+    if category:
+        where.append("a.categories LIKE ?")
+        params.append(f"%{category}%")
+
+    columns = ", ".join(f"a.{column}" for column in RESULT_COLUMNS)
+    match = _match_expression(query or "")
+    if match and _fts_available:
+        sql = (
+            f"SELECT {columns} FROM assets_fts JOIN assets a ON a.rowid = assets_fts.rowid "
+            f"WHERE assets_fts MATCH ? AND {' AND '.join(where)} ORDER BY bm25(assets_fts) LIMIT ?"
+        )
+        params = [match, *params, limit]
+    else:
+        if match:
+            for word in re.findall(r"\w+", query):
+                where.append("(a.name LIKE ? OR a.asset_id LIKE ? OR a.description LIKE ? OR a.tags LIKE ?)")
+                params.extend([f"%{word}%"] * 4)
+        sql = f"SELECT {columns} FROM assets a WHERE {' AND '.join(where)} ORDER BY a.name LIMIT ?"
+        params.append(limit)
+
+    rows = [dict(zip(RESULT_COLUMNS, row)) for row in conn.execute(sql, params)]
+    synced = conn.execute("SELECT synced_at FROM syncs WHERE owner = ? AND org_id = ?", (owner, org_id)).fetchone()
+    total = conn.execute(
+        "SELECT COUNT(*) FROM assets WHERE owner = ? AND org_id = ? AND generation = ?", (owner, org_id, generation)
+    ).fetchone()[0]
+    return {
+        "results": rows,
+        "count": len(rows),
+        "catalog_size": total,
+        "synced_at": synced[0] if synced else None,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
@@ -1,6 +1,16 @@
-import httpx
+from . import dependency_graph, downloads, exchange_catalog, idempotency, jsonutil, metrics, projection, spill, upstream
+from .api_manager_tools import LIST_SLA_URL
 
+import asyncio
+import hashlib
+import json
 import os
+import re
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+import httpx
 
 EXCHANGE_BASE = "https://anypoint.mulesoft.com/exchange/api/v2"
 CATEGORY_URL = "https://anypoint.mulesoft.com/exchange/api/v2/organizations/{org_id}/assets/{group_id}/{asset_id}/{version}/categories/{category}"
@@ -10,8 +20,110 @@ ASSET_DETAILS_URL = "https://anypoint.mulesoft.com/exchange/api/v2/assets/{group
 DOWNLOAD_URL = "https://anypoint.mulesoft.com/exchange/api/{api_version}/assets/{org_id}/{asset_name}"
 CREATE_APP_URL = "https://anypoint.mulesoft.com/exchange/api/v2/organizations/{org_id}/applications?apiInstanceId={api_id}"
 CREATE_CONTRACT_URL = "https://anypoint.mulesoft.com/exchange/api/v2/organizations/{org_id}/applications/{app_id}/contracts"
+LIST_APPS_URL = "https://anypoint.mulesoft.com/exchange/api/v2/organizations/{org_id}/applications"
+
+# Fields kept by compact=True
+ASSET_SUMMARY_FIELDS = ["groupId", "assetId", "version", "name", "type", "status"]
+ASSET_DETAIL_SUMMARY_FIELDS = [
+    "groupId", "assetId", "version", "name", "type", "status", "description",
+    "categories", "dependencies", "files.classifier", "files.packaging", "files.downloadURL",
+]
+
+# Page size used when syncing the local catalog
+CATALOG_PAGE_SIZE = int(os.environ.get("ANYPOINT_CATALOG_PAGE_SIZE", "250"))
+
+# (token hash, group_id, asset_id, version) -> {"type", "dependencies"}, least recently used first.
+# Published versions are immutable; the token hash keeps one caller's lookups from answering another's.
+DEPENDENCY_CACHE_SIZE = int(os.environ.get("ANYPOINT_DEPENDENCY_CACHE_SIZE", "4096"))
+_dependency_cache = OrderedDict()
+
+# Characters replaced in local file names
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9._-]")
+
+# Default number of requests a bulk Exchange tool has in flight
+BULK_PARALLELISM = int(os.environ.get("ANYPOINT_BULK_PARALLELISM", "10"))
+
+
+async def _owner(token: str) -> str:
+    # Imported here: identity imports this module
+    from . import identity
+
+    return await identity.owner(token)
+
+
+def asset_categories(asset: dict) -> dict:
+    """
+    An asset's categories as {key: [values]}.
+    """
+    current = {}
+    for category in asset.get("categories") or []:
+        key = category.get("key") or category.get("tagKey")
+        value = category.get("value", [])
+        if key:
+            current[key] = [value] if isinstance(value, str) else list(value)
+    return current
+
+
+def category_changes(current: dict, desired: dict, replace: bool = False) -> list:
+    """
+    (category, current values, values to PUT) for every category that needs a write.
+    Without replace, desired values are added to what is already set.
+    """
+    changes = []
+    for key, values in desired.items():
+        values = [values] if isinstance(values, str) else list(values)
+        have = current.get(key, [])
+        if replace:
+            target = values
+            needed = set(values) != set(have)
+        else:
+            target = have + [value for value in values if value not in have]
+            needed = len(target) != len(have)
+        if needed:
+            changes.append((key, have, target))
+    return changes
+
+
+def file_name(asset_name: str, version: str | None, file: dict, used: set) -> str:
+    """
+    Maven-style local name for an asset file, e.g. orders-api-1.0.0-fat-raml.zip.
+    """
+    parts = [asset_name, version, file.get("classifier")]
+    # Every part comes from Exchange metadata: keep only characters that cannot leave the folder
+    base = _UNSAFE_NAME.sub("_", "-".join(str(part) for part in parts if part)).lstrip(".") or "file"
+    packaging = _UNSAFE_NAME.sub("_", str(file.get("packaging") or "")).strip(".")
+    extension = f".{packaging}" if packaging else ""
+    name, suffix = base + extension, 2
+    while name in used:
+        name, suffix = f"{base}-{suffix}{extension}", suffix + 1
+    used.add(name)
+    return name
+
+
+async def download_asset_files(client, headers: dict, files: list, download_dir: str, asset_name: str, version: str | None, max_parallel: int) -> list:
+    """
+    Download an asset's files concurrently into download_dir; one report per file.
+    The Authorization header is only sent to Anypoint itself (see downloads.credentials_allowed).
+    """
+    os.makedirs(download_dir, exist_ok=True)
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+    used = set()
+    headers = {"Authorization": headers["Authorization"]}
+
+    async def download(file):
+        path = os.path.join(download_dir, file_name(asset_name, version, file, used))
+        if os.path.dirname(os.path.realpath(path)) != os.path.realpath(download_dir):
+            return {"classifier": file.get("classifier"), "path": path, "status": "error", "message": "File name leaves download_dir"}
+        async with semaphore:
+            try:
+                report = await downloads.fetch(
+                    client, file["downloadURL"], path, headers, md5=file.get("md5"), sha1=file.get("sha1")
+                )
+            except Exception as e:
+                return {"classifier": file.get("classifier"), "path": path, "status": "error", "message": str(e)}
+        return {"classifier": file.get("classifier"), **report}
 
-
+    return await asyncio.gather(*(download(file) for file in files))
 
 
 # Register Exchange-related tools
@@ -21,41 +133,69 @@ def register(mcp):
 #List all assets in an organization
 
     @mcp.tool()
-    async def get_organization_assets(token: str, org_id: str) -> str:
+    async def get_organization_assets(
+        token: str,
+        org_id: str,
+        fields: list[str] | None = None,
+        compact: bool = False
+    ) -> str:
         """
         List all assets in Anypoint Exchange for a given organization.
+
+        fields  : Optional dotted paths to keep per asset, e.g. ["assetId", "version"]
+        compact : Return only groupId, assetId, version, name, type and status
         """
 
         url = f"{EXCHANGE_BASE}/assets"
         headers = {"Authorization": f"Bearer {token}"}
         params = {"organizationId": org_id}
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 response = await client.get(
                     url, headers=headers, params=params, timeout=30.0
                 )
                 response.raise_for_status()
-                return response.text
+                text = projection.project_text(
+                    "get_organization_assets",
+                    response.content,
+                    projection.resolve_fields(fields, compact, ASSET_SUMMARY_FIELDS)
+                )
+                return spill.maybe_spill("get_organization_assets", text)
             except Exception as exc:
                 return f"Error fetching assets: {exc}"
 
 #Get detailed information about a specific asset
 
     @mcp.tool()
-    async def get_asset_details(token: str, org_id: str, asset_id: str, version: str) -> str:
+    async def get_asset_details(
+        token: str,
+        org_id: str,
+        asset_id: str,
+        version: str,
+        fields: list[str] | None = None,
+        compact: bool = False
+    ) -> str:
         """
         Get detailed information about a specific asset in Anypoint Exchange.
+
+        fields  : Optional dotted paths to keep, e.g. ["name", "files.downloadURL"]
+        compact : Return only identity, status, description, categories,
+                  dependencies and file classifiers/links
         """
 
         url = f"{EXCHANGE_BASE}/assets/{org_id}/{asset_id}/{version}/asset"
         headers = {"Authorization": f"Bearer {token}"}
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 response = await client.get(url, headers=headers, timeout=30.0)
                 response.raise_for_status()
-                return response.text
+                return projection.project_text(
+                    "get_asset_details",
+                    response.content,
+                    projection.resolve_fields(fields, compact, ASSET_DETAIL_SUMMARY_FIELDS)
+                )
             except Exception as exc:
                 return f"Error fetching asset details: {exc}"
 
@@ -89,11 +229,11 @@ def register(mcp):
                     "assetTypeRestrictions": asset_types
                 }
 
-                async with httpx.AsyncClient() as client:
+                async with upstream.client(org_id) as client:
                     try:
                         resp = await client.post(url, headers=headers, json=payload, timeout=40.0)
                         resp.raise_for_status()
-                        return resp.json()
+                        return jsonutil.loads(resp.content)
                     except Exception as e:
                         return {"error": str(e)}
 
@@ -128,7 +268,7 @@ def register(mcp):
             "tagValue": [value]
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 resp = await client.put(url, headers=headers, json=payload, timeout=40.0)
                 resp.raise_for_status()
@@ -143,7 +283,12 @@ def register(mcp):
         org_id: str,
         owner_id: str,
         asset_name: str,
-        api_version: str = "v1"
+        api_version: str = "v1",
+        fields: list[str] | None = None,
+        compact: bool = False,
+        download_dir: str | None = None,
+        classifiers: list[str] | None = None,
+        max_parallel: int | None = None
     ) -> dict:
         """
         UNIVERSAL Exchange Asset Downloader (V1 & V2 smart support)
@@ -165,10 +310,24 @@ def register(mcp):
             owner_id    : User ID (x-owner-id)
             asset_name  : Asset to download (ex: "istika-parent-pom-new")
             api_version : "v1" or "v2"
+            fields      : Optional dotted paths to keep in "raw"
+            compact     : Omit "raw" (the files list already carries the links/checksums)
+            download_dir: Also download the files into this folder (relative to the
+                          server's downloads folder; paths outside it are refused):
+                          all at once (up to max_parallel), large files in parallel
+                          Range chunks, resumed after an interruption and verified
+                          against md5/sha1
+            classifiers : Only download files with these classifiers (e.g. ["fat-raml", "pom"])
         """
 
+        if download_dir:
+            try:
+                download_dir = str(downloads.resolve_dir(download_dir))
+            except ValueError as e:
+                return {"status": "error", "message": str(e)}
+
         # Build dynamic URL
-        url = f"https://anypoint.mulesoft.com/exchange/api/{api_version}/assets/{org_id}/{asset_name}"
+        url = DOWNLOAD_URL.format(api_version=api_version, org_id=org_id, asset_name=asset_name)
 
         headers = {
             "Authorization": f"Bearer {token}",
@@ -177,11 +336,12 @@ def register(mcp):
             "Content-Type": "application/json"
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 resp = await client.get(url, headers=headers, timeout=30)
                 resp.raise_for_status()
-                data = resp.json()
+                data = jsonutil.loads(resp.content)
+                metrics.incr("response_bytes_in", len(resp.content), tool="download_exchange_asset")
 
                 # In v2 assets are inside "files" → same structure
                 files = data.get("files", [])
@@ -197,13 +357,32 @@ def register(mcp):
                         "downloadURL": f.get("downloadURL")
                     })
 
-                return {
+                result = {
                     "status": "success",
                     "api_version": api_version,
                     "asset": asset_name,
                     "files": extracted,
-                    "raw": data
                 }
+                if not compact:
+                    result["raw"] = projection.select(data, fields)
+
+                if download_dir:
+                    wanted = [
+                        f for f in extracted
+                        if f["downloadURL"] and (classifiers is None or f["classifier"] in classifiers)
+                    ]
+                    with upstream.lane(upstream.BULK):
+                        reports = await download_asset_files(
+                            client, headers, wanted, download_dir, asset_name, data.get("version"),
+                            max_parallel or BULK_PARALLELISM
+                        )
+                    failed = sum(1 for report in reports if report["status"] == "error")
+                    result["downloads"] = reports
+                    if failed:
+                        result["status"] = "error" if failed == len(reports) else "partial_success"
+
+                metrics.incr("response_bytes_out", len(jsonutil.dumps_bytes(result)), tool="download_exchange_asset")
+                return result
 
             except Exception as e:
                 return {"status": "error", "message": str(e)}
@@ -211,19 +390,22 @@ def register(mcp):
 
     #Create Application
     @mcp.tool()
+    @idempotency.idempotent
     async def create_application(
         token: str,
         org_id: str,
         api_instance_id: str, 
         app_name: str,
         description: str,
-        url: str = "http://example.com"
-        
-        
+        url: str = "http://example.com",
+        idempotency_key: str | None = None
     ) -> dict:
         """
         Create a Client Application in Anypoint Exchange.
         Required to obtain Client ID/Secret before requesting access.
+
+        idempotency_key: retries with the same key return the first result
+        instead of creating another application.
         """
         
         url = CREATE_APP_URL.format(
@@ -247,7 +429,7 @@ def register(mcp):
             "apiEndpoints": False
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 resp = await client.post(
                     url, 
@@ -257,7 +439,7 @@ def register(mcp):
                     timeout=40.0
                 )
                 resp.raise_for_status()
-                return resp.json()
+                return jsonutil.loads(resp.content)
             except Exception as e:
                 return {"status": "error", "message": str(e)}
             
@@ -304,12 +486,470 @@ def register(mcp):
         if tier_id is not None:
             payload["requestedTierId"] = tier_id
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client(org_id) as client:
             try:
                 resp = await client.post(url, headers=headers, json=payload, timeout=40.0)
                 resp.raise_for_status()
-                return resp.json()
+                return jsonutil.loads(resp.content)
+            except httpx.HTTPStatusError as e:
+                return {"status": "error", "status_code": e.response.status_code, "message": str(e)}
             except Exception as e:
                 # Return valid JSON error so the Agent knows what happened
                 return {"status": "error", "message": str(e)}
-    
\ No newline at end of file
+
+
+    #SYNC LOCAL EXCHANGE CATALOG
+    @mcp.tool()
+    async def sync_exchange_catalog(
+        token: str,
+        org_id: str,
+        full: bool = False
+    ) -> dict:
+        """
+        Sync the org's Exchange listing into the local catalog used by
+        search_exchange_catalog.
+
+        Incremental by default: each listing page is requested with the ETag
+        from the last sync and skipped on 304; only new or changed assets are
+        written. full=True ignores stored ETags and re-reads every page into a
+        fresh copy of the catalog, which replaces the current one only once the
+        whole listing has been read.
+        """
+
+        try:
+            owner = await _owner(token)
+        except Exception as e:
+            return {"status": "error", "message": f"Cannot verify the caller: {e}"}
+
+        url = f"{EXCHANGE_BASE}/assets"
+        headers = {"Authorization": f"Bearer {token}"}
+        stats = {"pages": 0, "pages_not_modified": 0, "assets_written": 0, "assets_removed": 0}
+        seen = set()
+        offset = 0
+
+        with closing(exchange_catalog.connect()) as conn:
+            current = exchange_catalog.current_generation(conn, owner, org_id)
+            # Full syncs (and the first one) are staged in a new generation
+            staged = full or current is None
+            generation = (current or 0) + 1 if staged else current
+            if staged:
+                exchange_catalog.discard(conn, owner, org_id, generation)
+
+            async with upstream.client(org_id) as client:
+                with upstream.lane(upstream.BULK):
+                    while True:
+                        etag, keys, size = exchange_catalog.page_state(conn, owner, org_id, generation, offset)
+                        request_headers = dict(headers, **({"If-None-Match": etag} if etag else {}))
+                        params = {"organizationId": org_id, "offset": offset, "limit": CATALOG_PAGE_SIZE}
+
+                        try:
+                            resp = await client.get(url, headers=request_headers, params=params, timeout=30.0)
+                            if resp.status_code != 304:
+                                resp.raise_for_status()
+                        except Exception as e:
+                            if staged:
+                                # The current catalog stays as it was
+                                exchange_catalog.discard(conn, owner, org_id, generation)
+                            # Incremental: keep what was synced so far; nothing is removed on a partial sync
+                            conn.commit()
+                            return {"status": "error", "offset": offset, "message": str(e), **stats}
+
+                        stats["pages"] += 1
+                        if resp.status_code == 304:
+                            stats["pages_not_modified"] += 1
+                        else:
+                            assets = jsonutil.loads(resp.content)
+                            size = len(assets)
+                            keys = [
+                                [asset.get("groupId") or org_id, asset["assetId"]]
+                                for asset in assets if asset.get("assetId")
+                            ]
+                            stats["assets_written"] += exchange_catalog.upsert(conn, owner, org_id, generation, assets)
+                            exchange_catalog.save_page(conn, owner, org_id, generation, offset, resp.headers.get("ETag"), keys, size)
+                            conn.commit()
+
+                        seen.update(tuple(key) for key in keys)
+                        # A short page ends the listing (entries without an assetId still count)
+                        if size < CATALOG_PAGE_SIZE:
+                            break
+                        offset += CATALOG_PAGE_SIZE
+
+            stats["assets_removed"] = exchange_catalog.finish_sync(conn, owner, org_id, generation, seen, offset)
+            conn.commit()
+
+        return {"status": "success", "assets": len(seen), **stats}
+
+    #SEARCH LOCAL EXCHANGE CATALOG
+    @mcp.tool()
+    async def search_exchange_catalog(
+        token: str,
+        org_id: str,
+        query: str | None = None,
+        asset_type: str | None = None,
+        category: str | None = None,
+        limit: int = 25
+    ) -> dict:
+        """
+        Search the caller's local Exchange catalog (no calls to Exchange).
+
+        query      : Words matched (as prefixes) against name, assetId,
+                     description, categories and tags; best matches first
+        asset_type : Exact type filter, e.g. "rest-api", "raml-fragment"
+        category   : Substring of a category value, e.g. "Finance"
+
+        Run sync_exchange_catalog first (and again to pick up changes).
+        """
+
+        try:
+            owner = await _owner(token)
+        except Exception as e:
+            return {"status": "error", "message": f"Cannot verify the caller: {e}"}
+
+        with closing(exchange_catalog.connect()) as conn:
+            result = exchange_catalog.search(conn, owner, org_id, query, asset_type, category, limit)
+
+        if result["synced_at"] is None:
+            return {"status": "error", "message": f"Catalog for org {org_id} is empty; run sync_exchange_catalog first"}
+        return {"status": "success", **result}
+
+    #RESOLVE EXCHANGE DEPENDENCIES
+    @mcp.tool()
+    async def resolve_exchange_dependencies(
+        token: str,
+        org_id: str,
+        group_id: str,
+        asset_id: str,
+        version: str,
+        max_parallel: int = 16
+    ) -> dict:
+        """
+        Resolve the transitive fragment/library dependencies of an Exchange asset.
+
+        The graph is crawled concurrently: each dependency is fetched as soon as
+        its parent is known, and every group/asset/version is fetched once
+        (and remembered across calls). Reports cycles and version conflicts
+        (the highest requested version wins) and returns the flattened set,
+        with `dependencies_json` ready for import_design_project_from_zip.
+        """
+
+        started = time.monotonic()
+        root = (group_id, asset_id, version)
+        headers = {"Authorization": f"Bearer {token}"}
+        semaphore = asyncio.Semaphore(max(1, max_parallel))
+        graph, types, missing, tasks = {}, {}, [], {}
+        stats = {"requests": 0, "cached": 0}
+        token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+        async with upstream.client(org_id) as client:
+
+            async def fetch(node):
+                key = (token_hash, *node)
+                if key in _dependency_cache:
+                    stats["cached"] += 1
+                    _dependency_cache.move_to_end(key)
+                    return _dependency_cache[key]
+                async with semaphore:
+                    stats["requests"] += 1
+                    resp = await client.get(f"{EXCHANGE_BASE}/assets/{node[0]}/{node[1]}/{node[2]}/asset", headers=headers, timeout=30.0)
+                    resp.raise_for_status()
+                data = jsonutil.loads(resp.content)
+                entry = {
+                    "type": data.get("type"),
+                    "dependencies": [
+                        (dep["groupId"], dep["assetId"], dep["version"])
+                        for dep in data.get("dependencies") or []
+                        if dep.get("groupId") and dep.get("assetId") and dep.get("version")
+                    ],
+                }
+                _dependency_cache[key] = entry
+                while len(_dependency_cache) > DEPENDENCY_CACHE_SIZE:
+                    _dependency_cache.popitem(last=False)
+                return entry
+
+            async def crawl(node):
+                try:
+                    entry = await fetch(node)
+                except Exception as e:
+                    missing.append({"asset": dependency_graph.node_key(node), "message": str(e)})
+                    graph[node] = []
+                    return
+                graph[node] = entry["dependencies"]
+                types[node] = entry["type"]
+                # Children start right away; nobody waits on them here, so cycles can't deadlock
+                for child in entry["dependencies"]:
+                    if child not in tasks:
+                        tasks[child] = asyncio.create_task(crawl(child))
+
+            tasks[root] = asyncio.create_task(crawl(root))
+            while pending := [task for task in tasks.values() if not task.done()]:
+                await asyncio.gather(*pending)
+
+        if root not in types:
+            return {"status": "error", "message": missing[0]["message"] if missing else "Asset not found"}
+
+        resolved = dependency_graph.resolve(graph, [root])
+        dependencies = [
+            {"groupId": node[0], "assetId": node[1], "version": node[2], "type": types.get(node)}
+            for node in resolved["selected"] if node in types
+        ]
+        cycles = [[dependency_graph.node_key(node) for node in cycle] for cycle in dependency_graph.find_cycles(graph)]
+
+        return {
+            "status": "success" if not (missing or cycles or resolved["conflicts"]) else "warning",
+            "root": dependency_graph.node_key(root),
+            "dependencies": dependencies,
+            "dependencies_json": json.dumps([
+                {key: dep[key] for key in ("groupId", "assetId", "version")} for dep in dependencies
+            ]),
+            "graph": {dependency_graph.node_key(node): [dependency_graph.node_key(child) for child in children] for node, children in graph.items()},
+            "cycles": cycles,
+            "conflicts": resolved["conflicts"],
+            "missing": missing,
+            "depth": resolved["depth"],
+            "requests": stats["requests"],
+            "cached": stats["cached"],
+            "seconds": round(time.monotonic() - started, 3),
+        }
+
+    #BULK CATEGORIZE ASSETS
+    @mcp.tool()
+    async def bulk_categorize_assets(
+        token: str,
+        org_id: str,
+        assets: list[dict],
+        categories: dict | None = None,
+        replace: bool = False,
+        dry_run: bool = False,
+        max_parallel: int | None = None
+    ) -> dict:
+        """
+        Set Exchange categories on many assets, writing only what is missing or stale.
+
+        assets     : [{"asset_id": "orders-api", "version": "1.0.0",
+                       "categories": {"Domain": ["Sales"]}}, ...]; per-asset
+                     categories are merged over `categories`, which applies to all
+        categories : {"Category key": ["value", ...]} for every asset
+        replace    : Make the values exactly the desired ones (default: add them
+                     to the values already set)
+        dry_run    : Only report the changes
+
+        Current categories are read concurrently and only differing categories
+        are PUT, at most max_parallel (default ANYPOINT_BULK_PARALLELISM)
+        requests at a time; throttled calls are retried after Retry-After.
+        Returns changed/unchanged/failed counts, the changes made and the failures.
+        """
+
+        started = time.monotonic()
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        semaphore = asyncio.Semaphore(max(1, max_parallel or BULK_PARALLELISM))
+        stats = {"reads": 0, "writes": 0}
+
+        async with upstream.client(org_id) as client:
+
+            async def request(method, url, payload=None):
+                async with semaphore:
+                    resp = await client.request(method, url, headers=headers, json=payload, timeout=30.0)
+                    resp.raise_for_status()
+                    return resp
+
+            async def categorize(index, asset):
+                if not isinstance(asset, dict):
+                    asset = {}
+                missing = [field for field in ("asset_id", "version") if not asset.get(field)]
+                if missing:
+                    return {"index": index, "status": "error", "message": f"Missing {', '.join(missing)}"}
+                name = f"{asset['asset_id']}/{asset['version']}"
+                own = asset.get("categories") or {}
+                if not isinstance(own, dict):
+                    return {"index": index, "asset": name, "status": "error", "message": "categories must be an object"}
+                desired = {**(categories or {}), **own}
+                try:
+                    stats["reads"] += 1
+                    resp = await request("GET", f"{EXCHANGE_BASE}/assets/{org_id}/{asset['asset_id']}/{asset['version']}/asset")
+                    current = asset_categories(projection.loads(resp.content, ["categories"]))
+                except Exception as e:
+                    return {"asset": name, "status": "error", "message": f"Reading categories failed: {e}"}
+
+                changes = category_changes(current, desired, replace)
+                if not changes:
+                    return {"asset": name, "status": "unchanged"}
+
+                async def write(key, target):
+                    url = ASSET_CATEGORY_URL.format(org_id=org_id, asset_id=asset["asset_id"], version=asset["version"], category=key)
+                    stats["writes"] += 1
+                    await request("PUT", url, {"tagValue": target})
+
+                entry = {
+                    "asset": name,
+                    "status": "changed",
+                    "changes": [{"category": key, "from": have, "to": target} for key, have, target in changes],
+                }
+                if dry_run:
+                    return entry
+
+                results = await asyncio.gather(*(write(key, target) for key, _, target in changes), return_exceptions=True)
+                errors = [f"{key}: {result}" for (key, _, _), result in zip(changes, results) if isinstance(result, Exception)]
+                if errors:
+                    entry.update(status="error", message="; ".join(errors))
+                return entry
+
+            with upstream.lane(upstream.BULK):
+                items = await asyncio.gather(*(categorize(index, asset) for index, asset in enumerate(assets)))
+
+        counts = {status: sum(1 for item in items if item["status"] == status) for status in ("changed", "unchanged", "error")}
+        return {
+            "status": "success" if not counts["error"] else ("error" if counts["error"] == len(items) else "partial_success"),
+            "dry_run": dry_run,
+            "total": len(items),
+            "changed": counts["changed"],
+            "unchanged": counts["unchanged"],
+            "failed": counts["error"],
+            **stats,
+            "seconds": round(time.monotonic() - started, 2),
+            "changes": [item for item in items if item["status"] == "changed"],
+            "failures": [item for item in items if item["status"] == "error"],
+        }
+
+    #ONBOARD CONSUMER (APPLICATION + CONTRACTS)
+    @mcp.tool()
+    async def onboard_consumer(
+        token: str,
+        org_id: str,
+        app_name: str,
+        contracts: list[dict],
+        env_id: str | None = None,
+        app_id: str | None = None,
+        description: str = "",
+        url: str = "http://example.com",
+        max_parallel: int | None = None
+    ) -> dict:
+        """
+        Give one client application access to many API instances in one call.
+
+        The application is app_id if given, else the org's application named
+        app_name, else a new one (create_application).
+
+        contracts: [{"instance_id": "18745623", "asset_id": "orders-api",
+                     "asset_version": "1.0.0", "group_id": org_id, "version": "v1",
+                     "env_id": env_id, "tier": "Gold"}, ...]
+        group_id, version and env_id are optional; "tier" is a tier name looked
+        up with list_sla_tiers (needs env_id), or pass "tier_id" directly.
+
+        Tier lookups run while the application is resolved; contracts are then
+        requested concurrently (at most max_parallel, default
+        ANYPOINT_BULK_PARALLELISM). Existing contracts are reported, not failed.
+        Returns the application (id, clientId, reused) and one result per contract.
+        """
+
+        started = time.monotonic()
+        if not contracts:
+            return {"status": "error", "message": "No contracts requested"}
+
+        # Malformed entries are reported in place; the rest still go through
+        problems = {}
+        for index, contract in enumerate(contracts):
+            if not isinstance(contract, dict):
+                problems[index] = "Contract must be an object"
+                continue
+            missing = [key for key in ("instance_id", "asset_id", "asset_version") if not contract.get(key)]
+            if missing:
+                problems[index] = f"Missing {', '.join(missing)}"
+        valid = [contract for index, contract in enumerate(contracts) if index not in problems]
+        if not valid:
+            return {
+                "status": "error",
+                "message": "No valid contracts",
+                "contracts": [{"index": index, "status": "error", "message": message} for index, message in problems.items()],
+            }
+
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        semaphore = asyncio.Semaphore(max(1, max_parallel or BULK_PARALLELISM))
+
+        async def resolve_application():
+            if app_id:
+                return {"id": app_id, "reused": True}
+            async with upstream.client(org_id) as client:
+                resp = await client.get(LIST_APPS_URL.format(org_id=org_id), headers=headers, timeout=30.0)
+                resp.raise_for_status()
+            for app in jsonutil.loads(resp.content):
+                if app.get("name") == app_name:
+                    return {"id": app["id"], "clientId": app.get("clientId"), "reused": True}
+
+            created = await create_application(token, org_id, str(valid[0]["instance_id"]), app_name, description, url)
+            if "id" not in created:
+                raise RuntimeError(created.get("message", f"Application not created: {created}"))
+            return {"id": created["id"], "clientId": created.get("clientId"), "clientSecret": created.get("clientSecret"), "reused": False}
+
+        async def tier_names(env, instance_id):
+            async with semaphore, upstream.client(org_id) as client:
+                resp = await client.get(LIST_SLA_URL.format(org_id=org_id, env_id=env, instance_id=instance_id), headers=headers, timeout=30.0)
+                resp.raise_for_status()
+            tiers = jsonutil.loads(resp.content)
+            tiers = tiers.get("tiers", []) if isinstance(tiers, dict) else tiers
+            return {tier.get("name"): tier.get("id") for tier in tiers}
+
+        # One tier listing per instance, started alongside the application lookup
+        lookups = {}
+        for contract in valid:
+            if contract.get("tier") and "tier_id" not in contract:
+                key = (contract.get("env_id") or env_id, str(contract["instance_id"]))
+                if key[0] and key not in lookups:
+                    lookups[key] = asyncio.ensure_future(tier_names(*key))
+
+        try:
+            application = await resolve_application()
+        except Exception as e:
+            for lookup in lookups.values():
+                lookup.cancel()
+            return {"status": "error", "step": "application", "message": str(e)}
+
+        async def request_access(contract):
+            instance_id = str(contract["instance_id"])
+            entry = {"instance_id": instance_id, "asset_id": contract.get("asset_id")}
+            tier_id = contract.get("tier_id")
+
+            if tier_id is None and contract.get("tier"):
+                key = (contract.get("env_id") or env_id, instance_id)
+                if key not in lookups:
+                    return dict(entry, status="error", message="env_id is required to choose a tier by name")
+                try:
+                    names = await lookups[key]
+                except Exception as e:
+                    return dict(entry, status="error", message=f"Listing tiers failed: {e}")
+                if contract["tier"] not in names:
+                    return dict(entry, status="error", message=f"Tier '{contract['tier']}' not found; available: {sorted(names)}")
+                tier_id = names[contract["tier"]]
+
+            async with semaphore:
+                result = await create_api_contract(
+                    token, org_id, application["id"], instance_id, contract["asset_id"],
+                    contract.get("group_id") or org_id, contract["asset_version"],
+                    contract.get("version", "v1"), tier_id
+                )
+            if result.get("status") == "error":
+                # 409: the application already has a contract with this instance
+                status = "exists" if result.get("status_code") == 409 else "error"
+                return dict(entry, status=status, tier_id=tier_id, message=result.get("message"))
+            return dict(entry, status="success", tier_id=tier_id, contract_id=result.get("id"), contract_status=result.get("status"))
+
+        async def request_or_report(index, contract):
+            if index in problems:
+                entry = {"index": index}
+                if isinstance(contract, dict):
+                    entry.update(instance_id=contract.get("instance_id"), asset_id=contract.get("asset_id"))
+                return dict(entry, status="error", message=problems[index])
+            return await request_access(contract)
+
+        results = await asyncio.gather(*(request_or_report(index, contract) for index, contract in enumerate(contracts)))
+
+        failed = sum(1 for result in results if result["status"] == "error")
+        return {
+            "status": "success" if not failed else ("error" if failed == len(results) else "partial_success"),
+            "application": application,
+            "total": len(results),
+            "succeeded": sum(1 for result in results if result["status"] == "success"),
+            "existing": sum(1 for result in results if result["status"] == "exists"),
+            "failed": failed,
+            "seconds": round(time.monotonic() - started, 2),
+            "contracts": results,
+        }
@@ -0,0 +1,158 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+from . import metrics
+
+# Hedged GETs for latency-sensitive read tools.
+#
+# If the first attempt hasn't answered within the tool's own recent p95
+# latency, an identical second request is sent and whichever answers first
+# wins; the other is cancelled. A token bucket per tool caps hedges to a
+# fraction of that tool's eligible requests so tail latency drops without
+# doubling traffic.
+
+# Opt-in per tool, e.g. "list_environments,get_asset_details,list_api_instances"
+HEDGED_TOOLS = {
+    name.strip()
+    for name in os.environ.get("ANYPOINT_HEDGED_TOOLS", "").split(",")
+    if name.strip()
+}
+HEDGE_PERCENTILE = float(os.environ.get("ANYPOINT_HEDGE_PERCENTILE", "0.95"))
+HEDGE_MAX_RATIO = float(os.environ.get("ANYPOINT_HEDGE_MAX_RATIO", "0.1"))
+MIN_SAMPLES = 20
+MIN_DELAY = 0.01
+WINDOW = 200
+
+
+class LatencyTracker:
+    """
+    Rolling window of recent latencies for one tool.
+
+    Cancelled hedge losers are kept as censored samples: they only tell us the
+    answer would have taken at least that long. The percentile is read from a
+    Kaplan-Meier estimate so those slow attempts still push the delay up
+    instead of silently leaving the window to the fast winners.
+    """
+
+    def __init__(self, window: int = WINDOW):
+        # (seconds, censored)
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float, censored: bool = False):
+        self.samples.append((seconds, censored))
+
+    def delay(self, percentile: float = HEDGE_PERCENTILE) -> float | None:
+        """
+        Hedge delay, or None until there are enough samples to trust it.
+        """
+        if len(self.samples) < MIN_SAMPLES:
+            return None
+        # Completed answers sort before censored ones at the same time
+        ordered = sorted(self.samples)
+        at_risk = len(ordered)
+        surviving = 1.0
+        for seconds, censored in ordered:
+            if not censored:
+                surviving *= 1 - 1 / at_risk
+                if 1 - surviving >= percentile:
+                    return max(MIN_DELAY, seconds)
+            at_risk -= 1
+        # The percentile lies beyond what was observed: use the slowest sample
+        return max(MIN_DELAY, ordered[-1][0])
+
+
+class HedgeBudget:
+    """
+    Token bucket: every eligible request earns `ratio` tokens, a hedge costs one.
+    """
+
+    def __init__(self, ratio: float = HEDGE_MAX_RATIO, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = 0.0
+
+    def earn(self):
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def spend(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+_trackers = {}
+_budgets = {}
+
+
+def enabled(tool_name: str | None, method: str) -> bool:
+    return method == "GET" and tool_name in HEDGED_TOOLS
+
+
+def tracker_for(tool_name: str) -> LatencyTracker:
+    tracker = _trackers.get(tool_name)
+    if tracker is None:
+        tracker = _trackers[tool_name] = LatencyTracker()
+    return tracker
+
+
+def budget_for(tool_name: str) -> HedgeBudget:
+    # Per tool, so one slow tool cannot spend the hedges of every other tool
+    budget = _budgets.get(tool_name)
+    if budget is None:
+        budget = _budgets[tool_name] = HedgeBudget()
+    return budget
+
+
+async def _timed(send, request, tracker):
+    started = time.monotonic()
+    try:
+        response = await send(request)
+    except asyncio.CancelledError:
+        tracker.record(time.monotonic() - started, censored=True)
+        raise
+    tracker.record(time.monotonic() - started)
+    return response
+
+
+async def send_hedged(tool_name: str, request, send):
+    """
+    Send `request` via `send`, hedging with a second attempt if it runs slow.
+    `send` must return a fully-read response.
+    """
+    tracker = tracker_for(tool_name)
+    budget = budget_for(tool_name)
+    budget.earn()
+    metrics.incr("hedge_eligible", tool=tool_name)
+
+    primary = asyncio.create_task(_timed(send, request, tracker))
+    attempts = {primary}
+
+    try:
+        delay = tracker.delay()
+        if delay is not None:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                if budget.spend():
+                    metrics.incr("hedges_sent", tool=tool_name)
+                    attempts.add(asyncio.create_task(_timed(send, request, tracker)))
+                else:
+                    metrics.incr("hedges_skipped_budget", tool=tool_name)
+
+        pending = set(attempts)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        metrics.incr("hedges_won", tool=tool_name)
+                    return task.result()
+
+        # Every attempt failed: surface the primary's error
+        return primary.result()
+    finally:
+        for task in attempts:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,219 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+from . import jsonutil, metrics, storage, upstream
+
+# Idempotency keys for write tools.
+#
+# A tool decorated with @idempotent takes an optional idempotency_key. Keys
+# belong to the caller: the token's user (identity.session), so another
+# caller reusing a key never sees the stored result. The first call with a key
+# runs the tool and, unless it returned an error, its result (with secrets
+# such as clientSecret removed) is stored in SQLite for
+# ANYPOINT_IDEMPOTENCY_TTL seconds; later calls with the same key get it back
+# without touching Anypoint. Calls that arrive while the first one is still
+# running wait for it instead of sending a second POST. A key reused with
+# different arguments is refused. The token is not part of the comparison, so
+# retries with a refreshed token still match.
+#
+# A call whose write may have reached Anypoint without an answer (timeout,
+# dropped connection, cancellation, 504) leaves the key reserved as
+# "unknown": retries get an "outcome unknown" error instead of a second POST.
+
+IDEMPOTENCY_TTL = float(os.environ.get("ANYPOINT_IDEMPOTENCY_TTL", str(24 * 3600)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outcomes (
+    tool TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    state TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (tool, owner, key)
+);
+"""
+
+DONE = "done"
+UNKNOWN = "unknown"
+
+IGNORED_ARGUMENTS = ("token", "idempotency_key")
+
+# Result fields never written to disk
+SECRET_FIELDS = {"clientSecret", "client_secret", "secret", "password", "access_token", "refresh_token"}
+
+# (tool, owner, key) -> (fingerprint, future resolved with the result, or None if the call failed)
+_in_flight = {}
+
+
+def connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(storage.data_dir("idempotency") / "results.db")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def fingerprint(arguments: dict) -> str:
+    return hashlib.sha256(json.dumps(arguments, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def is_error(result) -> bool:
+    if isinstance(result, str):
+        return result.startswith(("Error", "HTTP Error"))
+    return isinstance(result, dict) and (result.get("status") == "error" or "error" in result)
+
+
+def redact(value):
+    """
+    A copy of value without SECRET_FIELDS (at any depth).
+    """
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items() if key not in SECRET_FIELDS}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def lookup(tool: str, owner: str, key: str):
+    """
+    The stored (fingerprint, state, result) for a key, or None if unknown or expired.
+    """
+    with closing(connect()) as conn:
+        row = conn.execute(
+            "SELECT fingerprint, state, result FROM outcomes WHERE tool = ? AND owner = ? AND key = ? AND created_at > ?",
+            (tool, owner, key, time.time() - IDEMPOTENCY_TTL),
+        ).fetchone()
+    return (row[0], row[1], jsonutil.loads(row[2])) if row else None
+
+
+def save(tool: str, owner: str, key: str, digest: str, result, state: str = DONE):
+    with closing(connect()) as conn, conn:
+        conn.execute("DELETE FROM outcomes WHERE created_at <= ?", (time.time() - IDEMPOTENCY_TTL,))
+        conn.execute(
+            "INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (tool, owner, key, digest, state, jsonutil.dumps(redact(result)), time.time()),
+        )
+
+
+def _error(message: str, returns_text: bool, **details):
+    return f"Error: {message}" if returns_text else {"status": "error", "message": message, **details}
+
+
+def _mismatch(tool: str, key: str, returns_text: bool):
+    return _error(f"Idempotency key '{key}' was already used for {tool} with different arguments", returns_text)
+
+
+def _outcome_unknown(tool: str, key: str, writes: list, returns_text: bool):
+    message = (
+        f"Outcome unknown: an earlier {tool} call with idempotency key '{key}' sent a write that was never "
+        "answered, so it may or may not have taken effect. Check whether the resource exists (e.g. by name) "
+        "and, if it does not, retry with a new idempotency key."
+    )
+    return _error(message, returns_text, outcome="unknown", writes=writes)
+
+
+def _replayed(result, how: str):
+    if isinstance(result, dict):
+        return dict(result, idempotent_replay=how)
+    return result
+
+
+def _ambiguous(writes: list, finished: bool) -> list:
+    """
+    The writes that may have taken effect without the caller learning the result.
+    """
+    return [
+        write for write in writes
+        if write["status"] in (None, 504)
+        # Answered, but the call died before it could report the result
+        or (not finished and write["status"] < 400)
+    ]
+
+
+async def _owner(token) -> str:
+    # Imported here: identity imports the tool modules, which import this one
+    from . import identity
+
+    return await identity.owner(token)
+
+
+async def run(tool: str, key: str, arguments: dict, call, returns_text: bool = False):
+    """
+    Run call() at most once per (tool, caller, key) while its outcome is kept.
+    """
+    try:
+        owner = await _owner(arguments.get("token"))
+    except Exception as e:
+        return _error(f"Cannot verify the caller for idempotency key '{key}': {e}", returns_text)
+    digest = fingerprint({name: value for name, value in arguments.items() if name not in IGNORED_ARGUMENTS})
+
+    while True:
+        stored = lookup(tool, owner, key)
+        if stored:
+            stored_digest, state, result = stored
+            if stored_digest != digest:
+                return _mismatch(tool, key, returns_text)
+            if state == UNKNOWN:
+                metrics.incr("idempotency", tool=tool, outcome="unknown")
+                return _outcome_unknown(tool, key, result, returns_text)
+            metrics.incr("idempotency", tool=tool, outcome="replayed")
+            return _replayed(result, "stored")
+
+        pending = _in_flight.get((tool, owner, key))
+        if pending is None:
+            break
+        if pending[0] != digest:
+            return _mismatch(tool, key, returns_text)
+        result = await asyncio.shield(pending[1])
+        if result is not None:
+            metrics.incr("idempotency", tool=tool, outcome="joined")
+            return _replayed(result, "in_flight")
+        # The original call raised or was cancelled: look again (it may have left the key "unknown")
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[(tool, owner, key)] = (digest, future)
+    result = None
+    try:
+        with upstream.record_writes() as writes:
+            try:
+                result = await call()
+            except BaseException:
+                unanswered = _ambiguous(writes, finished=False)
+                if unanswered:
+                    save(tool, owner, key, digest, unanswered, UNKNOWN)
+                raise
+        if not is_error(result):
+            save(tool, owner, key, digest, result)
+        elif unanswered := _ambiguous(writes, finished=True):
+            save(tool, owner, key, digest, unanswered, UNKNOWN)
+        metrics.incr("idempotency", tool=tool, outcome="executed")
+        return result
+    finally:
+        del _in_flight[(tool, owner, key)]
+        future.set_result(result)
+
+
+def idempotent(fn):
+    """
+    Decorator for write tools that declare an `idempotency_key: str | None = None` parameter.
+    """
+    signature = inspect.signature(fn)
+    returns_text = signature.return_annotation is str
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = bound.arguments.get("idempotency_key")
+        if not key:
+            return await fn(*args, **kwargs)
+        return await run(fn.__name__, key, dict(bound.arguments), lambda: fn(*args, **kwargs), returns_text)
+
+    return wrapper
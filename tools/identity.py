@@ -0,0 +1,306 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import os
+import re
+import time
+from collections import OrderedDict
+
+from . import access_management_tools, api_manager_tools, designcentre_tools, exchange_tools, metrics, projection, upstream
+
+# Session identity and name → ID resolution.
+#
+# Per token, the caller's identity (get_user_info) and indexes of
+# environments, API instances, Design Center projects and Exchange assets are
+# loaded on first use and kept for ANYPOINT_IDENTITY_TTL seconds. install()
+# wraps every tool taking a token so that org_id, env_id(s), instance_id(s),
+# api_instance_id, project_id, user_id/owner_id and asset_id may be given as
+# names: values already shaped like IDs pass through without any lookup, names
+# are replaced by the matching ID, and unknown names are passed on unchanged.
+
+IDENTITY_TTL = float(os.environ.get("ANYPOINT_IDENTITY_TTL", "300"))
+FAILURE_TTL = min(30.0, IDENTITY_TTL)  # failed lookups are retried after this
+MIN_REFRESH = 10.0  # an unknown name reloads an index at most this often
+IDENTITY_CACHE_SIZE = int(os.environ.get("ANYPOINT_IDENTITY_CACHE_SIZE", "1024"))
+
+USER_URL = "https://anypoint.mulesoft.com/accounts/api/me"
+
+_UUID = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+_ASSET_ID = re.compile(r"^[a-z0-9][a-z0-9._-]*$")
+SELF = ("", "me")  # user_id / owner_id values meaning "the token's user"
+
+# Tools whose asset_id names an asset being created, not an existing one
+CREATES_ASSET = {"publish_design_project", "run_api_workflow", "onboard_migration_specs"}
+
+_entries = OrderedDict()  # key -> (expires, loaded_at, value or exception), least recently used first
+_loading = {}  # key -> task
+
+
+class Ambiguous(LookupError):
+    """
+    A name matched more than one ID.
+    """
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _store(key: tuple, ttl: float, value):
+    # Expired entries (mostly of tokens no longer in use) go first, then the least recently used
+    now = time.monotonic()
+    for stale in [k for k, entry in _entries.items() if entry[0] <= now]:
+        del _entries[stale]
+    _entries[key] = (now + ttl, now, value)
+    _entries.move_to_end(key)
+    while len(_entries) > IDENTITY_CACHE_SIZE:
+        _entries.popitem(last=False)
+
+
+async def _cached(key: tuple, load, refresh: bool = False):
+    """
+    The cached value for key, loading it (once, for concurrent callers) when
+    missing or expired. refresh=True reloads unless loaded in the last MIN_REFRESH seconds.
+    """
+    now = time.monotonic()
+    entry = _entries.get(key)
+    if entry and entry[0] > now and not (refresh and now - entry[1] >= MIN_REFRESH):
+        metrics.incr("identity_lookups", kind=key[1], outcome="cached")
+        _entries.move_to_end(key)
+        if isinstance(entry[2], Exception):
+            raise entry[2]
+        return entry[2]
+
+    task = _loading.get(key)
+    if task is None:
+        task = _loading[key] = asyncio.ensure_future(load())
+        task.add_done_callback(lambda _: _loading.pop(key, None))
+    try:
+        value = await asyncio.shield(task)
+    except Exception as exc:
+        _store(key, FAILURE_TTL, exc)
+        raise
+    metrics.incr("identity_lookups", kind=key[1], outcome="loaded")
+    _store(key, IDENTITY_TTL, value)
+    return value
+
+
+async def _get(token: str, url: str, org_id: str | None = None, headers: dict | None = None, params: dict | None = None, fields=None):
+    async with upstream.client(org_id) as client:
+        resp = await client.get(url, headers={"Authorization": f"Bearer {token}", **(headers or {})}, params=params, timeout=30.0)
+        resp.raise_for_status()
+        return projection.loads(resp.content, fields)
+
+
+async def session(token: str, refresh: bool = False) -> dict:
+    """
+    The token's user: user_id, username, email, org_id / org_name (primary
+    organization) and organizations ({id: name}, every membership).
+    """
+    async def load():
+        user = (await _get(token, USER_URL)).get("user", {})
+        organization = user.get("organization") or {}
+        organizations = {org["id"]: org.get("name") for org in user.get("memberOfOrganizations") or [] if org.get("id")}
+        if organization.get("id"):
+            organizations.setdefault(organization["id"], organization.get("name"))
+        return {
+            "user_id": user.get("id"),
+            "username": user.get("username"),
+            "email": user.get("email"),
+            "org_id": organization.get("id"),
+            "org_name": organization.get("name"),
+            "organizations": organizations,
+        }
+    return await _cached((_token_key(token), "session"), load, refresh)
+
+
+async def owner(token: str) -> str:
+    """
+    Who local state created with this token belongs to: "user:<id>", or
+    "token:<sha256>" for tokens without a user (client credentials).
+    """
+    me = await session(token)
+    if me.get("user_id"):
+        return f"user:{me['user_id']}"
+    return "token:" + _token_key(str(token))
+
+
+# Each index is a list of {"id", "names"}; names match case-insensitively
+
+async def environments(token: str, org_id: str, refresh: bool = False) -> list:
+    async def load():
+        data = await _get(token, access_management_tools.ENV_URL.format(org_id=org_id), org_id)
+        envs = data.get("data", []) if isinstance(data, dict) else data
+        return [{"id": env["id"], "names": [env.get("name")], "type": env.get("type")} for env in envs if env.get("id")]
+    return await _cached((_token_key(token), "environments", org_id), load, refresh)
+
+
+async def instances(token: str, org_id: str, env_id: str, refresh: bool = False) -> list:
+    async def load():
+        listing = await _get(token, api_manager_tools.LIST_APIS_URL.format(org_id=org_id, env_id=env_id), org_id)
+        return [
+            {
+                "id": instance["instance_id"],
+                "names": [instance["instanceLabel"], instance["assetId"]] + [
+                    f"{instance['assetId']}:{instance[version]}"
+                    for version in ("productVersion", "assetVersion") if instance[version]
+                ],
+            }
+            for instance in api_manager_tools.flatten_instances(listing)
+        ]
+    return await _cached((_token_key(token), "instances", org_id, env_id), load, refresh)
+
+
+async def projects(token: str, org_id: str, user_id: str, refresh: bool = False) -> list:
+    async def load():
+        headers = {"x-organization-id": org_id, "x-owner-id": user_id}
+        data = await _get(token, designcentre_tools.LIST_PROJECTS_URL, org_id, headers, fields=["id", "name"])
+        return [{"id": project["id"], "names": [project.get("name")]} for project in data if project.get("id")]
+    return await _cached((_token_key(token), "projects", org_id, user_id), load, refresh)
+
+
+async def assets(token: str, org_id: str, refresh: bool = False) -> list:
+    async def load():
+        records, offset = [], 0
+        while True:
+            params = {"organizationId": org_id, "offset": offset, "limit": exchange_tools.CATALOG_PAGE_SIZE}
+            page = await _get(token, f"{exchange_tools.EXCHANGE_BASE}/assets", org_id, params=params, fields=["assetId", "name"])
+            records += [{"id": asset["assetId"], "names": [asset.get("name")]} for asset in page if asset.get("assetId")]
+            if len(page) < exchange_tools.CATALOG_PAGE_SIZE:
+                return records
+            offset += exchange_tools.CATALOG_PAGE_SIZE
+    return await _cached((_token_key(token), "assets", org_id), load, refresh)
+
+
+def match(index: list, value: str) -> str | None:
+    """
+    The ID in index whose ID or one of whose names equals value.
+    """
+    wanted = str(value).lower()
+    ids = []
+    for record in index:
+        if str(record["id"]) == str(value):
+            return record["id"]
+        if any(name and str(name).lower() == wanted for name in record["names"]) and record["id"] not in ids:
+            ids.append(record["id"])
+    if len(ids) > 1:
+        raise Ambiguous(f"'{value}' matches several IDs: {ids}; pass the ID instead")
+    return ids[0] if ids else None
+
+
+async def _resolve(value, looks_like_id, load):
+    if value is None or looks_like_id(str(value)):
+        return value
+    try:
+        found = match(await load(False), value)
+        if found is None:
+            # Maybe created since the index was loaded
+            found = match(await load(True), value)
+    except Ambiguous:
+        raise
+    except Exception:
+        # Lookup unavailable: let the tool try the value as given
+        return value
+    return value if found is None else found
+
+
+async def resolve_arguments(tool_name: str, arguments: dict) -> dict:
+    """
+    Copy of arguments with names replaced by IDs (see module comment).
+    """
+    token = arguments.get("token")
+    if not token:
+        return arguments
+    arguments = dict(arguments)
+    is_uuid = lambda value: bool(_UUID.match(value))
+    is_number = str.isdigit
+
+    if "org_id" in arguments:
+        value = arguments["org_id"]
+        if value == "":
+            try:
+                arguments["org_id"] = (await session(token)).get("org_id") or value
+            except Exception:
+                # Lookup unavailable: the tool reports the problem in its own error shape
+                pass
+        else:
+            arguments["org_id"] = await _resolve(value, is_uuid, lambda refresh: _organizations(token, refresh))
+    org_id = arguments.get("org_id")
+
+    for name in ("user_id", "owner_id"):
+        if arguments.get(name) in SELF:
+            try:
+                arguments[name] = (await session(token)).get("user_id") or arguments[name]
+            except Exception:
+                pass
+
+    if org_id and "env_id" in arguments:
+        arguments["env_id"] = await _resolve(arguments["env_id"], is_uuid, lambda refresh: environments(token, org_id, refresh))
+    if org_id and arguments.get("env_ids"):
+        arguments["env_ids"] = [
+            await _resolve(env, is_uuid, lambda refresh: environments(token, org_id, refresh)) for env in arguments["env_ids"]
+        ]
+    env_id = arguments.get("env_id")
+
+    if org_id and env_id:
+        load = lambda refresh: instances(token, org_id, env_id, refresh)
+        for name in ("instance_id", "api_instance_id"):
+            if name in arguments:
+                arguments[name] = await _resolve(arguments[name], is_number, load)
+        if arguments.get("instance_ids"):
+            arguments["instance_ids"] = [await _resolve(value, is_number, load) for value in arguments["instance_ids"]]
+    elif org_id and arguments.get("api_instance_id") is not None:
+        # No environment given: look across all of them
+        arguments["api_instance_id"] = await _resolve(
+            arguments["api_instance_id"], is_number, lambda refresh: all_instances(token, org_id, refresh)
+        )
+
+    user_id = arguments.get("user_id") or arguments.get("owner_id")
+    if org_id and user_id and "project_id" in arguments:
+        arguments["project_id"] = await _resolve(
+            arguments["project_id"], is_uuid, lambda refresh: projects(token, org_id, user_id, refresh)
+        )
+
+    if org_id and "asset_id" in arguments and tool_name not in CREATES_ASSET:
+        arguments["asset_id"] = await _resolve(
+            arguments["asset_id"], lambda value: bool(_ASSET_ID.match(value)), lambda refresh: assets(token, org_id, refresh)
+        )
+
+    return arguments
+
+
+async def _organizations(token: str, refresh: bool) -> list:
+    user = await session(token, refresh)
+    return [{"id": org_id, "names": [name]} for org_id, name in user["organizations"].items()]
+
+
+async def all_instances(token: str, org_id: str, refresh: bool = False) -> list:
+    envs = await environments(token, org_id, refresh)
+    listings = await asyncio.gather(*(instances(token, org_id, env["id"], refresh) for env in envs), return_exceptions=True)
+    return [record for listing in listings if isinstance(listing, list) for record in listing]
+
+
+def _resolving(tool_name: str, fn):
+    returns_text = inspect.signature(fn).return_annotation is str
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        try:
+            kwargs = await resolve_arguments(tool_name, kwargs)
+        except Ambiguous as exc:
+            if returns_text:
+                return f"Error: {exc}"
+            return {"status": "error", "message": str(exc)}
+        return await fn(*args, **kwargs)
+
+    return wrapper
+
+
+def install(mcp):
+    """
+    Let every tool that takes a token accept names where it takes IDs.
+    """
+    for tool in mcp._tool_manager.list_tools():
+        if "token" in inspect.signature(tool.fn).parameters:
+            tool.fn = _resolving(tool.name, tool.fn)
@@ -0,0 +1,316 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+
+import httpx
+
+from . import identity, jsonutil, spill, storage, upstream
+from .access_management_tools import ENV_URL
+from .api_manager_tools import API_CONTRACTS_URL, LIST_APIS_URL, LIST_SLA_URL, POLICY_URL
+
+# Snapshots are kept per owner (identity.owner of the token that took them) and org:
+# a caller only ever reads inventories taken with their own credentials.
+
+
+def _safe(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+def _snapshot_path(owner: str, org_id: str):
+    return storage.data_dir("inventory", _safe(owner)) / f"{_safe(org_id)}.json"
+
+
+def load_snapshot(owner: str, org_id: str) -> dict:
+    path = _snapshot_path(owner, org_id)
+    if not path.exists():
+        return {}
+    with path.open("rb") as handle:
+        snapshot = jsonutil.loads(handle.read())
+    return snapshot if snapshot.get("owner") == owner and snapshot.get("org_id") == org_id else {}
+
+
+def _save_snapshot(owner: str, org_id: str, snapshot: dict):
+    path = _snapshot_path(owner, org_id)
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("wb") as handle:
+        handle.write(jsonutil.dumps_bytes(snapshot))
+    os.replace(tmp_path, path)
+
+
+def _fingerprint(entry: dict) -> str:
+    return hashlib.sha256(json.dumps(entry, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _etag(response: httpx.Response) -> str | None:
+    return response.headers.get("ETag")
+
+
+def _as_list(data, key: str) -> list:
+    if isinstance(data, dict):
+        data = data.get(key, data.get("data", []))
+    return data if isinstance(data, list) else []
+
+
+def _contract(raw: dict) -> dict:
+    application = raw.get("application") or {}
+    tier = raw.get("tier") or {}
+    return {
+        "id": raw.get("id"),
+        "status": raw.get("status"),
+        "application_id": raw.get("applicationId", application.get("id")),
+        "application_name": application.get("name"),
+        "tier_id": raw.get("tierId", tier.get("id")),
+        "tier_name": tier.get("name"),
+    }
+
+
+def _tier(raw: dict) -> dict:
+    return {
+        "id": raw.get("id"),
+        "name": raw.get("name"),
+        "status": raw.get("status"),
+        "auto_approve": raw.get("autoApprove"),
+        "limits": raw.get("limits", []),
+    }
+
+
+def _policy(raw: dict) -> dict:
+    template = raw.get("template") or {}
+    return {
+        "id": raw.get("policyId", raw.get("id")),
+        "asset_id": raw.get("assetId", template.get("assetId")),
+        "asset_version": raw.get("assetVersion", template.get("assetVersion")),
+        "order": raw.get("order"),
+        "disabled": raw.get("disabled", False),
+    }
+
+
+def _instances_from_listing(data) -> list:
+    # The listing groups instances ("apis") under their Exchange asset
+    instances = []
+    for asset in _as_list(data, "assets"):
+        for api in asset.get("apis", []):
+            instances.append((asset, api))
+    return instances
+
+
+def register(mcp):
+
+    @mcp.tool()
+    async def snapshot_api_inventory(
+        token: str,
+        org_id: str,
+        env_ids: list[str] | None = None,
+        max_parallel: int = 16,
+        full_refresh: bool = False,
+        include_snapshot: bool = False
+    ) -> dict:
+        """
+        Crawl org → environments → API instances → contracts / SLA tiers / policies
+        concurrently (at most max_parallel requests in flight) and store a
+        normalized snapshot locally.
+
+        Contracts, SLA tiers and policies change without touching the instance
+        listing, so they are revalidated on every run: requests carry the ETag
+        stored with the last answer, and a 304 reuses the stored data without
+        parsing anything. full_refresh=True fetches everything unconditionally.
+        Use query_api_inventory to answer questions from the stored snapshot
+        without calling Anypoint.
+        """
+
+        started = time.monotonic()
+        try:
+            owner = await identity.owner(token)
+        except Exception as e:
+            return {"status": "error", "step": "identity", "message": f"Cannot verify the caller: {e}"}
+        stored = load_snapshot(owner, org_id)
+        previous = {} if full_refresh else stored.get("instances", {})
+        semaphore = asyncio.Semaphore(max(1, max_parallel))
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        stats = {"requests": 0, "refreshed": 0, "reused": 0, "not_modified": 0, "errors": []}
+
+        async with upstream.client(org_id) as client:
+
+            async def send(url, etag=None) -> httpx.Response:
+                async with semaphore:
+                    stats["requests"] += 1
+                    request_headers = dict(headers, **{"If-None-Match": etag}) if etag else headers
+                    resp = await client.get(url, headers=request_headers, timeout=30.0)
+                    if resp.status_code != 304:
+                        resp.raise_for_status()
+                    return resp
+
+            async def get(url):
+                return jsonutil.loads((await send(url)).content)
+
+            async def crawl_instance(env_id, asset, api):
+                instance_id = str(api.get("id"))
+                known = previous.get(instance_id) or {}
+                etags = known.get("etags", {})
+
+                ids = {"org_id": org_id, "env_id": env_id, "instance_id": instance_id}
+                contracts, tiers, policies = await asyncio.gather(
+                    send(API_CONTRACTS_URL.format(**ids), etags.get("contracts")),
+                    send(LIST_SLA_URL.format(**ids), etags.get("tiers")),
+                    send(POLICY_URL.format(**ids), etags.get("policies")),
+                    return_exceptions=True,
+                )
+
+                record = {
+                    "env_id": env_id,
+                    "group_id": asset.get("groupId"),
+                    "asset_id": asset.get("assetId"),
+                    "asset_version": api.get("assetVersion"),
+                    "product_version": api.get("productVersion"),
+                    "label": api.get("instanceLabel"),
+                    "status": api.get("status"),
+                    "technology": api.get("technology"),
+                    "crawled_at": time.time(),
+                    "fingerprint": _fingerprint(api),
+                    "etags": {},
+                }
+
+                failures, unchanged = [], 0
+                for name, result, normalize in (
+                    ("contracts", contracts, _contract),
+                    ("tiers", tiers, _tier),
+                    ("policies", policies, _policy),
+                ):
+                    if isinstance(result, Exception):
+                        # No ETag kept: fetched in full on the next run
+                        failures.append(f"{name}: {result}")
+                        record[name] = known.get(name, [])
+                    elif result.status_code == 304:
+                        unchanged += 1
+                        record[name] = known.get(name, [])
+                        record["etags"][name] = etags[name]
+                    else:
+                        record[name] = [normalize(item) for item in _as_list(jsonutil.loads(result.content), name)]
+                        if _etag(result):
+                            record["etags"][name] = _etag(result)
+
+                if failures:
+                    record["errors"] = failures
+                    stats["errors"].append({"instance_id": instance_id, "errors": failures})
+
+                stats["not_modified"] += unchanged
+                if unchanged == 3 and record["fingerprint"] == known.get("fingerprint"):
+                    stats["reused"] += 1
+                else:
+                    stats["refreshed"] += 1
+                return instance_id, record
+
+            async def crawl_environment(env_id):
+                try:
+                    listing = await get(LIST_APIS_URL.format(org_id=org_id, env_id=env_id))
+                except Exception as e:
+                    stats["errors"].append({"env_id": env_id, "errors": [str(e)]})
+                    # Keep what we knew about this environment (full_refresh included)
+                    return [(iid, rec) for iid, rec in stored.get("instances", {}).items() if rec.get("env_id") == env_id]
+
+                return await asyncio.gather(*(
+                    crawl_instance(env_id, asset, api)
+                    for asset, api in _instances_from_listing(listing)
+                ))
+
+            # Crawls are bulk work: interactive calls from other tools go first
+            with upstream.lane(upstream.BULK):
+                try:
+                    environments = _as_list(await get(ENV_URL.format(org_id=org_id)), "data")
+                except Exception as e:
+                    return {"status": "error", "step": "environments", "message": str(e)}
+
+                if env_ids:
+                    environments = [env for env in environments if env.get("id") in env_ids]
+
+                per_env = await asyncio.gather(*(crawl_environment(env["id"]) for env in environments))
+
+        snapshot = {
+            "owner": owner,
+            "org_id": org_id,
+            "taken_at": time.time(),
+            "environments": {
+                env["id"]: {"name": env.get("name"), "type": env.get("type")} for env in environments
+            },
+            "instances": {instance_id: record for pairs in per_env for instance_id, record in pairs},
+        }
+        if env_ids:
+            # Environments outside env_ids were not crawled: keep what the stored snapshot has for them
+            crawled = set(snapshot["environments"])
+            for env_id, info in stored.get("environments", {}).items():
+                if env_id not in crawled:
+                    snapshot["environments"][env_id] = info
+            for instance_id, record in stored.get("instances", {}).items():
+                if record.get("env_id") not in crawled:
+                    snapshot["instances"].setdefault(instance_id, record)
+        _save_snapshot(owner, org_id, snapshot)
+
+        result = {
+            "status": "success" if not stats["errors"] else "partial_success",
+            "environments": len(snapshot["environments"]),
+            "instances": len(snapshot["instances"]),
+            "refreshed": stats["refreshed"],
+            "reused": stats["reused"],
+            "not_modified": stats["not_modified"],
+            "requests": stats["requests"],
+            "errors": stats["errors"],
+            "seconds": round(time.monotonic() - started, 2),
+            "snapshot_path": str(_snapshot_path(owner, org_id)),
+        }
+        if include_snapshot:
+            result["snapshot"] = spill.maybe_spill("snapshot_api_inventory", jsonutil.dumps(snapshot))
+        return result
+
+    @mcp.tool()
+    async def query_api_inventory(
+        token: str,
+        org_id: str,
+        env: str | None = None,
+        asset_id: str | None = None,
+        application: str | None = None
+    ) -> dict:
+        """
+        Answer "what's deployed and who has access" from the last snapshot this
+        caller stored (no network calls besides identifying the caller). Filters:
+        - env         : environment ID or name
+        - asset_id    : Exchange asset ID of the API
+        - application : only instances with a contract for this application name/ID
+        """
+
+        try:
+            owner = await identity.owner(token)
+        except Exception as e:
+            return {"status": "error", "message": f"Cannot verify the caller: {e}"}
+
+        snapshot = load_snapshot(owner, org_id)
+        if not snapshot:
+            return {"status": "error", "message": f"No inventory snapshot for org {org_id}; run snapshot_api_inventory first"}
+
+        environments = snapshot.get("environments", {})
+        matches = []
+        for instance_id, record in snapshot.get("instances", {}).items():
+            env_info = environments.get(record.get("env_id"), {})
+            if env and env not in (record.get("env_id"), env_info.get("name")):
+                continue
+            if asset_id and record.get("asset_id") != asset_id:
+                continue
+            if application and not any(
+                application in (contract.get("application_name"), str(contract.get("application_id")))
+                for contract in record.get("contracts", [])
+            ):
+                continue
+            matches.append({
+                "instance_id": instance_id,
+                "environment": env_info.get("name"),
+                **{key: value for key, value in record.items() if key not in ("fingerprint", "crawled_at", "etags")},
+            })
+
+        return {
+            "status": "success",
+            "taken_at": snapshot.get("taken_at"),
+            "count": len(matches),
+            "instances": matches,
+        }
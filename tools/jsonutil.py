@@ -0,0 +1,29 @@
+import json
+
+# Pluggable JSON codec for the tool result path.
+# Uses orjson when it is installed (several times faster on multi-megabyte
+# asset/project lists) and falls back to the stdlib otherwise.
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def loads(data: bytes | str):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj) -> bytes:
+    """
+    Compact JSON as UTF-8 bytes.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def dumps(obj) -> str:
+    return dumps_bytes(obj).decode("utf-8")
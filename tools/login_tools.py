@@ -1,4 +1,4 @@
-import httpx
+from . import identity, upstream
 
 LOGIN_URL = "https://anypoint.mulesoft.com/accounts/login"
 
@@ -19,7 +19,7 @@ def register(mcp):
             "Content-Type": "application/json"
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client() as client:
             try:
                 resp = await client.post(
                     LOGIN_URL,
@@ -54,7 +54,7 @@ def register(mcp):
             "Authorization": f"Bearer {token}"
         }
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client() as client:
             try:
                 resp = await client.get(
                     USER_URL,
@@ -65,3 +65,67 @@ def register(mcp):
                 return resp.text
             except Exception as e:
                 return f"Error fetching user info: {e}"
+
+
+# Session Context Tools
+    @mcp.tool()
+    async def get_session_context(token: str, org_id: str | None = None, refresh: bool = False) -> dict:
+        """
+        The token's identity and environments, resolved once and cached.
+
+        Returns user_id, username, email, org_id/org_name (org_id if given,
+        else the primary organization), organizations ({id: name}) and
+        environments ({name: id}). Cached for ANYPOINT_IDENTITY_TTL seconds;
+        refresh=True reloads.
+        """
+
+        try:
+            context = dict(await identity.session(token, refresh))
+            if org_id:
+                context["org_id"], context["org_name"] = org_id, context["organizations"].get(org_id)
+            envs = await identity.environments(token, context["org_id"], refresh) if context["org_id"] else []
+        except Exception as e:
+            return {"status": "error", "message": f"Error resolving session context: {e}"}
+        context["environments"] = {env["names"][0]: env["id"] for env in envs}
+        return {"status": "success", **context}
+
+    @mcp.tool()
+    async def resolve_names(
+        token: str,
+        org_id: str,
+        env: str | None = None,
+        instance: str | None = None,
+        project: str | None = None,
+        asset: str | None = None
+    ) -> dict:
+        """
+        Resolve names to IDs from the session index.
+
+        env: environment name; instance: instance label, asset ID or
+        "assetId:version" (within env, else across all environments);
+        project: Design Center project name (the token user's projects);
+        asset: Exchange asset name. IDs are returned as given. Unknown names
+        resolve to null.
+        """
+
+        resolved = {}
+        try:
+            if env is not None:
+                resolved["env_id"] = identity.match(await identity.environments(token, org_id), env)
+            if instance is not None:
+                env_id = resolved.get("env_id")
+                if env_id:
+                    index = await identity.instances(token, org_id, env_id)
+                else:
+                    index = await identity.all_instances(token, org_id)
+                resolved["instance_id"] = identity.match(index, instance)
+            if project is not None:
+                user_id = (await identity.session(token))["user_id"]
+                resolved["project_id"] = identity.match(await identity.projects(token, org_id, user_id), project)
+            if asset is not None:
+                resolved["asset_id"] = identity.match(await identity.assets(token, org_id), asset)
+        except identity.Ambiguous as e:
+            return {"status": "error", "message": str(e)}
+        except Exception as e:
+            return {"status": "error", "message": f"Error resolving names: {e}"}
+        return {"status": "success", "org_id": org_id, **resolved}
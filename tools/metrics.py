@@ -0,0 +1,31 @@
+from collections import defaultdict
+
+# In-process counters, exposed by http_server.py at GET /metrics
+
+_counters = defaultdict(float)
+
+
+def incr(name: str, value: float = 1, **labels):
+    """
+    Add `value` to the counter `name` for the given labels (e.g. tool="list_environments").
+    """
+    _counters[(name, tuple(sorted(labels.items())))] += value
+
+
+def get(name: str, **labels) -> float:
+    return _counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+def snapshot() -> dict:
+    """
+    All counters as {name: {"label=value,...": total}}.
+    """
+    result = {}
+    for (name, labels), value in sorted(_counters.items()):
+        key = ",".join(f"{k}={v}" for k, v in labels) or "total"
+        result.setdefault(name, {})[key] = value
+    return result
+
+
+def reset():
+    _counters.clear()
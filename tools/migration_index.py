@@ -0,0 +1,359 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+
+from . import storage
+
+logger = logging.getLogger(__name__)
+
+# Index of migration output specs.
+#
+# A background watcher keeps a SQLite index of every file under
+# intelog-be/uploads/migration_output_*/raml-specs: size, mtime, sha256 and,
+# for RAML files, title / version / baseUri / resource paths. Changes are
+# picked up with watchfiles (inotify on Linux; the "watch" extra) when it is
+# installed, otherwise by polling every ANYPOINT_MIGRATION_POLL seconds. With
+# the watcher disabled, lookups rescan at most that often. Only files whose
+# size or mtime changed are re-hashed.
+
+UPLOADS_DIR = Path(os.environ.get(
+    "ANYPOINT_MIGRATION_UPLOADS",
+    str(Path(__file__).resolve().parent.parent / "intelog-be" / "uploads")
+))
+WATCH_ENABLED = os.environ.get("ANYPOINT_MIGRATION_WATCH", "1").lower() not in ("0", "false", "no")
+POLL_INTERVAL = float(os.environ.get("ANYPOINT_MIGRATION_POLL", "10"))
+CACHE_MAX_BYTES = int(os.environ.get("ANYPOINT_RAML_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+FOLDER_PREFIX = "migration_output_"
+SPECS_DIR = "raml-specs"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS specs (
+    migration_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    sha256 TEXT,
+    kind TEXT,
+    title TEXT,
+    version TEXT,
+    base_uri TEXT,
+    resources TEXT,
+    PRIMARY KEY (migration_id, path)
+);
+CREATE INDEX IF NOT EXISTS specs_title ON specs (title);
+CREATE INDEX IF NOT EXISTS specs_base_uri ON specs (base_uri);
+"""
+
+SPEC_COLUMNS = ("migration_id", "path", "size", "sha256", "kind", "title", "version", "base_uri", "resources")
+
+_RESOURCE = re.compile(r"(/[^\s:]*)\s*:")
+
+_scan_lock = threading.Lock()
+_watchers = {}
+state = {"mode": None, "scans": 0, "last_scan": None, "files": 0}
+
+
+def connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(storage.data_dir("migration-index") / "index.db")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def specs_root(migration_id: str) -> Path:
+    return UPLOADS_DIR / f"{FOLDER_PREFIX}{migration_id}" / SPECS_DIR
+
+
+def describe_raml(text: str) -> dict:
+    """
+    Pull title/version/baseUri and nested resource paths out of a RAML document
+    by indentation, without a YAML parser.
+    """
+    lines = text.splitlines()
+    header = lines[0].strip() if lines else ""
+    info = {
+        "kind": (header[len("#%RAML 1.0"):].strip() or "Api") if header.startswith("#%RAML") else None,
+        "title": None,
+        "version": None,
+        "base_uri": None,
+        "resources": [],
+    }
+    stack = []  # (indent, full resource path)
+
+    for line in lines[1:]:
+        stripped = line.lstrip(" ")
+        if not stripped or stripped.startswith("#"):
+            continue
+        indent = len(line) - len(stripped)
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+
+        if indent == 0:
+            key, _, value = stripped.partition(":")
+            value = value.strip().strip("\"'")
+            if key in ("title", "version") and value:
+                info[key] = value
+            elif key == "baseUri" and value:
+                info["base_uri"] = value
+
+        match = _RESOURCE.match(stripped)
+        # Resources sit at the top level or directly inside other resources
+        if match and (indent == 0 or stack):
+            path = (stack[-1][1] if stack else "") + match.group(1)
+            stack.append((indent, path))
+            info["resources"].append(path)
+
+    return info
+
+
+def _index_file(file_path: str) -> dict:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as handle:
+        data = handle.read()
+    digest.update(data)
+    entry = {"sha256": digest.hexdigest(), "kind": None, "title": None, "version": None, "base_uri": None, "resources": []}
+    if file_path.endswith(".raml"):
+        entry.update(describe_raml(data.decode("utf-8", errors="replace")))
+    return entry
+
+
+def _walk_specs(root: Path) -> dict:
+    files = {}
+    for dir_path, _, names in os.walk(root):
+        for name in names:
+            file_path = os.path.join(dir_path, name)
+            files[os.path.relpath(file_path, root).replace(os.sep, "/")] = file_path
+    return files
+
+
+def scan(migration_ids=None) -> dict:
+    """
+    Bring the index up to date for the given migrations (all when None).
+    Returns counts of files indexed, unchanged and removed.
+    """
+    counts = {"indexed": 0, "unchanged": 0, "removed": 0}
+    with _scan_lock, closing(connect()) as conn, conn:
+        if migration_ids is None:
+            migration_ids = [
+                entry.name[len(FOLDER_PREFIX):]
+                for entry in (os.scandir(UPLOADS_DIR) if UPLOADS_DIR.is_dir() else [])
+                if entry.is_dir() and entry.name.startswith(FOLDER_PREFIX)
+            ]
+            # Folders that disappeared entirely
+            known = {row[0] for row in conn.execute("SELECT DISTINCT migration_id FROM specs")}
+            for gone in known - set(migration_ids):
+                counts["removed"] += conn.execute("DELETE FROM specs WHERE migration_id = ?", (gone,)).rowcount
+
+        for migration_id in migration_ids:
+            indexed = {
+                row[0]: (row[1], row[2])
+                for row in conn.execute("SELECT path, size, mtime_ns FROM specs WHERE migration_id = ?", (migration_id,))
+            }
+            files = _walk_specs(specs_root(migration_id))
+
+            for path, file_path in files.items():
+                try:
+                    stat = os.stat(file_path)
+                    if indexed.get(path) == (stat.st_size, stat.st_mtime_ns):
+                        counts["unchanged"] += 1
+                        continue
+                    entry = _index_file(file_path)
+                except OSError:
+                    continue
+                conn.execute(
+                    "INSERT OR REPLACE INTO specs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        migration_id, path, stat.st_size, stat.st_mtime_ns, entry["sha256"], entry["kind"],
+                        entry["title"], entry["version"], entry["base_uri"], json.dumps(entry["resources"]),
+                    ),
+                )
+                counts["indexed"] += 1
+
+            removed = set(indexed) - set(files)
+            conn.executemany("DELETE FROM specs WHERE migration_id = ? AND path = ?", [(migration_id, path) for path in removed])
+            counts["removed"] += len(removed)
+
+        state["files"] = conn.execute("SELECT COUNT(*) FROM specs").fetchone()[0]
+
+    state["scans"] += 1
+    state["last_scan"] = time.time()
+    return counts
+
+
+def _migration_of(changed_path: str) -> str | None:
+    try:
+        first = Path(changed_path).resolve().relative_to(UPLOADS_DIR.resolve()).parts[0]
+    except (ValueError, IndexError):
+        return None
+    return first[len(FOLDER_PREFIX):] if first.startswith(FOLDER_PREFIX) else None
+
+
+async def _scan_safely(migration_ids=None):
+    try:
+        await asyncio.to_thread(scan, migration_ids)
+    except Exception as exc:
+        logger.warning("Migration index scan failed: %s", exc)
+
+
+async def _watch(initial_scan: asyncio.Future):
+    await _scan_safely()
+    initial_scan.set_result(True)
+
+    try:
+        from watchfiles import awatch
+    except ImportError:
+        awatch = None
+
+    if awatch is not None and UPLOADS_DIR.is_dir():
+        state["mode"] = "watch"
+        async for changes in awatch(UPLOADS_DIR):
+            migration_ids = {_migration_of(path) for _, path in changes}
+            await _scan_safely(None if None in migration_ids else sorted(migration_ids))
+        return
+
+    state["mode"] = "poll"
+    while True:
+        await asyncio.sleep(POLL_INTERVAL)
+        await _scan_safely()
+
+
+def start():
+    """
+    Start the watcher on the running loop (once). Returns a future resolved after the first scan.
+    """
+    loop = asyncio.get_running_loop()
+    watcher = _watchers.get(loop)
+    if watcher is None or watcher[0].done():
+        initial_scan = loop.create_future()
+        # Fresh context: the watcher must not inherit a tool call's deadline
+        task = loop.create_task(_watch(initial_scan), context=contextvars.Context())
+        watcher = _watchers[loop] = (task, initial_scan)
+    return watcher[1]
+
+
+async def stop():
+    """
+    Cancel the running loop's watcher (if any) and wait for it to exit.
+    """
+    watcher = _watchers.pop(asyncio.get_running_loop(), None)
+    if watcher is None:
+        return
+    task, initial_scan = watcher
+    task.cancel()
+    initial_scan.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def ready():
+    """
+    Make sure the index is populated: starts the watcher if needed, or, when
+    watching is disabled, scans inline if the last scan is older than POLL_INTERVAL.
+    """
+    if WATCH_ENABLED:
+        await asyncio.shield(start())
+    elif state["last_scan"] is None or time.time() - state["last_scan"] >= POLL_INTERVAL:
+        await asyncio.to_thread(scan)
+
+
+def _row(row) -> dict:
+    spec = dict(zip(SPEC_COLUMNS, row))
+    spec["resources"] = json.loads(spec["resources"] or "[]")
+    return spec
+
+
+def list_specs(migration_id: str) -> list:
+    with closing(connect()) as conn:
+        return [
+            _row(row) for row in conn.execute(
+                f"SELECT {', '.join(SPEC_COLUMNS)} FROM specs WHERE migration_id = ? ORDER BY path", (migration_id,)
+            )
+        ]
+
+
+def _like(value: str) -> str:
+    # User text is matched literally: % and _ are not wildcards
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search(query: str | None = None, title: str | None = None, resource: str | None = None,
+           migration_id: str | None = None, kind: str | None = None, limit: int = 50) -> list:
+    where, params = [], []
+    if migration_id:
+        where.append("migration_id = ?")
+        params.append(migration_id)
+    if title:
+        where.append("title = ?")
+        params.append(title)
+    if kind:
+        where.append("kind = ?")
+        params.append(kind)
+    if resource:
+        where.append("resources LIKE ? ESCAPE '\\'")
+        params.append(f'%"{_like(resource)}%')
+    if query:
+        where.append(
+            "(path LIKE ? ESCAPE '\\' OR title LIKE ? ESCAPE '\\' "
+            "OR base_uri LIKE ? ESCAPE '\\' OR resources LIKE ? ESCAPE '\\')"
+        )
+        params.extend([f"%{_like(query)}%"] * 4)
+
+    sql = f"SELECT {', '.join(SPEC_COLUMNS)} FROM specs"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY migration_id, path LIMIT ?"
+    with closing(connect()) as conn:
+        return [_row(row) for row in conn.execute(sql, [*params, limit])]
+
+
+class ContentCache:
+    """
+    LRU cache of file contents, validated against (size, mtime) on every read.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def read(self, path: Path) -> str:
+        stat = path.stat()
+        key = str(path)
+        entry = self.entries.get(key)
+        if entry and entry[0] == (stat.st_size, stat.st_mtime_ns):
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        with path.open("r", encoding="utf-8") as handle:
+            text = handle.read()
+        self._drop(key)
+        if stat.st_size <= self.max_bytes:
+            self.entries[key] = ((stat.st_size, stat.st_mtime_ns), text, stat.st_size)
+            self.bytes += stat.st_size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+        return text
+
+    def _drop(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.bytes -= entry[2]
+
+
+content_cache = ContentCache(CACHE_MAX_BYTES)
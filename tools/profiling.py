@@ -0,0 +1,351 @@
+import asyncio
+import cProfile
+import functools
+import hmac
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from . import storage
+
+# On-demand CPU and memory profiling, served by http_server.py under /admin.
+#
+# Nothing here runs until an admin arms it: profile() swaps the named tool's
+# function for a profiling wrapper and puts the original back after `calls`
+# calls, and tracemalloc is only started by memory_start(). The profiler sees
+# everything the process runs while a profiled call is in flight, including
+# other requests interleaved on the event loop.
+
+ADMIN_TOKEN = os.environ.get("ANYPOINT_ADMIN_TOKEN") or None
+
+MODES = ("cprofile", "sample")
+
+# Leaf frames of threads that are waiting rather than working
+IDLE_LEAVES = {("selectors.py", "select"), ("threading.py", "wait"), ("thread.py", "_worker"), ("queue.py", "get")}
+
+_session = None  # the armed or last finished Session
+_baseline = None  # tracemalloc snapshot that memory_snapshot() diffs against
+
+
+def enabled() -> bool:
+    return ADMIN_TOKEN is not None
+
+
+def authorized(token: str | None) -> bool:
+    return enabled() and token is not None and hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+
+def _location(filename: str, lineno: int) -> str:
+    return f"{os.path.basename(filename)}:{lineno}"
+
+
+def _where(filename: str, lineno: int, name: str) -> str:
+    return f"{_location(filename, lineno)}({name})"
+
+
+class Sampler:
+    """
+    Statistical profiler: a background thread records every other thread's
+    stack each `interval` seconds while running.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.idle = 0
+        self._running = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+        self._thread.start()
+
+    def resume(self):
+        self._running.set()
+
+    def pause(self):
+        self._running.clear()
+
+    def close(self):
+        self._stop.set()
+        self._running.set()
+        self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        while self._running.wait() and not self._stop.wait(self.interval):
+            if not self._running.is_set():
+                continue
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, frame.f_lineno, code.co_name))
+                    frame = frame.f_back
+                self.samples += 1
+                if (os.path.basename(stack[0][0]), stack[0][2]) in IDLE_LEAVES:
+                    self.idle += 1
+                else:
+                    self.stacks[tuple(reversed(stack))] += 1
+
+    def report(self, limit: int) -> dict:
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[_where(*stack[-1])] += count
+            for where in {_where(*frame) for frame in stack}:
+                total[where] += count
+        busy = sum(self.stacks.values())
+        return {
+            "interval": self.interval,
+            "samples": self.samples,
+            "idle_samples": self.idle,
+            "busy_samples": busy,
+            "functions": [
+                {"function": where, "own_samples": own[where], "total_samples": count}
+                for where, count in total.most_common(limit)
+            ],
+            "top_own": [{"function": where, "samples": count} for where, count in own.most_common(limit)],
+            # Collapsed stacks ("a;b;c count") for flame graph tools
+            "stacks": [
+                f"{';'.join(_where(*frame) for frame in stack)} {count}"
+                for stack, count in self.stacks.most_common(limit)
+            ],
+        }
+
+
+class Session:
+    """
+    Profiling of the next `calls` calls of one tool.
+    """
+
+    def __init__(self, tool, calls: int, mode: str, sort: str, limit: int, interval: float):
+        self.tool = tool
+        self.original = tool.fn
+        self.calls = calls
+        self.mode = mode
+        self.sort = sort
+        self.limit = limit
+        self.started = 0
+        self.timings = []
+        self.state = "armed"
+        self.armed_at = time.time()
+        self.done = asyncio.Event()
+        self.report = None
+        self._active = 0
+        self._profiler = cProfile.Profile() if mode == "cprofile" else None
+        self._sampler = Sampler(interval) if mode == "sample" else None
+
+    def _enter(self):
+        if self._active == 0:
+            if self._profiler:
+                self._profiler.enable()
+            else:
+                self._sampler.resume()
+        self._active += 1
+
+    def _exit(self):
+        self._active -= 1
+        if self._active == 0:
+            if self._profiler:
+                self._profiler.disable()
+            else:
+                self._sampler.pause()
+
+    def wrap(self):
+        original = self.original
+
+        @functools.wraps(original)
+        async def wrapper(*args, **kwargs):
+            if self.state != "armed" or self.started >= self.calls:
+                # Calls beyond the requested number run unprofiled
+                return await original(*args, **kwargs)
+            self.started += 1
+            self._enter()
+            start = time.monotonic()
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                self._exit()
+                self.timings.append(round(time.monotonic() - start, 6))
+                if len(self.timings) >= self.calls:
+                    self.finish("done")
+
+        self.tool.fn = wrapper
+
+    def finish(self, state: str):
+        if self.state != "armed":
+            return
+        self.tool.fn = self.original
+        self.state = state
+        if self._profiler:
+            if self._active:
+                self._profiler.disable()
+            self.report = self._cprofile_report()
+        else:
+            self._sampler.close()
+            self.report = self._sampler.report(self.limit)
+        self.done.set()
+
+    def _cprofile_report(self) -> dict:
+        if not self.started:
+            return {"functions": []}
+        path = storage.data_dir("profiles") / f"{self.tool.name}-{int(self.armed_at)}.prof"
+        self._profiler.dump_stats(path)
+        stats = pstats.Stats(self._profiler)
+        stats.sort_stats(self.sort)
+        functions = []
+        for func in stats.fcn_list[:self.limit]:
+            primitive, calls, own, cumulative, _ = stats.stats[func]
+            functions.append({
+                "function": _where(*func),
+                "calls": calls,
+                "primitive_calls": primitive,
+                "tottime": round(own, 6),
+                "cumtime": round(cumulative, 6),
+            })
+        return {"sort": self.sort, "total_time": round(stats.total_tt, 6), "profile_path": str(path), "functions": functions}
+
+    def describe(self) -> dict:
+        return {
+            "tool": self.tool.name,
+            "mode": self.mode,
+            "state": self.state,
+            "calls": self.calls,
+            "profiled_calls": len(self.timings),
+            "call_seconds": self.timings,
+            **({"report": self.report} if self.report is not None else {}),
+        }
+
+
+def _integer(value) -> int:
+    # int() would accept 2.5 (and True) without complaint
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(value)
+    return int(value)
+
+
+def profile(mcp, tool_name: str, calls: int = 1, mode: str = "cprofile", sort: str = "cumulative", limit: int = 30, interval: float = 0.005) -> dict:
+    """
+    Arm profiling of the next `calls` calls of tool_name.
+    """
+    global _session
+    tool = mcp._tool_manager.get_tool(tool_name)
+    if tool is None:
+        return {"status": "error", "message": f"Unknown tool: {tool_name}"}
+    try:
+        calls, limit, interval = _integer(calls), _integer(limit), float(interval)
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "calls and limit must be integers, interval a number of seconds"}
+    if mode not in MODES:
+        return {"status": "error", "message": f"mode must be one of {list(MODES)}"}
+    if sort not in pstats.Stats.sort_arg_dict_default:
+        return {"status": "error", "message": f"Unknown sort key: {sort}"}
+    if _session is not None and _session.state == "armed":
+        return {"status": "error", "message": f"Already profiling {_session.tool.name}; cancel it first"}
+
+    _session = Session(tool, max(1, calls), mode, sort, max(1, limit), max(0.001, interval))
+    _session.wrap()
+    return {"status": "armed", **_session.describe()}
+
+
+async def profile_status(wait: float = 0) -> dict:
+    """
+    The armed or last session; with wait, block up to that many seconds for it to finish.
+    """
+    if _session is None:
+        return {"status": "idle"}
+    if wait > 0 and _session.state == "armed":
+        try:
+            await asyncio.wait_for(_session.done.wait(), wait)
+        except TimeoutError:
+            pass
+    return {"status": _session.state, **_session.describe()}
+
+
+def cancel() -> dict:
+    """
+    Disarm the session, reporting whatever was profiled so far.
+    """
+    if _session is None:
+        return {"status": "idle"}
+    _session.finish("cancelled")
+    return {"status": _session.state, **_session.describe()}
+
+
+def memory_start(frames: int = 25) -> dict:
+    """
+    Start tracemalloc (if needed) and take the baseline snapshot.
+    """
+    global _baseline
+    try:
+        frames = _integer(frames)
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "frames must be an integer"}
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(max(1, frames))
+    _baseline = _snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    return {"status": "tracing", "frames": tracemalloc.get_traceback_limit(), "traced_bytes": current, "peak_bytes": peak}
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+
+def memory_snapshot(limit: int = 20, group_by: str = "lineno", reset: bool = False) -> dict:
+    """
+    Diff a new snapshot against the baseline: the allocations still alive
+    that grew the most since then. reset=True makes it the new baseline.
+    """
+    global _baseline
+    if not tracemalloc.is_tracing() or _baseline is None:
+        return {"status": "error", "message": "Memory tracing is off; start it first"}
+    if group_by not in ("lineno", "filename", "traceback"):
+        return {"status": "error", "message": "group_by must be lineno, filename or traceback"}
+    try:
+        limit = _integer(limit)
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "limit must be an integer"}
+
+    snapshot = _snapshot()
+    diff = snapshot.compare_to(_baseline, group_by)
+    current, peak = tracemalloc.get_traced_memory()
+    report = {
+        "status": "success",
+        "group_by": group_by,
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "size_diff_bytes": sum(stat.size_diff for stat in diff),
+        "top": [
+            {
+                "where": [_location(frame.filename, frame.lineno) for frame in stat.traceback]
+                if group_by == "traceback" else _location(stat.traceback[0].filename, stat.traceback[0].lineno),
+                "size_diff_bytes": stat.size_diff,
+                "size_bytes": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in diff[:max(1, limit)]
+        ],
+    }
+    if reset:
+        _baseline = snapshot
+    return report
+
+
+def memory_stop() -> dict:
+    global _baseline
+    _baseline = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return {"status": "stopped"}
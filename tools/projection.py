@@ -0,0 +1,141 @@
+import json
+from json.decoder import scanstring
+
+from . import jsonutil, metrics
+
+# Field projection for large list/asset responses.
+#
+# Fields are dotted paths ("assetId", "files.classifier"), applied to each item
+# when the payload is a list. loads() projects while parsing: it walks the
+# objects and arrays at positions where the spec has children itself, and
+# hands every other value to the C decoder whole - requested leaf fields are
+# kept intact (an object-valued leaf keeps all its keys), unrequested ones are
+# dropped as soon as they are decoded. Only one unrequested value is ever
+# materialized at a time, never the full response tree.
+
+
+def _spec(fields: list) -> dict:
+    spec = {}
+    for field in fields:
+        node = spec
+        for part in field.split("."):
+            node = node.setdefault(part, {})
+    return spec
+
+
+def _apply(data, spec: dict):
+    if not spec:
+        return data
+    if isinstance(data, list):
+        return [_apply(item, spec) for item in data]
+    if isinstance(data, dict):
+        return {key: _apply(data[key], child) for key, child in spec.items() if key in data}
+    return data
+
+
+def select(data, fields: list | None):
+    """
+    Project already-parsed data onto the given dotted field paths.
+    """
+    if not fields:
+        return data
+    return _apply(data, _spec(fields))
+
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def _skip(text: str, index: int) -> int:
+    while index < len(text) and text[index] in _WHITESPACE:
+        index += 1
+    return index
+
+
+def _expect(text: str, index: int, char: str) -> int:
+    if not text.startswith(char, index):
+        raise json.JSONDecodeError(f"Expecting '{char}'", text, index)
+    return _skip(text, index + 1)
+
+
+def _parse(text: str, index: int, spec: dict):
+    """
+    Decode the value at text[index:], projected onto spec; returns (value, end).
+    """
+    if not spec or index >= len(text) or text[index] not in "[{":
+        return _decoder.raw_decode(text, index)
+
+    if text[index] == "[":
+        items = []
+        index = _skip(text, index + 1)
+        if text.startswith("]", index):
+            return items, index + 1
+        while True:
+            item, index = _parse(text, index, spec)
+            items.append(item)
+            index = _skip(text, index)
+            if text.startswith("]", index):
+                return items, index + 1
+            index = _expect(text, index, ",")
+
+    result = {}
+    index = _skip(text, index + 1)
+    if text.startswith("}", index):
+        return result, index + 1
+    while True:
+        if not text.startswith('"', index):
+            raise json.JSONDecodeError("Expecting property name enclosed in double quotes", text, index)
+        key, index = scanstring(text, index + 1)
+        index = _expect(text, _skip(text, index), ":")
+        if key in spec:
+            result[key], index = _parse(text, index, spec[key])
+        else:
+            _, index = _decoder.raw_decode(text, index)
+        index = _skip(text, index)
+        if text.startswith("}", index):
+            return result, index + 1
+        index = _expect(text, index, ",")
+
+
+def loads(raw: bytes | str, fields: list | None = None):
+    """
+    Parse JSON, keeping only the given dotted field paths.
+    """
+    if not fields:
+        return jsonutil.loads(raw)
+
+    text = raw.decode("utf-8") if isinstance(raw, (bytes, bytearray)) else raw
+    value, index = _parse(text, _skip(text, 0), _spec(fields))
+    if _skip(text, index) != len(text):
+        raise json.JSONDecodeError("Extra data", text, index)
+    return value
+
+
+def project_text(tool_name: str, raw: bytes | str, fields: list | None) -> str:
+    """
+    Project a raw JSON response body and return compact JSON text,
+    recording response_bytes_in / response_bytes_out for the tool.
+    """
+    size_in = len(raw)
+    if fields:
+        encoded = jsonutil.dumps_bytes(loads(raw, fields))
+        text = encoded.decode("utf-8")
+        size_out = len(encoded)
+    else:
+        text = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+        size_out = size_in
+
+    metrics.incr("response_bytes_in", size_in, tool=tool_name)
+    metrics.incr("response_bytes_out", size_out, tool=tool_name)
+    return text
+
+
+def resolve_fields(fields: list | None, compact: bool, compact_fields: list) -> list | None:
+    """
+    Explicit fields win; compact mode falls back to the tool's summary fields.
+    """
+    if fields:
+        return fields
+    if compact:
+        return compact_fields
+    return None
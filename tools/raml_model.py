@@ -0,0 +1,586 @@
+import hashlib
+import os
+import posixpath
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+
+# Compact structural model of a RAML API.
+#
+# RAML is read with a small indentation-based YAML reader (no PyYAML
+# dependency), `!include` and `uses:` are resolved inside the ZIP or migration
+# folder, and the result is reduced to resources, methods and types.
+#
+# Two caches: parsed files by sha256 of their content, and built models by
+# (source, main file), re-validated against every file the model was built
+# from (size + mtime on disk, size + CRC in a ZIP). Models are built in
+# worker threads (asyncio.to_thread), so the caches and stats are only touched
+# under _cache_lock; parsing and file reads happen outside it.
+
+METHODS = ("get", "post", "put", "patch", "delete", "head", "options", "trace", "connect")
+PARSED_FILES_CACHE = 1024
+MODELS_CACHE = 64
+DESCRIPTION_CHARS = 200
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][\w.-]*")
+_BUILTIN_TYPES = {
+    "any", "object", "array", "union", "string", "number", "integer", "boolean", "date-only",
+    "time-only", "datetime-only", "datetime", "file", "nil",
+}
+
+
+class Include:
+    """
+    An `!include path` value.
+    """
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: str):
+        self.path = path
+
+
+# YAML subset reader
+
+def _strip_comment(text: str) -> str:
+    quote = None
+    for index, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "#" and (index == 0 or text[index - 1] in " \t"):
+            return text[:index].rstrip()
+    return text
+
+
+def _split_key(content: str):
+    """
+    Split "key: value" (key optionally quoted). Returns (key, value) or None.
+    """
+    if content[0] in "\"'":
+        end = content.find(content[0], 1)
+        if end > 0 and content[end + 1:end + 2] == ":":
+            return content[1:end], content[end + 2:].strip()
+        return None
+    index = content.find(": ")
+    if index < 0:
+        return (content[:-1], "") if content.endswith(":") else None
+    return content[:index], content[index + 2:].strip()
+
+
+def _scalar(value: str):
+    if value.startswith("!include"):
+        return Include(value[len("!include"):].strip())
+    if value[:1] in "\"'" and value[-1:] == value[:1] and len(value) > 1:
+        return value[1:-1]
+    if value.startswith("[") and value.endswith("]"):
+        return [_scalar(item.strip()) for item in value[1:-1].split(",") if item.strip()]
+    if value in ("null", "~"):
+        return None
+    return value
+
+
+def _lines(text: str) -> list:
+    lines = []
+    for raw in text.splitlines():
+        stripped = raw.lstrip(" ")
+        content = stripped.rstrip()
+        indent = len(raw) - len(stripped)
+        if not content:
+            lines.append([indent, "", raw])
+        elif content.startswith("#"):
+            continue
+        else:
+            lines.append([indent, content, raw])
+    return lines
+
+
+def _block_scalar(lines: list, index: int, parent_indent: int):
+    parts = []
+    while index < len(lines) and (not lines[index][1] or lines[index][0] > parent_indent):
+        parts.append(lines[index][2].strip())
+        index += 1
+    return "\n".join(parts).strip(), index
+
+
+def _skip_blank(lines: list, index: int) -> int:
+    while index < len(lines) and not lines[index][1]:
+        index += 1
+    return index
+
+
+def _parse_block(lines: list, index: int, indent: int):
+    index = _skip_blank(lines, index)
+    if index < len(lines) and (lines[index][1] == "-" or lines[index][1].startswith("- ")):
+        return _parse_sequence(lines, index, indent)
+    return _parse_mapping(lines, index, indent)
+
+
+def _parse_value(lines: list, index: int, indent: int, value: str):
+    # The value of a "key: value" line (or list item) whose line was lines[index - 1]
+    if value in ("|", ">", "|-", ">-", "|+", ">+"):
+        return _block_scalar(lines, index, indent)
+    if value:
+        return _scalar(_strip_comment(value)), index
+    following = _skip_blank(lines, index)
+    if following < len(lines):
+        child_indent, content, _ = lines[following]
+        is_item = content == "-" or content.startswith("- ")
+        if child_indent > indent or (child_indent == indent and is_item):
+            return _parse_block(lines, following, child_indent)
+    return None, index
+
+
+def _parse_mapping(lines: list, index: int, indent: int):
+    mapping = {}
+    while index < len(lines):
+        line_indent, content, _ = lines[index]
+        if not content:
+            index += 1
+            continue
+        if line_indent < indent or content == "-" or content.startswith("- "):
+            break
+        if line_indent > indent:
+            # Continuation of a multi-line plain scalar
+            index += 1
+            continue
+        split = _split_key(content)
+        if split is None:
+            index += 1
+            continue
+        key, value = split
+        mapping[key], index = _parse_value(lines, index + 1, indent, value)
+    return mapping, index
+
+
+def _parse_sequence(lines: list, index: int, indent: int):
+    items = []
+    while index < len(lines):
+        line_indent, content, raw = lines[index]
+        if not content:
+            index += 1
+            continue
+        if line_indent != indent or not (content == "-" or content.startswith("- ")):
+            break
+        rest = content[2:].strip()
+        if rest and _split_key(rest) is not None and not rest.startswith("!include"):
+            # "- key: value" starts a mapping indented past the dash
+            lines[index] = [indent + 2, rest, raw]
+            item, index = _parse_mapping(lines, index, indent + 2)
+        else:
+            item, index = _parse_value(lines, index + 1, indent, rest)
+        items.append(item)
+    return items, index
+
+
+def parse_yaml(text: str):
+    """
+    Parse the block-style YAML used by RAML into dicts, lists, strings and Include markers.
+    Flow mappings are kept as strings; flow sequences are split on commas.
+    """
+    node, _ = _parse_block(_lines(text), 0, 0)
+    return node
+
+
+# Sources
+
+class FolderSource:
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+        self.key = ("folder", self.root)
+
+    def _path(self, path: str) -> str:
+        full_path = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([full_path, self.root]) != self.root:
+            raise FileNotFoundError(path)
+        return full_path
+
+    def read(self, path: str) -> bytes:
+        with open(self._path(path), "rb") as handle:
+            return handle.read()
+
+    def validator(self, path: str):
+        # Only called for paths already read (and checked) through read()
+        try:
+            stat = os.stat(os.path.join(self.root, path))
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+
+class ZipSource:
+    def __init__(self, zip_ref: zipfile.ZipFile):
+        self.zip_ref = zip_ref
+        # Identified by member names and CRCs, so the same archive from a
+        # different (e.g. signed) URL still hits the cache
+        listing = "\n".join(f"{info.filename}:{info.file_size}:{info.CRC}" for info in zip_ref.infolist())
+        self.key = ("zip", hashlib.sha256(listing.encode("utf-8")).hexdigest())
+
+    def read(self, path: str) -> bytes:
+        return self.zip_ref.read(path)
+
+    def validator(self, path: str):
+        try:
+            info = self.zip_ref.getinfo(path)
+        except KeyError:
+            return None
+        return info.file_size, info.CRC
+
+
+_parsed = OrderedDict()
+_models = OrderedDict()
+stats = {"model_hits": 0, "model_misses": 0, "file_hits": 0, "file_misses": 0}
+_cache_lock = threading.Lock()
+
+
+def _remember(cache: OrderedDict, key, value, limit: int):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > limit:
+        cache.popitem(last=False)
+
+
+class _Builder:
+    def __init__(self, source):
+        self.source = source
+        self.validators = {}
+        self.errors = []
+        self.includes = set()  # non-RAML files pulled in with !include (examples, schemas)
+
+    def load(self, path: str):
+        data = self.source.read(path)
+        self.validators[path] = self.source.validator(path)
+        digest = hashlib.sha256(data).hexdigest()
+        with _cache_lock:
+            tree = _parsed.get(digest)
+            if tree is not None:
+                stats["file_hits"] += 1
+                _parsed.move_to_end(digest)
+                return tree
+            stats["file_misses"] += 1
+        tree = parse_yaml(data.decode("utf-8", errors="replace"))
+        with _cache_lock:
+            _remember(_parsed, digest, tree, PARSED_FILES_CACHE)
+        return tree
+
+    def _target(self, base_dir: str, path: str) -> str:
+        if path.startswith("/"):
+            return posixpath.normpath(path.lstrip("/"))
+        return posixpath.normpath(posixpath.join(base_dir, path))
+
+    def resolve(self, node, base_dir: str, seen: tuple = ()):
+        """
+        Inline RAML/YAML includes (recursively); other includes become {"include": path}.
+        """
+        if isinstance(node, Include):
+            target = self._target(base_dir, node.path)
+            if not target.endswith((".raml", ".yaml", ".yml")):
+                self.includes.add(target)
+                return {"include": target}
+            if target in seen:
+                self.errors.append(f"Include cycle at {target}")
+                return {"include": target}
+            try:
+                tree = self.load(target)
+            except (OSError, KeyError) as exc:
+                self.errors.append(f"Cannot include {target}: {exc}")
+                return {"include": target}
+            return self.resolve(tree, posixpath.dirname(target), seen + (target,))
+        if isinstance(node, dict):
+            return {key: self.resolve(value, base_dir, seen) for key, value in node.items()}
+        if isinstance(node, list):
+            return [self.resolve(value, base_dir, seen) for value in node]
+        return node
+
+    def libraries(self, tree: dict, base_dir: str, prefix: str = "", seen: tuple = ()) -> dict:
+        """
+        Load `uses:` libraries; returns {"types": ..., "traits": ..., "resourceTypes": ..., "libraries": ...}
+        with names prefixed by their namespace.
+        """
+        found = {"types": {}, "traits": [], "resourceTypes": [], "libraries": {}}
+        uses = tree.get("uses") if isinstance(tree, dict) else None
+        for namespace, path in (uses or {}).items():
+            path = path.path if isinstance(path, Include) else str(path)
+            target = self._target(base_dir, path)
+            qualified = f"{prefix}{namespace}"
+            found["libraries"][qualified] = target
+            if target in seen:
+                self.errors.append(f"Library cycle at {target}")
+                continue
+            try:
+                library = self.resolve(self.load(target), posixpath.dirname(target), seen + (target,))
+            except (OSError, KeyError) as exc:
+                self.errors.append(f"Cannot load library {target}: {exc}")
+                continue
+            if not isinstance(library, dict):
+                continue
+            for name, declaration in _declarations(library).items():
+                found["types"][f"{qualified}.{name}"] = _summarize_type(declaration, target)
+            found["traits"] += [f"{qualified}.{name}" for name in _names(library.get("traits"))]
+            found["resourceTypes"] += [f"{qualified}.{name}" for name in _names(library.get("resourceTypes"))]
+            nested = self.libraries(library, posixpath.dirname(target), f"{qualified}.", seen + (target,))
+            for key in found:
+                if isinstance(found[key], dict):
+                    found[key].update(nested[key])
+                else:
+                    found[key] += nested[key]
+        return found
+
+
+# Model
+
+def _names(node) -> list:
+    if isinstance(node, dict):
+        return list(node)
+    if isinstance(node, list):
+        return [name for item in node if isinstance(item, dict) for name in item]
+    return []
+
+
+def _declarations(tree: dict) -> dict:
+    declarations = {}
+    for key in ("types", "schemas"):
+        node = tree.get(key)
+        if isinstance(node, list):
+            for item in node:
+                if isinstance(item, dict):
+                    declarations.update(item)
+        elif isinstance(node, dict):
+            declarations.update(node)
+    return declarations
+
+
+def _type_ref(node):
+    if node is None:
+        return None
+    if isinstance(node, str):
+        return node
+    if isinstance(node, list):
+        return " | ".join(str(_type_ref(item)) for item in node)
+    if isinstance(node, dict):
+        if set(node) == {"include"}:
+            return f"!include {node['include']}"
+        for key in ("type", "schema"):
+            if key in node:
+                return _type_ref(node[key])
+        if "properties" in node:
+            return "object"
+    return "any"
+
+
+def _summarize_type(declaration, source_file: str) -> dict:
+    summary = {"type": _type_ref(declaration) or "string", "file": source_file}
+    if isinstance(declaration, dict):
+        properties = declaration.get("properties")
+        if isinstance(properties, dict):
+            summary["properties"] = {name: _type_ref(value) or "string" for name, value in properties.items()}
+        for key in ("enum", "items", "description"):
+            if key in declaration:
+                value = declaration[key]
+                summary[key] = _type_ref(value) if key == "items" else value
+        if "type" not in declaration and "properties" in declaration:
+            summary["type"] = "object"
+    return summary
+
+
+def _bodies(node) -> dict:
+    if not isinstance(node, dict):
+        return {"*": _type_ref(node)} if node is not None else {}
+    media_types = {key: value for key, value in node.items() if "/" in key}
+    if not media_types:
+        return {"*": _type_ref(node)}
+    return {media_type: _type_ref(value) for media_type, value in media_types.items()}
+
+
+def _parameters(node) -> dict:
+    if not isinstance(node, dict):
+        return {}
+    return {name.rstrip("?"): _type_ref(value) or "string" for name, value in node.items()}
+
+
+def _method(node) -> dict:
+    node = node if isinstance(node, dict) else {}
+    summary = {}
+    description = node.get("description") or node.get("displayName")
+    if isinstance(description, str):
+        summary["description"] = description[:DESCRIPTION_CHARS]
+    for key in ("is", "securedBy"):
+        if node.get(key):
+            summary[key] = node[key] if isinstance(node[key], list) else [node[key]]
+    for key in ("queryParameters", "headers"):
+        if node.get(key):
+            summary[key] = _parameters(node[key])
+    if node.get("body") is not None:
+        summary["body"] = _bodies(node["body"])
+    responses = node.get("responses")
+    if isinstance(responses, dict):
+        summary["responses"] = {
+            str(code): _bodies(response.get("body")) if isinstance(response, dict) and response.get("body") is not None else {}
+            for code, response in responses.items()
+        }
+    return summary
+
+
+def _resources(tree: dict, prefix: str = "", found: dict | None = None) -> dict:
+    found = {} if found is None else found
+    for key, node in tree.items():
+        if not key.startswith("/"):
+            continue
+        path = prefix + key
+        node = node if isinstance(node, dict) else {}
+        resource = {"methods": {name: _method(node[name]) for name in METHODS if name in node}}
+        if node.get("type"):
+            resource["type"] = node["type"] if isinstance(node["type"], str) else _names(node["type"])[0]
+        if node.get("is"):
+            resource["is"] = node["is"] if isinstance(node["is"], list) else [node["is"]]
+        if node.get("uriParameters"):
+            resource["uriParameters"] = _parameters(node["uriParameters"])
+        found[path] = resource
+        _resources(node, path, found)
+    return found
+
+
+def _build(source, main_file: str) -> tuple:
+    builder = _Builder(source)
+    base_dir = posixpath.dirname(main_file)
+    raw_tree = builder.load(main_file)
+    if not isinstance(raw_tree, dict):
+        raise ValueError(f"{main_file} is not a RAML document")
+    tree = builder.resolve(raw_tree, base_dir, (main_file,))
+    libraries = builder.libraries(tree, base_dir, seen=(main_file,))
+
+    # Report included type declarations against the file they live in
+    declared_in = {
+        name: builder._target(base_dir, declaration.path) if isinstance(declaration, Include) else main_file
+        for name, declaration in _declarations(raw_tree).items()
+    }
+    types = {
+        name: _summarize_type(declaration, declared_in.get(name, main_file))
+        for name, declaration in _declarations(tree).items()
+    }
+    types.update(libraries["types"])
+
+    model = {
+        "title": tree.get("title"),
+        "version": tree.get("version"),
+        "baseUri": tree.get("baseUri"),
+        "mediaType": tree.get("mediaType"),
+        "libraries": libraries["libraries"],
+        "traits": _names(tree.get("traits")) + libraries["traits"],
+        "resourceTypes": _names(tree.get("resourceTypes")) + libraries["resourceTypes"],
+        "types": types,
+        "resources": _resources(tree),
+        "files": sorted(builder.validators),
+        "includes": sorted(builder.includes),
+        "errors": builder.errors,
+    }
+    return builder.validators, model
+
+
+def load_model(source, main_file: str) -> dict:
+    """
+    Return the model for main_file, rebuilding only if a file it was built from changed.
+    """
+    key = (source.key, main_file)
+    with _cache_lock:
+        cached = _models.get(key)
+    if cached is not None:
+        validators, model = cached
+        if all(source.validator(path) == expected for path, expected in validators.items()):
+            with _cache_lock:
+                stats["model_hits"] += 1
+                if key in _models:
+                    _models.move_to_end(key)
+            return model
+    with _cache_lock:
+        stats["model_misses"] += 1
+    validators, model = _build(source, main_file)
+    with _cache_lock:
+        _remember(_models, key, (validators, model), MODELS_CACHE)
+    return model
+
+
+def spec_files(source, main_file: str) -> list:
+    """
+    Every file main_file needs: itself, the RAML files it includes or uses,
+    and the other files (examples, schemas) it includes.
+    """
+    model = load_model(source, main_file)
+    return sorted(set(model["files"]) | set(model["includes"]))
+
+
+def referenced_types(model: dict, refs, depth: int = 3) -> dict:
+    """
+    Definitions of the named types used by refs (and the types they use, `depth` levels down).
+    """
+    types = model["types"]
+    wanted, result = set(), {}
+    for ref in refs:
+        wanted.update(_IDENTIFIER.findall(str(ref or "")))
+    for _ in range(depth):
+        next_wanted = set()
+        for name in wanted - set(result) - _BUILTIN_TYPES:
+            if name in types:
+                result[name] = types[name]
+                definition = types[name]
+                next_wanted.update(_IDENTIFIER.findall(str(definition.get("type"))))
+                next_wanted.update(_IDENTIFIER.findall(" ".join(map(str, (definition.get("properties") or {}).values()))))
+                next_wanted.update(_IDENTIFIER.findall(str(definition.get("items") or "")))
+        wanted = next_wanted
+    return result
+
+
+def _method_refs(method: dict) -> list:
+    refs = list((method.get("body") or {}).values())
+    for bodies in (method.get("responses") or {}).values():
+        refs += list(bodies.values())
+    refs += list((method.get("queryParameters") or {}).values())
+    return refs
+
+
+def query(model: dict, resource: str | None = None, method: str | None = None, type_name: str | None = None) -> dict:
+    """
+    Answer a structural question from a model:
+    - nothing     : overview (resource paths with their methods, type/trait names)
+    - resource    : that resource and everything under it, plus the types its methods use
+    - method      : narrows a resource query to one method
+    - type_name   : one type definition and the types it references
+    """
+    if type_name:
+        if type_name not in model["types"]:
+            return {"status": "error", "message": f"Type '{type_name}' not found", "types": sorted(model["types"])}
+        return {"status": "success", "type": type_name, "types": referenced_types(model, [type_name])}
+
+    if resource:
+        resource = "/" + resource.strip("/") if resource.strip("/") else "/"
+        matches = {
+            path: node for path, node in model["resources"].items()
+            if path == resource or path.startswith(resource.rstrip("/") + "/")
+        }
+        if not matches:
+            return {"status": "error", "message": f"Resource '{resource}' not found", "resources": sorted(model["resources"])}
+        if method:
+            method = method.lower()
+            matches = {
+                path: dict(node, methods={method: node["methods"][method]})
+                for path, node in matches.items() if method in node["methods"]
+            }
+        refs = [ref for node in matches.values() for details in node["methods"].values() for ref in _method_refs(details)]
+        return {"status": "success", "resources": matches, "types": referenced_types(model, refs)}
+
+    return {
+        "status": "success",
+        "title": model["title"],
+        "version": model["version"],
+        "baseUri": model["baseUri"],
+        "resources": {path: sorted(node["methods"]) for path, node in model["resources"].items()},
+        "types": sorted(model["types"]),
+        "traits": model["traits"],
+        "resourceTypes": model["resourceTypes"],
+        "libraries": model["libraries"],
+        "files": len(model["files"]),
+        "errors": model["errors"],
+    }
@@ -1,9 +1,40 @@
-import io
+import asyncio
 import os
+import tempfile
 import zipfile
-from pathlib import Path
 
-import httpx
+from . import migration_index, projection, raml_model, spill, upstream
+from .exchange_tools import EXCHANGE_BASE
+
+# Only these metadata fields are parsed when picking the file to download
+ASSET_FILE_FIELDS = ["type", "files.classifier", "files.packaging", "files.mainFile", "files.downloadURL", "files.externalLink"]
+
+
+def spooled_buffer():
+    # ZIPs up to the spill threshold stay in memory, larger ones go to a temp file
+    return tempfile.SpooledTemporaryFile(max_size=spill.SPILL_THRESHOLD or 8 * 1024 * 1024)
+
+
+async def download_to(client, url: str, buffer, headers: dict | None = None):
+    """
+    Stream url into buffer (instead of holding it all in memory) and rewind it.
+    """
+    async with client.stream("GET", url, headers=headers, timeout=40.0) as resp:
+        resp.raise_for_status()
+        async for chunk in resp.aiter_bytes():
+            buffer.write(chunk)
+    buffer.seek(0)
+
+
+def read_member(tool_name: str, zip_ref: zipfile.ZipFile, member_name: str) -> str:
+    """
+    Return a ZIP member's text, or a spill summary when it is above the spill threshold.
+    """
+    if spill.should_spill(zip_ref.getinfo(member_name).file_size):
+        with zip_ref.open(member_name) as member:
+            return spill.spill_chunks(tool_name, iter(lambda: member.read(spill.CHUNK_SIZE), b""))
+    return zip_ref.read(member_name).decode("utf-8")
+
 
 # Get raml from link or migration folder Tool
 def register(mcp):
@@ -11,36 +42,183 @@ def register(mcp):
     async def get_raml_from_link(download_url: str, main_file: str) -> str:
         """
         Download a RAML ZIP and return the requested file.
+        Files above the spill threshold are returned as a spill:// resource URI.
         """
 
-        async with httpx.AsyncClient() as client:
+        async with upstream.client() as client:
             try:
-                resp = await client.get(download_url, timeout=40.0)
+                with spooled_buffer() as buffer:
+                    await download_to(client, download_url, buffer)
+                    with zipfile.ZipFile(buffer, "r") as zip_ref:
+                        if main_file not in zip_ref.namelist():
+                            return f"Main RAML file '{main_file}' not found inside the ZIP."
+                        return read_member("get_raml_from_link", zip_ref, main_file)
+            except Exception as exc:
+                return f"Error downloading or extracting RAML: {exc}"
+
+    @mcp.tool()
+    async def get_raml_from_asset(
+        token: str,
+        org_id: str,
+        group_id: str,
+        asset_id: str,
+        version: str,
+        classifier: str = "fat-raml",
+        main_file: str | None = None
+    ) -> str:
+        """
+        Fetch a published asset's spec in one step: reads the Exchange
+        metadata, picks the file with the given classifier (e.g. "fat-raml",
+        "raml", "oas", "raml-fragment") and returns main_file from it.
+
+        main_file defaults to the file's mainFile in Exchange. Files above the
+        spill threshold are returned as a spill:// resource URI.
+        """
+
+        url = f"{EXCHANGE_BASE}/assets/{group_id}/{asset_id}/{version}/asset"
+        headers = {"Authorization": f"Bearer {token}"}
+
+        async with upstream.client(org_id) as client:
+            try:
+                resp = await client.get(url, headers=headers, timeout=30.0)
                 resp.raise_for_status()
+                metadata = projection.loads(resp.content, ASSET_FILE_FIELDS)
 
-                zip_bytes = io.BytesIO(resp.content)
-                with zipfile.ZipFile(zip_bytes, "r") as zip_ref:
-                    if main_file in zip_ref.namelist():
-                        return zip_ref.read(main_file).decode("utf-8")
-                    return f"Main RAML file '{main_file}' not found inside the ZIP."
+                files = metadata.get("files") or []
+                chosen = next((f for f in files if f.get("classifier") == classifier), None)
+                if chosen is None:
+                    available = sorted({f.get("classifier") for f in files if f.get("classifier")})
+                    return f"No '{classifier}' file on {group_id}/{asset_id}/{version}. Available classifiers: {available}"
+
+                download_url = chosen.get("downloadURL") or chosen.get("externalLink")
+                if not download_url:
+                    return f"The '{classifier}' file of {group_id}/{asset_id}/{version} has no download link."
+
+                with spooled_buffer() as buffer:
+                    await download_to(client, download_url, buffer)
+
+                    if chosen.get("packaging") != "zip":
+                        # Single-file packaging (e.g. an OAS json/yaml)
+                        if spill.should_spill(buffer.seek(0, os.SEEK_END)):
+                            buffer.seek(0)
+                            return spill.spill_chunks("get_raml_from_asset", iter(lambda: buffer.read(spill.CHUNK_SIZE), b""))
+                        buffer.seek(0)
+                        return buffer.read().decode("utf-8")
+
+                    with zipfile.ZipFile(buffer, "r") as zip_ref:
+                        member = main_file or chosen.get("mainFile")
+                        if not member:
+                            roots = [name for name in zip_ref.namelist() if "/" not in name and name.endswith((".raml", ".yaml", ".json"))]
+                            member = roots[0] if len(roots) == 1 else None
+                        if not member or member not in zip_ref.namelist():
+                            return f"Main file '{member}' not found in the '{classifier}' ZIP; pass main_file. Files: {zip_ref.namelist()[:50]}"
+                        return read_member("get_raml_from_asset", zip_ref, member)
             except Exception as exc:
-                return f"Error downloading or extracting RAML: {exc}"
+                return f"Error fetching spec for {group_id}/{asset_id}/{version}: {exc}"
 
     @mcp.tool()
     async def get_raml_from_migration(migration_id: str, raml_file_path: str) -> str:
         """
         Read RAML directly from a migration output folder.
+        Files above the spill threshold are returned as a spill:// resource URI.
+        Use search_migration_specs / list_migration_specs to find the path.
         """
 
-        project_root = Path(__file__).resolve().parent.parent
-        full_path = project_root / "intelog-be" / "uploads" / f"migration_output_{migration_id}" / "raml-specs" / raml_file_path
+        full_path = migration_index.specs_root(migration_id) / raml_file_path
 
         if not full_path.exists():
             return f"RAML file not found at: {full_path}"
 
         try:
-            with full_path.open("r", encoding="utf-8") as handle:
-                return handle.read()
+            if spill.should_spill(os.path.getsize(full_path)):
+                return spill.spill_file("get_raml_from_migration", full_path)
+
+            # Served from memory while the file's size and mtime are unchanged
+            return migration_index.content_cache.read(full_path)
         except Exception as exc:
             return f"Error reading RAML file: {exc}"
 
+    @mcp.tool()
+    async def search_migration_specs(
+        query: str | None = None,
+        title: str | None = None,
+        resource: str | None = None,
+        migration_id: str | None = None,
+        kind: str | None = None,
+        limit: int = 50
+    ) -> dict:
+        """
+        Find spec files across all migration outputs from the local index.
+
+        query        : Substring of the file path, title, baseUri or a resource path
+        title        : Exact RAML title
+        resource     : Resource path prefix, e.g. "/orders"
+        migration_id : Restrict to one migration
+        kind         : RAML kind, e.g. "Api", "Library", "DataType"
+
+        Each match has migration_id and path (ready for get_raml_from_migration),
+        size, sha256, title, version, baseUri and resource paths.
+        """
+        await migration_index.ready()
+        matches = migration_index.search(query, title, resource, migration_id, kind, limit)
+        return {"status": "success", "count": len(matches), "specs": matches, "index": migration_index.state}
+
+    @mcp.tool()
+    async def list_migration_specs(migration_id: str) -> dict:
+        """
+        List every indexed spec file of one migration output, with its metadata.
+        """
+        await migration_index.ready()
+        specs = migration_index.list_specs(migration_id)
+        if not specs:
+            return {"status": "error", "message": f"No spec files indexed for migration {migration_id}"}
+        return {"status": "success", "count": len(specs), "specs": specs}
+
+    @mcp.tool()
+    async def query_raml_structure(
+        main_file: str,
+        migration_id: str | None = None,
+        download_url: str | None = None,
+        resource: str | None = None,
+        method: str | None = None,
+        type_name: str | None = None
+    ) -> dict:
+        """
+        Answer structural questions about a RAML API without returning the spec.
+
+        Source (one of):
+        - migration_id : main_file is relative to the migration's raml-specs folder
+        - download_url : main_file is a member of the downloaded ZIP
+
+        `!include` and `uses:` libraries are resolved within the same folder/ZIP.
+        Questions:
+        - no filter : resource paths with their methods, type/trait/library names
+        - resource  : e.g. "/orders" → methods (parameters, bodies, responses) of
+                      that resource and its children, plus the types they use
+        - method    : narrow a resource question to one method, e.g. "post"
+        - type_name : one type (e.g. "Order" or "lib.Order") and the types it uses
+
+        Parsed models are cached by content, so repeated questions are served
+        without re-reading the files.
+        """
+
+        if bool(migration_id) == bool(download_url):
+            return {"status": "error", "message": "Provide exactly one of migration_id or download_url"}
+
+        try:
+            if migration_id:
+                source = raml_model.FolderSource(migration_index.specs_root(migration_id))
+                model = await asyncio.to_thread(raml_model.load_model, source, main_file)
+            else:
+                async with upstream.client() as client:
+                    with spooled_buffer() as buffer:
+                        await download_to(client, download_url, buffer)
+                        with zipfile.ZipFile(buffer, "r") as zip_ref:
+                            if main_file not in zip_ref.namelist():
+                                return {"status": "error", "message": f"Main RAML file '{main_file}' not found inside the ZIP."}
+                            source = raml_model.ZipSource(zip_ref)
+                            model = await asyncio.to_thread(raml_model.load_model, source, main_file)
+        except Exception as exc:
+            return {"status": "error", "message": f"Error reading RAML: {exc}"}
+
+        return raml_model.query(model, resource, method, type_name)
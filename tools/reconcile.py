@@ -0,0 +1,166 @@
+# Desired-state planning for API instance policies and SLA tiers.
+#
+# Desired entries only pin the fields they mention: a policy is matched to an
+# applied policy with the same assetId (one that already satisfies it first,
+# when the same policy is applied several times), a tier to the tier with the
+# same name, and an update is planned only when a mentioned field differs.
+
+DEFAULT_POLICY_GROUP_ID = "68ef9520-24e9-4cf2-b2f5-620025690913"  # MuleSoft policy templates
+
+POLICY_FIELDS = ("groupId", "assetId", "assetVersion", "configurationData", "pointcutData", "order", "disabled")
+TIER_FIELDS = ("name", "description", "limits", "status", "autoApprove")
+
+
+def validate(state) -> list:
+    """
+    Problems with one instance's desired state; empty when it can be planned.
+    """
+    if not isinstance(state, dict):
+        return ["the desired state must be an object with \"policies\" and/or \"tiers\""]
+    problems = []
+    for kind, key in (("policies", "assetId"), ("tiers", "name")):
+        if kind not in state:
+            continue
+        if not isinstance(state[kind], list):
+            problems.append(f"{kind} must be a list")
+            continue
+        for index, item in enumerate(state[kind]):
+            if not isinstance(item, dict) or not item.get(key):
+                problems.append(f"{kind}[{index}] has no {key}")
+            elif kind == "policies" and item.get("pointcutData") and not (
+                isinstance(item["pointcutData"], list) and all(isinstance(entry, dict) for entry in item["pointcutData"])
+            ):
+                problems.append(f"policies[{index}].pointcutData must be a list of objects")
+    names = [tier.get("name") for tier in state.get("tiers") or [] if isinstance(tier, dict)]
+    problems += [f"tier {name!r} is listed more than once" for name in sorted({n for n in names if n and names.count(n) > 1})]
+    return problems
+
+
+def _items(data, key: str) -> list:
+    if isinstance(data, dict):
+        data = data.get(key, [])
+    return data if isinstance(data, list) else []
+
+
+def satisfies(desired, current) -> bool:
+    """
+    True if everything set in `desired` has the same value in `current`
+    (dict keys not mentioned in `desired` are ignored).
+    """
+    if isinstance(desired, dict):
+        return isinstance(current, dict) and all(
+            key in current and satisfies(value, current[key]) for key, value in desired.items()
+        )
+    if isinstance(desired, list):
+        return (
+            isinstance(current, list)
+            and len(desired) == len(current)
+            and all(satisfies(d, c) for d, c in zip(desired, current))
+        )
+    if isinstance(desired, bool) or isinstance(current, bool):
+        # True == 1 in Python, but not in a policy configuration
+        return desired is current
+    if isinstance(desired, (int, float)) and isinstance(current, (int, float)):
+        return float(desired) == float(current)
+    return desired == current
+
+
+def _sorted_limits(limits) -> list:
+    return sorted(
+        limits or [],
+        key=lambda limit: (float(limit.get("timePeriodInMilliseconds", 0)), float(limit.get("maximumRequests", 0))),
+    )
+
+
+def current_policies(data) -> list:
+    policies = []
+    for policy in _items(data, "policies"):
+        template = policy.get("template") or {}
+        policies.append({
+            "id": policy.get("policyId", policy.get("id")),
+            "groupId": policy.get("groupId", template.get("groupId")),
+            "assetId": policy.get("assetId", template.get("assetId")),
+            "assetVersion": policy.get("assetVersion", template.get("assetVersion")),
+            "configurationData": policy.get("configurationData", policy.get("configuration")),
+            "pointcutData": policy.get("pointcutData"),
+            "order": policy.get("order"),
+            "disabled": policy.get("disabled", False),
+        })
+    return policies
+
+
+def current_tiers(data) -> list:
+    return [
+        dict({field: tier.get(field) for field in TIER_FIELDS}, id=tier.get("id"))
+        for tier in _items(data, "tiers")
+    ]
+
+
+def _changed(desired: dict, current: dict, fields) -> list:
+    return [field for field in fields if field in desired and not satisfies(desired[field], current.get(field))]
+
+
+def plan_policies(instance_id: str, desired: list, current: list, prune: bool = False) -> list:
+    actions = []
+    by_asset = {}
+    for policy in current:
+        by_asset.setdefault(policy["assetId"], []).append(policy)
+
+    for policy in desired:
+        payload = {field: policy[field] for field in POLICY_FIELDS if field in policy}
+        payload.setdefault("groupId", DEFAULT_POLICY_GROUP_ID)
+        candidates = by_asset.get(policy["assetId"], [])
+        existing = next(
+            (candidate for candidate in candidates if not _changed(policy, candidate, POLICY_FIELDS)),
+            candidates[0] if candidates else None,
+        )
+        if existing is not None:
+            candidates.remove(existing)
+
+        if existing is None:
+            actions.append({"instance_id": instance_id, "kind": "policy", "action": "create", "key": policy["assetId"], "payload": payload})
+            continue
+        changes = _changed(policy, existing, POLICY_FIELDS)
+        if changes:
+            actions.append({
+                "instance_id": instance_id, "kind": "policy", "action": "update", "key": policy["assetId"],
+                "id": existing["id"], "changes": changes, "payload": payload,
+            })
+
+    if prune:
+        for asset_id, remaining in by_asset.items():
+            for existing in remaining:
+                actions.append({"instance_id": instance_id, "kind": "policy", "action": "delete", "key": asset_id, "id": existing["id"]})
+    return actions
+
+
+def plan_tiers(instance_id: str, desired: list, current: list, prune: bool = False) -> list:
+    actions = []
+    by_name = {tier["name"]: tier for tier in current}
+
+    for tier in desired:
+        tier = dict(tier)
+        if "limits" in tier:
+            tier["limits"] = _sorted_limits(tier["limits"])
+        existing = by_name.pop(tier["name"], None)
+
+        if existing is None:
+            payload = {"apiVersionId": instance_id, "status": "ACTIVE", "autoApprove": False, "description": "", **tier}
+            actions.append({"instance_id": instance_id, "kind": "tier", "action": "create", "key": tier["name"], "payload": payload})
+            continue
+
+        existing = dict(existing, limits=_sorted_limits(existing.get("limits")))
+        changes = _changed(tier, existing, TIER_FIELDS)
+        if changes:
+            # Tier updates replace the whole tier
+            payload = {field: existing.get(field) for field in TIER_FIELDS}
+            payload.update(tier, id=existing["id"], apiVersionId=instance_id)
+            actions.append({
+                "instance_id": instance_id, "kind": "tier", "action": "update", "key": tier["name"],
+                "id": existing["id"], "changes": changes, "payload": payload,
+            })
+
+    if prune:
+        for name, existing in by_name.items():
+            actions.append({"instance_id": instance_id, "kind": "tier", "action": "delete", "key": name, "id": existing["id"]})
+    return actions
@@ -0,0 +1,189 @@
+import json
+import os
+import shutil
+import time
+import uuid
+
+from . import metrics, storage
+
+# Spill store for large tool results.
+#
+# Results above SPILL_THRESHOLD bytes are written to disk (with a TTL) and the
+# tool returns a short summary with a spill:// resource URI instead. Clients
+# read the content back in pages or byte ranges through MCP resources.
+
+SPILL_THRESHOLD = int(os.environ.get("ANYPOINT_SPILL_THRESHOLD", str(512 * 1024)))  # 0 disables
+SPILL_TTL = float(os.environ.get("ANYPOINT_SPILL_TTL", "3600"))
+PAGE_SIZE = int(os.environ.get("ANYPOINT_SPILL_PAGE_SIZE", str(64 * 1024)))
+PREVIEW_CHARS = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+def _dir():
+    return storage.data_dir("spill")
+
+
+def _paths(spill_id: str):
+    # IDs are generated here; reject anything that could escape the spill dir
+    if not spill_id.isalnum():
+        raise ValueError(f"Invalid spill id: {spill_id}")
+    base = _dir()
+    return base / f"{spill_id}.data", base / f"{spill_id}.json"
+
+
+def should_spill(size: int) -> bool:
+    return SPILL_THRESHOLD > 0 and size > SPILL_THRESHOLD
+
+
+def purge_expired():
+    now = time.time()
+    for meta_path in _dir().glob("*.json"):
+        try:
+            with meta_path.open("r", encoding="utf-8") as handle:
+                expires_at = json.load(handle)["expires_at"]
+        except Exception:
+            expires_at = 0
+        if expires_at < now:
+            meta_path.with_suffix(".data").unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+
+
+def _finish(tool_name: str, spill_id: str, size: int, mime_type: str) -> str:
+    data_path, meta_path = _paths(spill_id)
+    meta = {
+        "tool": tool_name,
+        "bytes": size,
+        "mime_type": mime_type,
+        "created_at": time.time(),
+        "expires_at": time.time() + SPILL_TTL,
+    }
+    with meta_path.open("w", encoding="utf-8") as handle:
+        json.dump(meta, handle)
+
+    metrics.incr("spilled_results", tool=tool_name)
+    metrics.incr("spilled_bytes", size, tool=tool_name)
+
+    with data_path.open("rb") as handle:
+        preview = handle.read(PREVIEW_CHARS * 4).decode("utf-8", errors="ignore")[:PREVIEW_CHARS]
+
+    pages = max(1, -(-size // PAGE_SIZE))
+    return json.dumps({
+        "spilled": True,
+        "message": f"Result is {size} bytes; read it from the MCP resource in pages or ranges.",
+        "uri": f"spill://{spill_id}",
+        "pages_uri": f"spill://{spill_id}/pages/{{page}}",
+        "range_uri": f"spill://{spill_id}/range/{{offset}}/{{length}}",
+        "bytes": size,
+        "pages": pages,
+        "page_size": PAGE_SIZE,
+        "expires_in": SPILL_TTL,
+        "preview": preview,
+    })
+
+
+def spill_chunks(tool_name: str, chunks, mime_type: str = "text/plain") -> str:
+    """
+    Write an iterable of byte chunks to the store and return the summary.
+    """
+    purge_expired()
+    spill_id = uuid.uuid4().hex
+    data_path, _ = _paths(spill_id)
+
+    size = 0
+    with data_path.open("wb") as handle:
+        for chunk in chunks:
+            handle.write(chunk)
+            size += len(chunk)
+    return _finish(tool_name, spill_id, size, mime_type)
+
+
+def spill_file(tool_name: str, source_path, mime_type: str = "text/plain") -> str:
+    """
+    Copy a file into the store (without loading it) and return the summary.
+    """
+    purge_expired()
+    spill_id = uuid.uuid4().hex
+    data_path, _ = _paths(spill_id)
+    shutil.copyfile(source_path, data_path)
+    return _finish(tool_name, spill_id, data_path.stat().st_size, mime_type)
+
+
+def maybe_spill(tool_name: str, text: str, mime_type: str = "application/json") -> str:
+    """
+    Return `text` unchanged if it is small, otherwise spill it and return the summary.
+    """
+    if not should_spill(len(text)):
+        return text
+    encoded = text.encode("utf-8")
+    if not should_spill(len(encoded)):
+        return text
+    return spill_chunks(tool_name, [encoded], mime_type)
+
+
+def _load_meta(spill_id: str) -> dict:
+    data_path, meta_path = _paths(spill_id)
+    if not meta_path.exists():
+        raise ValueError(f"Spilled result '{spill_id}' not found (it may have expired)")
+    with meta_path.open("r", encoding="utf-8") as handle:
+        meta = json.load(handle)
+    if meta["expires_at"] < time.time():
+        raise ValueError(f"Spilled result '{spill_id}' has expired")
+    return meta
+
+
+def _align(handle, position: int, size: int) -> int:
+    # Move forward past UTF-8 continuation bytes so reads never split a character
+    while position < size:
+        handle.seek(position)
+        byte = handle.read(1)
+        if not byte or (byte[0] & 0xC0) != 0x80:
+            break
+        position += 1
+    return position
+
+
+def read_range(spill_id: str, offset: int, length: int) -> str:
+    meta = _load_meta(spill_id)
+    data_path, _ = _paths(spill_id)
+    size = meta["bytes"]
+
+    with data_path.open("rb") as handle:
+        start = _align(handle, max(0, offset), size)
+        end = _align(handle, min(size, max(0, offset) + max(0, length)), size)
+        handle.seek(start)
+        return handle.read(max(0, end - start)).decode("utf-8", errors="replace")
+
+
+def read_page(spill_id: str, page: int) -> str:
+    return read_range(spill_id, page * PAGE_SIZE, PAGE_SIZE)
+
+
+def info(spill_id: str) -> dict:
+    meta = _load_meta(spill_id)
+    meta["pages"] = max(1, -(-meta["bytes"] // PAGE_SIZE))
+    meta["page_size"] = PAGE_SIZE
+    return meta
+
+
+# MCP resources for reading spilled results
+def register(mcp):
+    @mcp.resource("spill://{spill_id}", mime_type="application/json")
+    def spilled_result_info(spill_id: str) -> str:
+        """
+        Size, page count and expiry of a spilled tool result.
+        """
+        return json.dumps(info(spill_id))
+
+    @mcp.resource("spill://{spill_id}/pages/{page}")
+    def spilled_result_page(spill_id: str, page: int) -> str:
+        """
+        One page (ANYPOINT_SPILL_PAGE_SIZE bytes, 0-based) of a spilled tool result.
+        """
+        return read_page(spill_id, int(page))
+
+    @mcp.resource("spill://{spill_id}/range/{offset}/{length}")
+    def spilled_result_range(spill_id: str, offset: int, length: int) -> str:
+        """
+        A byte range of a spilled tool result (aligned to whole UTF-8 characters).
+        """
+        return read_range(spill_id, int(offset), int(length))
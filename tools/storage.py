@@ -0,0 +1,15 @@
+import os
+from pathlib import Path
+
+# Local on-disk state (spilled results, manifests, indexes, snapshots)
+
+DATA_DIR = os.environ.get("ANYPOINT_MCP_DATA_DIR", str(Path.home() / ".anypoint-mcp"))
+
+
+def data_dir(*parts: str) -> Path:
+    """
+    Return (and create) a directory under the server's data dir.
+    """
+    path = Path(DATA_DIR).joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
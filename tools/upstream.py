@@ -0,0 +1,392 @@
+import asyncio
+import contextvars
+import os
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from contextlib import asynccontextmanager, contextmanager
+
+import httpx
+
+from . import deadline, hedging, metrics
+from .config import env_number_map
+
+# Shared upstream HTTP path for every Anypoint tool.
+#
+# Tools open clients with upstream.client(org_id) instead of httpx.AsyncClient().
+# All clients share one connection pool, and every request waits for a slot in
+# a fair-share scheduler keyed on org_id, so one organization running a large
+# migration cannot take all upstream concurrency away from the others.
+
+MAX_CONCURRENCY = int(os.environ.get("ANYPOINT_UPSTREAM_CONCURRENCY", "20"))
+ORG_WEIGHTS = env_number_map("ANYPOINT_ORG_WEIGHTS")  # e.g. "org-a=4,org-b=1"
+DEFAULT_TIMEOUT = float(os.environ.get("ANYPOINT_UPSTREAM_TIMEOUT", "30"))
+DEFAULT_TENANT = "-"
+
+# Fraction of slots bulk work still gets while interactive requests are queued
+BULK_MIN_SHARE = float(os.environ.get("ANYPOINT_BULK_MIN_SHARE", "0.2"))
+
+# Throttled responses (429, or 503 with Retry-After) are retried after the advertised delay
+THROTTLE_RETRIES = int(os.environ.get("ANYPOINT_UPSTREAM_RETRIES", "3"))
+THROTTLE_MAX_WAIT = float(os.environ.get("ANYPOINT_UPSTREAM_MAX_RETRY_AFTER", "30"))
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Failures that happen before the request leaves: the server never saw it
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+_lane_override = contextvars.ContextVar("upstream_lane", default=None)
+_writes = contextvars.ContextVar("upstream_writes", default=None)
+
+
+class _Lane:
+    """
+    One priority lane: a deficit round-robin over per-org FIFO queues.
+    """
+
+    def __init__(self):
+        self.queues = {}
+        self.active = deque()
+        self.deficit = {}
+
+    def push(self, org_id, waiter):
+        queue = self.queues.get(org_id)
+        if queue is None:
+            queue = self.queues[org_id] = deque()
+            self.active.append(org_id)
+            self.deficit[org_id] = 0.0
+        queue.append(waiter)
+
+    def pop(self, weight_of):
+        while self.active:
+            org_id = self.active[0]
+            queue = self.queues[org_id]
+
+            # Waiters that gave up (cancelled / deadline) are simply dropped
+            while queue and queue[0].done():
+                queue.popleft()
+
+            if not queue:
+                self.active.popleft()
+                del self.queues[org_id]
+                del self.deficit[org_id]
+                continue
+
+            if self.deficit[org_id] >= 1:
+                self.deficit[org_id] -= 1
+                return queue.popleft()
+
+            # Out of credit: top up by weight and let the next org go first
+            self.deficit[org_id] += weight_of(org_id)
+            self.active.rotate(-1)
+
+        return None
+
+    def __bool__(self):
+        return bool(self.active)
+
+
+class FairScheduler:
+    """
+    Bounded upstream concurrency shared fairly between organizations.
+
+    - Deficit round-robin keyed on org_id, so each org gets slots in
+      proportion to its weight (default 1) while others are waiting.
+    - Two lanes: interactive reads are dispatched before bulk work, except
+      that bulk keeps bulk_min_share of the dispatches while both are
+      waiting, so a steady stream of reads cannot starve it.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENCY,
+        weights: dict | None = None,
+        default_weight: float = 1.0,
+        bulk_min_share: float = BULK_MIN_SHARE,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+        if not 0 <= bulk_min_share <= 1:
+            raise ValueError("bulk_min_share must be between 0 and 1")
+        for org_id, weight in (weights or {}).items():
+            if weight <= 0:
+                raise ValueError(f"Weight for org '{org_id}' must be > 0")
+
+        self.max_concurrency = max_concurrency
+        self.weights = dict(weights or {})
+        self.default_weight = default_weight
+        self.bulk_min_share = bulk_min_share
+        self.in_flight = 0
+        self._bulk_credit = 0.0
+        self._lanes = {INTERACTIVE: _Lane(), BULK: _Lane()}
+
+    def weight_of(self, org_id: str) -> float:
+        return self.weights.get(org_id, self.default_weight)
+
+    def waiting(self) -> int:
+        return sum(
+            1
+            for lane in self._lanes.values()
+            for queue in lane.queues.values()
+            for waiter in queue
+            if not waiter.done()
+        )
+
+    async def acquire(self, org_id: str, lane: str = INTERACTIVE):
+        if self.in_flight < self.max_concurrency and not any(self._lanes.values()):
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._lanes[lane].push(org_id, waiter)
+        self._dispatch()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Slot was granted but the caller went away before using it
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.in_flight < self.max_concurrency:
+            interactive, bulk = self._lanes[INTERACTIVE], self._lanes[BULK]
+            waiter = None
+            if interactive and bulk:
+                # Both lanes waiting: bulk earns bulk_min_share of a slot per dispatch
+                self._bulk_credit += self.bulk_min_share
+                if self._bulk_credit >= 1:
+                    self._bulk_credit -= 1
+                    waiter = bulk.pop(self.weight_of)
+            if waiter is None:
+                waiter = interactive.pop(self.weight_of)
+            if waiter is None:
+                waiter = bulk.pop(self.weight_of)
+            if waiter is None:
+                return
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, org_id: str, lane: str = INTERACTIVE):
+        await self.acquire(org_id, lane)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+scheduler = FairScheduler(MAX_CONCURRENCY, ORG_WEIGHTS, bulk_min_share=BULK_MIN_SHARE)
+
+
+@contextmanager
+def lane(name: str):
+    """
+    Force every upstream request made inside the block onto a lane,
+    e.g. `with upstream.lane(upstream.BULK):` for crawls and fan-outs.
+    """
+    token = _lane_override.set(name)
+    try:
+        yield
+    finally:
+        _lane_override.reset(token)
+
+
+@contextmanager
+def record_writes():
+    """
+    Record the write requests sent inside the block: yields a list of
+    {"method", "url", "status"}, where status stays None until a response
+    arrives (and for good, if none does).
+    """
+    writes = []
+    token = _writes.set(writes)
+    try:
+        yield writes
+    finally:
+        _writes.reset(token)
+
+
+def lane_for(request: httpx.Request) -> str:
+    override = _lane_override.get()
+    if override is not None:
+        return override
+    return INTERACTIVE if request.method in READ_METHODS else BULK
+
+
+# Shared connection pool (one per event loop)
+_pool = None
+_pool_loop = None
+
+
+def shared_transport() -> httpx.AsyncHTTPTransport:
+    global _pool, _pool_loop
+
+    loop = asyncio.get_running_loop()
+    if _pool is None or _pool_loop is not loop:
+        _pool = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=MAX_CONCURRENCY * 2,
+                max_keepalive_connections=MAX_CONCURRENCY,
+                keepalive_expiry=30.0,
+            )
+        )
+        _pool_loop = loop
+    return _pool
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """
+    Response body wrapper that gives the scheduler slot back once the body
+    has been read (or the response closed), not when headers arrive.
+    """
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+# org_id -> monotonic time before which no new request is sent for that org
+_throttled_until = {}
+
+
+def retry_after(response: httpx.Response, attempt: int) -> float | None:
+    """
+    Seconds to wait before retrying a throttled response, or None if it should not be retried.
+    """
+    header = response.headers.get("Retry-After")
+    if header is None:
+        # 429 without a hint: exponential backoff; 503 without one is a real failure
+        return 2.0 ** attempt if response.status_code == 429 else None
+    try:
+        return max(0.0, float(header))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+async def _wait_if_throttled(org_id: str):
+    wait = _throttled_until.get(org_id, 0.0) - time.monotonic()
+    if wait > 0:
+        await deadline.sleep(wait)
+
+
+class ScheduledTransport(httpx.AsyncBaseTransport):
+    """
+    Per-client transport: waits for a fair-share slot, then sends the request
+    through the shared pool. Closing it leaves the shared pool open.
+    """
+
+    def __init__(self, org_id: str):
+        self.org_id = org_id
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        tool_name = deadline.current_tool()
+        attempt = 0
+
+        while True:
+            # One throttled response pauses every request for the org, not just the one retrying
+            await _wait_if_throttled(self.org_id)
+            deadline.clamp_request(request)
+
+            if hedging.enabled(tool_name, request.method):
+                response = await hedging.send_hedged(tool_name, request, self._send_buffered)
+            else:
+                response = await self._send(request)
+
+            if response.status_code not in (429, 503) or attempt >= THROTTLE_RETRIES:
+                return response
+            delay = retry_after(response, attempt)
+            if delay is None or delay > THROTTLE_MAX_WAIT or not deadline.allows(delay):
+                return response
+
+            await response.aclose()
+            metrics.incr("upstream_throttled", org=self.org_id, status=response.status_code)
+            _throttled_until[self.org_id] = max(_throttled_until.get(self.org_id, 0.0), time.monotonic() + delay)
+            attempt += 1
+
+    async def _send_buffered(self, request: httpx.Request) -> httpx.Response:
+        # Hedge attempts read the whole (still encoded) body before they count as answered
+        response = await self._send(request)
+        try:
+            body = b"".join([chunk async for chunk in response.stream])
+        finally:
+            await response.stream.aclose()
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=httpx.ByteStream(body),
+            extensions=response.extensions,
+        )
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        await scheduler.acquire(self.org_id, lane_for(request))
+
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                scheduler.release()
+
+        writes = _writes.get()
+        record = None
+
+        try:
+            # Time spent queueing for a slot comes out of the same budget
+            deadline.clamp_request(request)
+            if writes is not None and request.method not in READ_METHODS:
+                record = {"method": request.method, "url": str(request.url), "status": None}
+                writes.append(record)
+            response = await shared_transport().handle_async_request(request)
+        except BaseException as exc:
+            release()
+            if record is not None and isinstance(exc, NOT_SENT_ERRORS):
+                writes.remove(record)
+            raise
+
+        if record is not None:
+            record["status"] = response.status_code
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, release),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        pass
+
+
+def client(org_id: str | None = None, **kwargs) -> httpx.AsyncClient:
+    """
+    Drop-in replacement for httpx.AsyncClient() for calls to Anypoint.
+    Requests are scheduled fairly per org_id, share one connection pool,
+    back off on 429/Retry-After and never outlive the current call's deadline.
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return httpx.AsyncClient(transport=ScheduledTransport(org_id or DEFAULT_TENANT), **kwargs)
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import time
+
+from . import jsonutil, upstream
+
+# Optional warm-up at server startup.
+#
+# Resolves and connects to Anypoint, prefetches client-credentials tokens via
+# the get_token flow and preloads list_environments for configured orgs, so
+# the first real call after a deploy/scale-up doesn't pay for all of it.
+# Bounded by a timeout: a failed warm-up never blocks startup for long.
+
+WARMUP_ENABLED = os.environ.get("ANYPOINT_WARMUP", "").lower() in ("1", "true", "yes")
+WARMUP_TIMEOUT = float(os.environ.get("ANYPOINT_WARMUP_TIMEOUT", "20"))
+WARMUP_CLIENTS = os.environ.get("ANYPOINT_WARMUP_CLIENTS", "")  # "client_id:client_secret,..."
+WARMUP_ORGS = os.environ.get("ANYPOINT_WARMUP_ORGS", "")  # "org_id,..."
+
+ANYPOINT_HOST = "anypoint.mulesoft.com"
+ANYPOINT_URL = f"https://{ANYPOINT_HOST}/"
+
+state = {
+    "ready": not WARMUP_ENABLED,
+    "steps": {},
+}
+
+
+def _credentials(spec: str) -> list:
+    pairs = []
+    for item in spec.split(","):
+        client_id, _, client_secret = item.strip().partition(":")
+        if client_id and client_secret:
+            pairs.append((client_id, client_secret))
+    return pairs
+
+
+async def _step(name: str, coro):
+    started = time.monotonic()
+    try:
+        result = await coro
+        state["steps"][name] = {"status": "ok", "seconds": round(time.monotonic() - started, 3)}
+        return result
+    except Exception as exc:
+        state["steps"][name] = {"status": "error", "message": str(exc)}
+        return None
+
+
+async def _connect():
+    await asyncio.get_running_loop().getaddrinfo(ANYPOINT_HOST, 443)
+
+    # Any response will do: the point is a pooled, TLS-established connection
+    async with upstream.client() as client:
+        await client.head(ANYPOINT_URL, timeout=10.0)
+
+
+async def _fetch_token(mcp, client_id: str, client_secret: str) -> str | None:
+    text = await mcp._tool_manager.call_tool(
+        "get_token", {"client_id": client_id, "client_secret": client_secret}
+    )
+    if text.startswith("Error"):
+        raise RuntimeError(text)
+    return jsonutil.loads(text).get("access_token")
+
+
+async def _preload_environments(mcp, token: str, org_id: str):
+    result = await mcp._tool_manager.call_tool("list_environments", {"token": token, "org_id": org_id})
+    if isinstance(result, dict) and "error" in result:
+        raise RuntimeError(result["error"])
+
+
+async def _warm(mcp):
+    await _step("connect", _connect())
+
+    tokens = await asyncio.gather(*(
+        # Steps are numbered, not named after the client or org: /health/ready is unauthenticated
+        _step(f"token:{index}", _fetch_token(mcp, client_id, client_secret))
+        for index, (client_id, client_secret) in enumerate(_credentials(WARMUP_CLIENTS), 1)
+    ))
+    token = next((t for t in tokens if t), None)
+
+    orgs = [org_id.strip() for org_id in WARMUP_ORGS.split(",") if org_id.strip()]
+    if token:
+        await asyncio.gather(*(
+            _step(f"environments:{index}", _preload_environments(mcp, token, org_id))
+            for index, org_id in enumerate(orgs, 1)
+        ))
+
+
+async def run(mcp, timeout: float = WARMUP_TIMEOUT):
+    """
+    Run the warm-up (if enabled) and mark the server ready, even on failure/timeout.
+    """
+    if not WARMUP_ENABLED:
+        state["ready"] = True
+        return state
+
+    try:
+        await asyncio.wait_for(_warm(mcp), timeout)
+    except TimeoutError:
+        state["steps"]["timeout"] = {"status": "error", "message": f"Warm-up exceeded {timeout}s"}
+    finally:
+        state["ready"] = True
+    return state
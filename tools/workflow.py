@@ -0,0 +1,177 @@
+import asyncio
+import time
+
+from .dependency_graph import find_cycles
+
+# Minimal DAG executor for multi-tool workflows.
+#
+# A workflow is {step_name: (needs, fn)}: fn(results) is awaited as soon as
+# every step in `needs` has succeeded, with `results` holding the values of
+# the steps that already finished. Steps whose dependencies failed are skipped.
+# Every step's start/end (seconds since the run started) is recorded, along
+# with the critical path - the chain of steps that determined the wall time.
+#
+# pipeline() covers the bulk case: many items flowing through the same stages,
+# each stage with its own worker count and a bounded queue in front of it.
+
+
+class StepFailed(Exception):
+    """
+    Raised by a step to fail it with a message (dependents are skipped).
+    """
+
+
+def validate(steps: dict) -> str | None:
+    for name, (needs, _) in steps.items():
+        unknown = [need for need in needs if need not in steps]
+        if unknown:
+            return f"Step '{name}' needs unknown steps {unknown}"
+    cycles = find_cycles({name: needs for name, (needs, _) in steps.items()})
+    if cycles:
+        return f"Steps form a cycle: {' -> '.join(cycles[0])}"
+    return None
+
+
+def critical_path(steps: dict, timings: dict) -> list:
+    """
+    Walk back from the step that finished last through, at each step, the
+    dependency that finished last. End times are rounded to the millisecond,
+    so ties go to the step that started later (a dependent, not its dependency).
+    """
+    finished = {name: timing for name, timing in timings.items() if "end" in timing}
+    if not finished:
+        return []
+    last = lambda name: (finished[name]["end"], finished[name]["start"])
+    path = [max(finished, key=last)]
+    while True:
+        needs = [need for need in steps[path[-1]][0] if need in finished]
+        if not needs:
+            break
+        path.append(max(needs, key=last))
+    return path[::-1]
+
+
+async def execute(steps: dict) -> dict:
+    """
+    Run the steps with as much concurrency as the dependencies allow.
+
+    Returns status, results (step → value), steps (step → status/start/end/
+    seconds/message), wall_seconds, step_seconds (their sum, i.e. the
+    sequential cost) and critical_path.
+    """
+    error = validate(steps)
+    if error:
+        return {"status": "error", "message": error}
+
+    started = time.monotonic()
+    results, timings, tasks = {}, {}, {}
+
+    async def run_step(name):
+        needs, fn = steps[name]
+        await asyncio.gather(*(tasks[need] for need in needs))
+
+        failed = [need for need in needs if timings[need]["status"] != "success"]
+        if failed:
+            timings[name] = {"status": "skipped", "message": f"Dependencies did not succeed: {failed}"}
+            return
+
+        start = time.monotonic() - started
+        timing = timings[name] = {"status": "running", "start": round(start, 3)}
+        try:
+            results[name] = await fn(results)
+            timing["status"] = "success"
+        except Exception as exc:
+            timing["status"] = "error"
+            timing["message"] = str(exc)
+        end = time.monotonic() - started
+        timing["end"] = round(end, 3)
+        timing["seconds"] = round(end - start, 3)
+
+    for name in steps:
+        tasks[name] = asyncio.ensure_future(run_step(name))
+    await asyncio.gather(*tasks.values())
+
+    statuses = [timing["status"] for timing in timings.values()]
+    return {
+        "status": "success" if all(s == "success" for s in statuses) else (
+            "error" if not any(s == "success" for s in statuses) else "partial_success"
+        ),
+        "results": results,
+        "steps": {name: timings[name] for name in steps},
+        "wall_seconds": round(time.monotonic() - started, 3),
+        "step_seconds": round(sum(t.get("seconds", 0) for t in timings.values()), 3),
+        "critical_path": critical_path(steps, timings),
+    }
+
+
+async def pipeline(items: list, stages: list, queue_size: int = 8) -> dict:
+    """
+    Push every item through stages [(name, fn, workers)], where
+    fn(item, results) returns the stage's value for that item.
+
+    Stages run concurrently: while one item is being published the next is
+    uploading. Each stage has `workers` concurrent calls and a queue of at most
+    queue_size items in front of it, so a slow stage holds back the ones
+    before it instead of letting work pile up. An item that fails a stage
+    leaves the pipeline.
+
+    Returns status, succeeded/failed counts, wall_seconds, step_seconds and one
+    report per item (status, failed_stage, message, results, and per stage
+    start/seconds/waited - time spent queued).
+    """
+    started = time.monotonic()
+    queues = [asyncio.Queue(maxsize=max(1, queue_size)) for _ in stages]
+    reports = [{"item": item, "status": "pending", "results": {}, "stages": {}} for item in items]
+
+    async def put(index, report):
+        if report is not None:
+            report["queued_at"] = time.monotonic()
+        await queues[index].put(report)
+
+    async def worker(index):
+        name, fn, _ = stages[index]
+        while (report := await queues[index].get()) is not None:
+            start = time.monotonic()
+            timing = report["stages"][name] = {
+                "start": round(start - started, 3),
+                "waited": round(start - report.pop("queued_at"), 3),
+            }
+            try:
+                report["results"][name] = await fn(report["item"], report["results"])
+            except Exception as exc:
+                report.update(status="error", failed_stage=name, message=str(exc))
+            timing["seconds"] = round(time.monotonic() - start, 3)
+
+            if report["status"] == "error":
+                continue
+            if index + 1 < len(stages):
+                await put(index + 1, report)
+            else:
+                report["status"] = "success"
+
+    async def stage(index):
+        await asyncio.gather(*(worker(index) for _ in range(max(1, stages[index][2]))))
+        if index + 1 < len(stages):
+            for _ in range(max(1, stages[index + 1][2])):
+                await put(index + 1, None)
+
+    async def feed():
+        for report in reports:
+            await put(0, report)
+        for _ in range(max(1, stages[0][2])):
+            await put(0, None)
+
+    await asyncio.gather(feed(), *(stage(index) for index in range(len(stages))))
+
+    failed = sum(1 for report in reports if report["status"] != "success")
+    return {
+        "status": "success" if not failed else ("error" if failed == len(reports) else "partial_success"),
+        "total": len(reports),
+        "succeeded": len(reports) - failed,
+        "failed": failed,
+        "wall_seconds": round(time.monotonic() - started, 3),
+        "step_seconds": round(sum(
+            timing["seconds"] for report in reports for timing in report["stages"].values()
+        ), 3),
+        "reports": reports,
+    }
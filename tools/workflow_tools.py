@@ -0,0 +1,288 @@
+import asyncio
+import os
+import re
+
+from . import migration_index, raml_model
+from .workflow import StepFailed, execute, pipeline
+
+# Design-to-governed-API workflow as one tool: the existing tools run as a
+# dependency graph, with independent steps (environment lookup next to the
+# design steps, the policies and every SLA tier once the instance exists)
+# running concurrently. Bulk onboarding of a migration folder runs the design
+# steps as a pipeline instead, one stage per tool.
+
+
+def _ok(result: dict) -> dict:
+    if not isinstance(result, dict) or result.get("status") != "success":
+        message = (result.get("message") or result.get("error")) if isinstance(result, dict) else result
+        raise StepFailed(str(message or result))
+    return result
+
+
+def _ok_text(result: str) -> str:
+    if result.startswith(("Error", "HTTP Error")):
+        raise StepFailed(result)
+    return result
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "api"
+
+
+def migration_api_specs(migration_id: str, paths: list | None = None) -> list:
+    """
+    Root API specs (RAML kind "Api") of a migration from the index, each with
+    the project/asset name to publish it under.
+    """
+    specs = [
+        spec for spec in migration_index.list_specs(migration_id)
+        if spec["kind"] == "Api" and (paths is None or spec["path"] in paths)
+    ]
+    used = set()
+    for spec in specs:
+        name = base = _slug(spec["title"] or os.path.splitext(os.path.basename(spec["path"]))[0])
+        suffix = 2
+        while name in used:
+            name, suffix = f"{base}-{suffix}", suffix + 1
+        used.add(name)
+        spec["name"] = name
+    return specs
+
+
+def register(mcp):
+    async def call(tool_name: str, **arguments):
+        # Through the tool manager so every step runs inside the workflow's deadline
+        return await mcp._tool_manager.call_tool(tool_name, arguments)
+
+    @mcp.tool()
+    async def run_api_workflow(
+        token: str,
+        org_id: str,
+        user_id: str,
+        project_name: str,
+        folder_path: str,
+        asset_id: str,
+        version: str,
+        api_version: str = "v1",
+        env_id: str | None = None,
+        env_name: str | None = None,
+        group_id: str | None = None,
+        main_file: str | None = None,
+        instance_label: str | None = None,
+        client_id_policy: bool = True,
+        sla_policy: bool = False,
+        tiers: list[dict] | None = None
+    ) -> dict:
+        """
+        Run the full design → publish → API instance → governance workflow in one call.
+
+        Steps and dependencies:
+        - environment      : list_environments, resolves env_name (skipped when env_id is given)
+        - project          : create_and_lock_design_project
+        - upload           : upload_design_files (after project)
+        - publish          : publish_design_project (after upload)
+        - instance         : create_api_instance (after publish and environment)
+        - client_id_policy : apply_client_id_policy (after instance, if enabled)
+        - sla_policy       : apply_sla_rate_limiting_ (after instance, if enabled)
+        - tier:<name>      : create_sla_tier per entry of tiers (after instance)
+
+        tiers: [{"name": "Gold", "limits": [...], "description": "", "auto_approve": false, "status": "ACTIVE"}]
+               (names must be unique)
+        group_id defaults to org_id and main_file to "<project_name>.raml".
+
+        Returns each step's status, start/end/seconds, the IDs produced
+        (project_id, env_id, instance_id, tier IDs), wall_seconds vs
+        step_seconds (sequential cost) and the critical_path.
+        """
+
+        if not env_id and not env_name:
+            return {"status": "error", "message": "Provide env_id or env_name"}
+        # Steps are keyed by tier name: a repeated name would silently drop a tier
+        names = [tier.get("name") if isinstance(tier, dict) else None for tier in tiers or []]
+        if not all(names):
+            return {"status": "error", "message": "Every entry of tiers needs a name"}
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            return {"status": "error", "message": f"Tier names must be unique: {duplicates}"}
+        main_file = main_file or f"{project_name}.raml"
+
+        async def environment(results):
+            listing = await call("list_environments", token=token, org_id=org_id)
+            if isinstance(listing, dict) and "error" in listing:
+                raise StepFailed(listing["error"])
+            environments = listing.get("data", []) if isinstance(listing, dict) else listing
+            for env in environments:
+                if env.get("name", "").lower() == env_name.lower():
+                    return env["id"]
+            raise StepFailed(f"Environment '{env_name}' not found: {[env.get('name') for env in environments]}")
+
+        async def project(results):
+            created = _ok(await call(
+                "create_and_lock_design_project",
+                token=token, org_id=org_id, user_id=user_id, project_name=project_name
+            ))
+            return created["project_id"]
+
+        async def upload(results):
+            return _ok_text(await call(
+                "upload_design_files",
+                token=token, org_id=org_id, user_id=user_id, project_id=results["project"], folder_path=folder_path
+            ))
+
+        async def publish(results):
+            return _ok_text(await call(
+                "publish_design_project",
+                token=token, org_id=org_id, user_id=user_id, project_id=results["project"], main_file=main_file,
+                api_version=api_version, version=version, asset_id=asset_id
+            ))
+
+        async def instance(results):
+            label = {"instance_label": instance_label} if instance_label else {}
+            created = _ok(await call(
+                "create_api_instance",
+                token=token, org_id=org_id, env_id=results.get("environment", env_id),
+                group_id=group_id or org_id, asset_id=asset_id, version=version, **label
+            ))
+            return str(created["instance"]["id"])
+
+        def instance_step(tool_name):
+            async def step(results):
+                created = _ok(await call(
+                    tool_name, token=token, org_id=org_id, env_id=results.get("environment", env_id),
+                    instance_id=results["instance"]
+                ))
+                response = created.get("response")
+                return response.get("id") if isinstance(response, dict) else response
+            return step
+
+        def tier_step(tier):
+            async def step(results):
+                created = _ok(await call(
+                    "create_sla_tier", token=token, org_id=org_id, env_id=results.get("environment", env_id),
+                    instance_id=results["instance"], name=tier["name"], description=tier.get("description", ""),
+                    api_version_id=results["instance"], limits=tier["limits"],
+                    auto_approve=tier.get("auto_approve", False), status=tier.get("status", "ACTIVE")
+                ))
+                return created["response"].get("id")
+            return step
+
+        steps = {
+            "project": ((), project),
+            "upload": (("project",), upload),
+            "publish": (("upload",), publish),
+        }
+        if env_id:
+            steps["instance"] = (("publish",), instance)
+        else:
+            steps["environment"] = ((), environment)
+            steps["instance"] = (("publish", "environment"), instance)
+
+        if client_id_policy:
+            steps["client_id_policy"] = (("instance",), instance_step("apply_client_id_policy"))
+        if sla_policy:
+            steps["sla_policy"] = (("instance",), instance_step("apply_sla_rate_limiting_"))
+        for tier in tiers or []:
+            steps[f"tier:{tier['name']}"] = (("instance",), tier_step(tier))
+
+        run = await execute(steps)
+        if "results" not in run:
+            return run
+
+        results = run.pop("results")
+        run["ids"] = {
+            "project_id": results.get("project"),
+            "env_id": results.get("environment", env_id),
+            "instance_id": results.get("instance"),
+            "tier_ids": {name[len("tier:"):]: value for name, value in results.items() if name.startswith("tier:")},
+        }
+        return run
+
+    @mcp.tool()
+    async def onboard_migration_specs(
+        token: str,
+        org_id: str,
+        user_id: str,
+        migration_id: str,
+        version: str = "1.0.0",
+        paths: list[str] | None = None,
+        name_prefix: str = "",
+        create_parallel: int = 8,
+        upload_parallel: int = 4,
+        publish_parallel: int = 4,
+        queue_size: int = 8
+    ) -> dict:
+        """
+        Publish every API spec of a migration output folder to Exchange.
+
+        Specs are the RAML files of kind "Api" found by the migration index
+        (restrict with paths, relative to raml-specs). Each goes through three
+        pipelined stages - create_and_lock_design_project → upload_design_files
+        (the spec and the files it includes or uses) → publish_design_project - with at most
+        *_parallel calls per stage and queue_size specs waiting between stages.
+        Creation waits for the project lock, so it gets more workers by default.
+
+        Project and asset names come from the RAML title (or file name),
+        prefixed with name_prefix; api_version is the spec's version or "v1".
+
+        Returns succeeded/failed counts, wall_seconds vs step_seconds and one
+        report per spec: path, name, status, failed_stage/message, project_id
+        and per-stage start/seconds/waited.
+        """
+
+        await migration_index.ready()
+        await asyncio.to_thread(migration_index.scan, [migration_id])
+        specs = migration_api_specs(migration_id, paths)
+        if not specs:
+            return {"status": "error", "message": f"No API specs indexed for migration {migration_id}"}
+        root = migration_index.specs_root(migration_id)
+
+        async def create(spec, results):
+            created = _ok(await call(
+                "create_and_lock_design_project",
+                token=token, org_id=org_id, user_id=user_id, project_name=name_prefix + spec["name"]
+            ))
+            return created["project_id"]
+
+        async def upload(spec, results):
+            # Only the spec and the files it references, not its neighbours in the folder
+            folder = root / os.path.dirname(spec["path"])
+            try:
+                files = await asyncio.to_thread(
+                    raml_model.spec_files, raml_model.FolderSource(folder), os.path.basename(spec["path"])
+                )
+            except (OSError, ValueError) as e:
+                raise StepFailed(f"Cannot resolve the files of {spec['path']}: {e}")
+            return _ok_text(await call(
+                "upload_design_files",
+                token=token, org_id=org_id, user_id=user_id, project_id=results["create"],
+                folder_path=str(folder), files=files
+            ))
+
+        async def publish(spec, results):
+            _ok_text(await call(
+                "publish_design_project",
+                token=token, org_id=org_id, user_id=user_id, project_id=results["create"],
+                main_file=os.path.basename(spec["path"]), api_version=spec["version"] or "v1",
+                version=version, asset_id=name_prefix + spec["name"]
+            ))
+            return name_prefix + spec["name"]
+
+        run = await pipeline(specs, [
+            ("create", create, create_parallel),
+            ("upload", upload, upload_parallel),
+            ("publish", publish, publish_parallel),
+        ], queue_size)
+
+        run["reports"] = [
+            {
+                "path": report["item"]["path"],
+                "name": name_prefix + report["item"]["name"],
+                "status": report["status"],
+                **({"failed_stage": report["failed_stage"], "message": report["message"]} if "failed_stage" in report else {}),
+                "project_id": report["results"].get("create"),
+                "asset_id": report["results"].get("publish"),
+                "stages": report["stages"],
+            }
+            for report in run["reports"]
+        ]
+        return run